@@ -1,9 +1,10 @@
 import streamlit as st
-import document_processing as dp
+import extraction_workers as ew
 import gemini_integration as gi
 import readability as rd
 import pdf_export as pe
 import base64
+import threading
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -27,11 +28,13 @@ if 'qa_history' not in st.session_state:
     st.session_state.qa_history = []
 if 'readability_preference' not in st.session_state:
     st.session_state.readability_preference = "Easy (Elementary School Level)"
+if 'extraction_cancel' not in st.session_state:
+    st.session_state.extraction_cancel = None
 
 # Sidebar - File upload and FAQs
 with st.sidebar:
     st.header("Upload Document")
-    st.write("Supported formats: PDF, DOCX, PNG, JPG, TXT")
+    st.write("Supported formats: PDF, DOCX, PNG, JPG, TIFF, TXT, ZIP. Photographed pages, or a policy's declarations, forms and endorsements, can be uploaded together as one document.")
     
     # Add readability preference dropdown
     readability_preference = st.selectbox(
@@ -43,20 +46,53 @@ with st.sidebar:
     # Save the preference to session state
     st.session_state.readability_preference = readability_preference
     
-    uploaded_file = st.file_uploader(
+    uploaded_files = st.file_uploader(
         "Choose a file",
-        type=["pdf", "docx", "txt", "png", "jpg", "jpeg"],
-        help="Upload your insurance policy document"
+        type=["pdf", "docx", "txt", "png", "jpg", "jpeg", "tif", "tiff", "zip"],
+        accept_multiple_files=True,
+        help="Upload your insurance policy document, select every photographed page or policy file at once, or upload them in a ZIP"
     )
+    # A single file is extracted on its own; several files (or a ZIP) are merged into one
+    # document: images as its pages, anything else as a bundle of files
+    if not uploaded_files:
+        uploaded_file = None
+    elif len(uploaded_files) == 1:
+        uploaded_file = uploaded_files[0]
+    else:
+        uploaded_file = uploaded_files
     
-    if uploaded_file is not None:
+    # Streamlit reruns this script on every widget interaction, so only process a document
+    # when different files are uploaded or the summary language level changes
+    upload_key = (tuple(f.file_id for f in uploaded_files), readability_preference) if uploaded_files else None
+    
+    if uploaded_file is not None and st.session_state.get("processed_upload") != upload_key:
         # Process the uploaded file
         try:
             # Reset previous data when a new document is uploaded
             st.session_state.qa_history = []
             
+            # Stop any extraction still running for a previous upload before starting this one
+            if st.session_state.extraction_cancel is not None:
+                st.session_state.extraction_cancel.set()
+            st.session_state.extraction_cancel = threading.Event()
+            
             with st.spinner("Extracting text from document..."):
-                extracted_text, document_info = dp.extract_text(uploaded_file)
+                progress_bar = st.progress(0.0)
+                
+                def show_extraction_progress(pages_done, page_count):
+                    progress_bar.progress(pages_done / page_count, text=f"Reading page {pages_done} of {page_count}")
+                
+                extracted_text, document_info = ew.extract_text(uploaded_file, show_extraction_progress, st.session_state.extraction_cancel)
+                progress_bar.empty()
+                failed_files = [f["file_name"] for f in document_info.get("files", []) if f.get("error")]
+                if failed_files:
+                    st.warning(f"Some files could not be read ({', '.join(failed_files)}). The summary covers the rest.")
+                if document_info.get("skipped_pages"):
+                    skipped = ", ".join(
+                        f"{first}-{last}" if last and last != first else str(first) if last else f"{first} onward"
+                        for ranges in document_info["skipped_pages"].values() for first, last in ranges
+                    )
+                    st.warning(f"Some pages were not fully read (pages {skipped}), because of time or page limits. The summary covers the rest.")
                 st.session_state.extracted_text = extracted_text
                 st.session_state.document_info = document_info
                 
@@ -71,6 +107,7 @@ with st.sidebar:
                         st.session_state.readability_preference
                     )
                 
+                st.session_state.processed_upload = upload_key
                 st.success("Document processed successfully!")
         except Exception as e:
             st.error(f"Error processing document: {str(e)}")
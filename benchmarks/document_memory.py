@@ -0,0 +1,92 @@
+"""
+Compare the session memory of the old page_info dictionaries with the compact document model.
+
+Usage:
+    python -m benchmarks.document_memory [--pages 500] [--files path/to/a.pdf ...]
+
+Builds what a session keeps after extraction, the extracted text plus page_info, both
+ways: page_info as a dict of dicts that each hold a copy of the page text, and as a
+document_model.PageInfo view over the extracted text. Reports the memory allocated for
+each (tracemalloc) and the size of each when pickled into the extraction cache.
+"""
+import os
+import sys
+import pickle
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import document_processing as dp
+import document_model as dm
+
+def build_pages(pages):
+    """Generate page records shaped like the PDF extractor's, about 3,000 characters per page."""
+    records = []
+    offset = 0
+    for page in range(1, pages + 1):
+        text = "\n".join(
+            f"Section {page}.{line}: We will pay for direct and accidental loss to your covered auto, "
+            "including its equipment, minus any applicable deductible."
+            for line in range(20)
+        )
+        title = f"PART {page} - COVERAGE FOR DAMAGE TO YOUR AUTO"
+        text = title + "\n" + text
+        records.append({
+            "page_number": page,
+            "text": text,
+            "offset": offset,
+            "headers": [title],
+            "headings": [{"text": title, "offset": 0, "score": 2.1, "size": 13.0, "bold": True}],
+            "tier": "fast",
+            "tier_reason": None,
+            "extract_seconds": 0.002
+        })
+        offset += len(text) + len(dp.PAGE_SEPARATOR)
+    return records
+
+def load_pages(path):
+    records = []
+    for record in dp.iter_pdf_pages(path):
+        records.append(dict({key: record[key] for key in dp.PAGE_INFO_KEYS if key in record}, page_number=record["page_number"]))
+    return records
+
+def measure(build):
+    tracemalloc.start()
+    value = build()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated, len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+def run(samples):
+    print(f"{'file':<28} {'model':<10} {'memory MB':>10} {'pickled MB':>11}")
+    for name, records in samples:
+        # Both builds start from the page texts alone, as the extractors hand them over
+        page_texts = [record["text"] for record in records]
+        metadata = [{key: value for key, value in record.items() if key != "text"} for record in records]
+        
+        def build_dicts():
+            text = "".join(page_text + dp.PAGE_SEPARATOR for page_text in page_texts)
+            page_info = {meta["page_number"]: dict(meta, text=text[meta["offset"]:meta["offset"] + len(page_text)])
+                         for meta, page_text in zip(metadata, page_texts)}
+            return text, page_info
+        
+        def build_compact():
+            text = "".join(page_text + dp.PAGE_SEPARATOR for page_text in page_texts)
+            page_info = {meta["page_number"]: dict(meta, text=page_text) for meta, page_text in zip(metadata, page_texts)}
+            return text, dm.compact_page_info(text, page_info)
+        
+        for label, build in (("dicts", build_dicts), ("compact", build_compact)):
+            allocated, pickled = measure(build)
+            print(f"{name[:28]:<28} {label:<10} {allocated / 1e6:>10.2f} {pickled / 1e6:>11.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500, help="Pages in the generated document")
+    parser.add_argument("--files", nargs="*", default=[], help="Existing PDF files to measure instead")
+    args = parser.parse_args()
+    
+    if args.files:
+        samples = [(os.path.basename(path), load_pages(path)) for path in args.files]
+    else:
+        samples = [(f"generated ({args.pages} pages)", build_pages(args.pages))]
+    run(samples)
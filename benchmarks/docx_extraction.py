@@ -0,0 +1,115 @@
+"""
+Compare the streaming DOCX extractor against the python-docx object model on large files.
+
+Usage:
+    python -m benchmarks.docx_extraction [--pages 200] [--files path/to/a.docx ...]
+
+Without --files a synthetic policy is generated with headings, body paragraphs, a
+deductible schedule table and a page break on every page. Reports the best wall time of
+three runs, the peak RSS growth sampled during one extraction in a fresh process (which
+also counts lxml's native memory; Linux only) and how many characters each extractor recovered.
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import threading
+import multiprocessing
+import docx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import document_processing as dp
+
+def build_policy(pages):
+    """Generate a DOCX policy with the given number of pages and return its bytes."""
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = "ABC Insurance Co - Personal Auto Policy"
+    document.sections[0].footer.paragraphs[0].text = "PP 00 01 01 05"
+    for page in range(1, pages + 1):
+        document.add_heading(f"PART {page} - COVERAGE FOR DAMAGE TO YOUR AUTO", level=1)
+        for paragraph in range(12):
+            document.add_paragraph(
+                f"Section {page}.{paragraph}: We will pay for direct and accidental loss to your covered auto, "
+                "including its equipment, minus any applicable deductible shown in the Declarations."
+            )
+        table = document.add_table(rows=4, cols=3)
+        for row, (coverage, limit, deductible) in enumerate([
+            ("Coverage", "Limit", "Deductible"),
+            ("Collision", "Actual cash value", "$500"),
+            ("Other than collision", "Actual cash value", "$250"),
+            ("Rental reimbursement", "$30/day", "None")
+        ]):
+            for column, value in enumerate((coverage, limit, deductible)):
+                table.cell(row, column).text = value
+        document.add_page_break()
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+def python_docx_extract(data):
+    """The previous implementation: body paragraphs only, through the python-docx object model."""
+    doc = docx.Document(io.BytesIO(data))
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    return text
+
+def streaming_extract(data):
+    text, _ = dp.extract_text_from_docx(io.BytesIO(data))
+    return text
+
+def _current_rss_mb():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+def _peak_rss_growth(extract, data, results):
+    """Child process entry point: sample RSS while extracting and report the peak growth."""
+    before = _current_rss_mb()
+    peak = [before]
+    done = threading.Event()
+    
+    def sample():
+        while not done.wait(0.002):
+            peak[0] = max(peak[0], _current_rss_mb())
+    
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    extract(data)
+    done.set()
+    sampler.join()
+    results.put(max(peak[0], _current_rss_mb()) - before)
+
+def measure(extract, data):
+    seconds = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        text = extract(data)
+        seconds = min(seconds, time.perf_counter() - started)
+    
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_peak_rss_growth, args=(extract, data, results))
+    process.start()
+    rss_growth = results.get()
+    process.join()
+    return seconds, rss_growth, len(text)
+
+def run(samples):
+    print(f"{'file':<28} {'extractor':<12} {'seconds':>8} {'RSS MB':>8} {'chars':>10}")
+    for name, data in samples:
+        for label, extract in (("python-docx", python_docx_extract), ("streaming", streaming_extract)):
+            seconds, rss_growth, chars = measure(extract, data)
+            print(f"{name[:28]:<28} {label:<12} {seconds:>8.2f} {rss_growth:>8.1f} {chars:>10}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200, help="Pages in the generated policy")
+    parser.add_argument("--files", nargs="*", default=[], help="Existing DOCX files to measure instead")
+    args = parser.parse_args()
+    
+    if args.files:
+        samples = [(os.path.basename(path), open(path, "rb").read()) for path in args.files]
+    else:
+        samples = [(f"generated ({args.pages} pages)", build_policy(args.pages))]
+    run(samples)
@@ -0,0 +1,107 @@
+"""
+Measure what font-metric heading detection adds to the extraction of each PDF page.
+
+Usage:
+    python -m benchmarks.header_detection [--pages 100] [--files path/to/a.pdf ...]
+
+Without --files a synthetic policy is generated with a running header, bold numbered
+section headings, bold subheadings and body text on every page. For the raw text tier the
+baseline is reading the page's text and runs; for the layout tier it is pdfplumber's
+extract_text. The overhead is building the span table and ranking the headings. Reports
+the median and worst per-page milliseconds and the headings found.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import tempfile
+from fpdf import FPDF
+import pdfplumber
+import pypdfium2 as pdfium
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import header_detection as hd
+
+def build_policy(pages, path):
+    """Write a PDF policy with the given number of pages to path."""
+    pdf = FPDF()
+    for page in range(pages):
+        pdf.add_page()
+        pdf.set_font("Arial", "", 8)
+        pdf.text(10, 8, "ABC Insurance Co - Personal Auto Policy PA 1234567")
+        y = 20
+        for section in range(3):
+            pdf.set_font("Arial", "B", 13)
+            pdf.text(15, y, f"PART {page * 3 + section + 1} - COVERAGE FOR DAMAGE TO YOUR AUTO")
+            y += 8
+            pdf.set_font("Arial", "B", 10)
+            pdf.text(15, y, "Insuring Agreement")
+            y += 6
+            pdf.set_font("Arial", "", 10)
+            for line in range(10):
+                pdf.text(15, y, f"We will pay for direct and accidental loss {line} to your covered auto, minus any deductible.")
+                y += 5
+            y += 4
+    pdf.output(path)
+
+def measure_fast(path):
+    """Per-page seconds for the raw text tier and for heading detection on top of it."""
+    baseline, overhead, found = [], [], 0
+    document = pdfium.PdfDocument(path)
+    for page in document:
+        started = time.perf_counter()
+        textpage = page.get_textpage()
+        page_text = textpage.get_text_range()
+        rects = [textpage.get_rect(i) for i in range(textpage.count_rects())]
+        middle = time.perf_counter()
+        spans = hd.pdfium_spans(textpage, page_text, rects, page.get_height())
+        headings = hd.rank_headings(spans, page_text, page.get_height())
+        finished = time.perf_counter()
+        textpage.close()
+        page.close()
+        baseline.append(middle - started)
+        overhead.append(finished - middle)
+        found += len(headings)
+    document.close()
+    return baseline, overhead, found
+
+def measure_layout(path):
+    """Per-page seconds for pdfplumber's layout text and for heading detection on its chars."""
+    baseline, overhead, found = [], [], 0
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages:
+            started = time.perf_counter()
+            page_text = page.extract_text() or ""
+            middle = time.perf_counter()
+            headings = hd.rank_headings(hd.plumber_spans(page.chars), page_text, float(page.height))
+            finished = time.perf_counter()
+            page.close()
+            baseline.append(middle - started)
+            overhead.append(finished - middle)
+            found += len(headings)
+    return baseline, overhead, found
+
+def run(samples):
+    print(f"{'file':<28} {'tier':<7} {'base ms':>8} {'heads ms':>9} {'worst ms':>9} {'headings':>9}")
+    for name, path in samples:
+        for tier, measure in (("fast", measure_fast), ("layout", measure_layout)):
+            baseline, overhead, found = measure(path)
+            print(
+                f"{name[:28]:<28} {tier:<7} {statistics.median(baseline) * 1000:>8.2f} "
+                f"{statistics.median(overhead) * 1000:>9.2f} {max(overhead) * 1000:>9.2f} {found:>9}"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100, help="Pages in the generated policy")
+    parser.add_argument("--files", nargs="*", default=[], help="Existing PDF files to measure instead")
+    args = parser.parse_args()
+    
+    if args.files:
+        run([(os.path.basename(path), path) for path in args.files])
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "policy.pdf")
+            build_policy(args.pages, path)
+            run([(f"generated ({args.pages} pages)", path)])
@@ -0,0 +1,116 @@
+"""
+Measure document fingerprinting and how well it tells rescans of a policy from other policies.
+
+Usage:
+    python -m benchmarks.near_duplicates [--pages 40] [--repeat 5] [--files path/to/a.pdf ...]
+
+Builds a policy text (or extracts the given PDFs), fingerprints it with
+document_index.signature and reports the best time. It then simulates rescans by
+misreading a share of the characters, as OCR does, and reports their estimated similarity to
+the original next to SIMILARITY_THRESHOLD, along with the similarity of an unrelated text.
+
+Finally it misreads or drops some of the facts that tell policies apart
+(document_index.IDENTITY_KINDS), and reports whether document_index.same_policy still
+takes the rescan for the original, and whether it tells a different policy from it.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import document_index as di
+
+WORDS = (
+    "we will pay for direct and accidental loss to your covered auto including its equipment "
+    "minus any applicable deductible shown in the declarations this coverage does not apply "
+    "to any vehicle while used as a public or livery conveyance bodily injury property damage "
+    "insured person family member occupying premium limit of liability exclusions conditions"
+).split()
+NOISE_RATES = (0.001, 0.005, 0.01, 0.02)
+# Declarations facts of a policy, as policy_facts finds them
+POLICY_FACTS = [
+    {"kind": "policy_period", "value": ("2026-01-01", "2026-07-01")},
+    {"kind": "vin", "value": "4T1B11HK5MU000001"},
+    {"kind": "vehicle", "value": {"year": 2021, "make": "Toyota", "model": "Camry"}},
+    {"kind": "premium", "value": 742.18},
+    {"kind": "date", "value": "2025-12-15", "label": "issue"},
+]
+
+def build_policy(pages, seed):
+    """Generate about 400 words of policy text per page."""
+    rng = random.Random(seed)
+    return "\n\n".join(" ".join(rng.choice(WORDS) for _ in range(400)) for _ in range(pages))
+
+def load_policy(path):
+    import document_processing as dp
+    text, _ = dp.extract_text_from_pdf(path)
+    return text
+
+def misread(text, rate, seed=0):
+    """Replace a share of the letters and digits of a text with others, like OCR errors."""
+    rng = random.Random(seed)
+    chars = list(text)
+    positions = [i for i, char in enumerate(chars) if char.isalnum()]
+    for i in rng.sample(positions, int(len(positions) * rate)):
+        chars[i] = rng.choice("abcdefghijklmnopqrstuvwxyz0123456789")
+    return "".join(chars)
+
+def run(name, text, other, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        original = di.signature(text)
+        best = min(best, time.perf_counter() - started)
+    scores = [di.similarity(original, di.signature(misread(text, rate))) for rate in NOISE_RATES]
+    unrelated = di.similarity(original, di.signature(other))
+    print(f"{name[:28]:<28} {len(text.split()):>8} {best * 1000:>8.1f} "
+          + " ".join(f"{score:>7.2f}" for score in scores) + f" {unrelated:>9.2f}")
+
+def misread_value(value, characters, seed=0):
+    """Replace some of the digits and letters of a value with others, as OCR misreads them."""
+    rng = random.Random(seed)
+    chars = list(value)
+    for i in rng.sample([i for i, char in enumerate(chars) if char.isalnum()], characters):
+        chars[i] = rng.choice([c for c in ("0123456789" if chars[i].isdigit() else "ABCDEFGHJKLMNPRSTUVWXYZ") if c != chars[i]])
+    return "".join(chars)
+
+def misread_facts(identity, kinds, characters):
+    return dict(identity, **{kind: [misread_value(value, characters) for value in identity[kind]] for kind in kinds})
+
+def run_identity():
+    """Compare the identity facts of a policy with rescans that misread or miss some of them."""
+    original = di.identity(POLICY_FACTS)
+    others = [kind for kind in di.IDENTITY_KINDS if kind in original and kind != "policy_period"]
+    rescans = [
+        ("one character of every fact", misread_facts(original, original, 1)),
+        ("two characters of one fact", misread_facts(original, others[:1], 2)),
+        ("two characters of two facts", misread_facts(original, others[:2], 2)),
+        ("two characters of the period", misread_facts(original, ["policy_period"], 2)),
+        ("one fact missed", {kind: values for kind, values in original.items() if kind != others[0]}),
+        ("period missed", {kind: values for kind, values in original.items() if kind != "policy_period"}),
+        ("different vehicle, same period", dict(original, vin=["1FTEW1EP0JF000002"], vehicle=["2018 Ford F-150"], premium=["1082.50"])),
+    ]
+    print(f"{'identity facts of the rescan':<32} {'same policy':>11}")
+    for name, rescan in rescans:
+        print(f"{name:<32} {str(di.same_policy(original, rescan)):>11}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=40, help="Pages in the generated policy")
+    parser.add_argument("--repeat", type=int, default=5, help="Fingerprinting runs per document; the best is reported")
+    parser.add_argument("--files", nargs="*", default=[], help="Existing PDF files to measure instead")
+    args = parser.parse_args()
+    
+    print(f"Similarity threshold: {di.SIMILARITY_THRESHOLD}")
+    print(f"{'document':<28} {'words':>8} {'best ms':>8} " + " ".join(f"{f'{rate:.1%}':>7}" for rate in NOISE_RATES)
+          + f" {'unrelated':>9}")
+    other = build_policy(args.pages, seed=1)
+    if args.files:
+        for path in args.files:
+            run(os.path.basename(path), load_policy(path), other, args.repeat)
+    else:
+        run(f"generated ({args.pages} pages)", build_policy(args.pages, seed=0), other, args.repeat)
+    print()
+    run_identity()
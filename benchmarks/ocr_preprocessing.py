@@ -0,0 +1,69 @@
+"""
+Compare OCR time and accuracy across image preprocessing profiles.
+
+Usage:
+    python -m benchmarks.ocr_preprocessing path/to/policy_photos [--profiles none fast balanced]
+
+Every PNG/JPG/TIFF in the directory is preprocessed and OCR'd once per profile. When a
+.txt file with the same name sits next to an image it is used as the reference text and
+accuracy is reported as the word-level similarity between the OCR output and the reference.
+"""
+import os
+import sys
+import time
+import argparse
+import difflib
+from PIL import Image
+import pytesseract
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import image_preprocessing as ip
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff")
+
+def word_accuracy(text, reference):
+    """Similarity (0-1) between the words of the OCR output and the reference text."""
+    return difflib.SequenceMatcher(None, text.lower().split(), reference.lower().split(), autojunk=False).ratio()
+
+def run(directory, profiles):
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            path = os.path.join(directory, name)
+            reference_path = os.path.splitext(path)[0] + ".txt"
+            reference = open(reference_path, encoding="utf-8").read() if os.path.exists(reference_path) else None
+            samples.append((path, reference))
+    
+    if not samples:
+        print(f"No images found in {directory}")
+        return
+    
+    print(f"{len(samples)} images")
+    print(f"{'profile':<10} {'megapixels':>10} {'prep s':>8} {'ocr s':>8} {'total s':>8} {'accuracy':>9}")
+    for profile in profiles:
+        megapixels = prep_seconds = ocr_seconds = 0.0
+        accuracies = []
+        for path, reference in samples:
+            with Image.open(path) as image:
+                image.load()
+                started = time.perf_counter()
+                prepared = ip.preprocess_image(image, profile)
+                prep_seconds += time.perf_counter() - started
+            megapixels += prepared.width * prepared.height / 1e6
+            
+            started = time.perf_counter()
+            text = pytesseract.image_to_string(prepared)
+            ocr_seconds += time.perf_counter() - started
+            if reference is not None:
+                accuracies.append(word_accuracy(text, reference))
+        
+        accuracy = f"{sum(accuracies) / len(accuracies):.3f}" if accuracies else "n/a"
+        print(f"{profile:<10} {megapixels / len(samples):>10.2f} {prep_seconds:>8.2f} {ocr_seconds:>8.2f} "
+              f"{prep_seconds + ocr_seconds:>8.2f} {accuracy:>9}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="Directory of policy photos, optionally with .txt reference transcripts")
+    parser.add_argument("--profiles", nargs="+", default=list(ip.PROFILES), choices=list(ip.PROFILES))
+    args = parser.parse_args()
+    run(args.directory, args.profiles)
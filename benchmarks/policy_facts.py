@@ -0,0 +1,68 @@
+"""
+Measure the throughput of the local policy fact extractor on large policies.
+
+Usage:
+    python -m benchmarks.policy_facts [--pages 1000] [--repeat 5] [--files path/to/a.pdf ...]
+
+Builds a long policy text (or extracts the given PDFs), runs policy_facts.extract_facts
+over it several times and reports the best time, the throughput in MB of text per second
+and the facts found by kind.
+"""
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import policy_facts as pf
+
+def build_policy(pages):
+    """Generate policy text of about 3,000 characters per page, with a few facts on some pages."""
+    page_info = {}
+    page_texts = []
+    offset = 0
+    for page in range(1, pages + 1):
+        lines = [
+            f"Section {page}.{line}: We will pay for direct and accidental loss to your covered auto, "
+            "including its equipment, minus any applicable deductible."
+            for line in range(20)
+        ]
+        if page % 10 == 1:
+            lines[3] = "Policy Period: 01/01/2026 to 07/01/2026   6-month premium $742.18"
+            lines[5] = "Liability limits 100/300/50   Collision: $500 deductible   Comprehensive deductible: $250"
+            lines[7] = "Vehicle 1: 2019 HONDA CIVIC   VIN 1M8GDM9AXKP042788"
+        text = "\n".join(lines)
+        page_info[page] = {"text": text, "offset": offset}
+        page_texts.append(text)
+        offset += len(text) + 2
+    return "".join(text + "\n\n" for text in page_texts), page_info
+
+def load_policy(path):
+    import document_processing as dp
+    return dp.extract_text_from_pdf(path)
+
+def run(samples, repeat):
+    print(f"{'document':<32} {'MB':>6} {'best ms':>9} {'MB/s':>8}  facts")
+    for name, (text, page_info) in samples:
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            facts = pf.extract_facts(text, page_info)
+            best = min(best, time.perf_counter() - started)
+        megabytes = len(text.encode("utf-8")) / 1e6
+        kinds = ", ".join(f"{kind} {count}" for kind, count in sorted(Counter(f["kind"] for f in facts).items()))
+        print(f"{name[:32]:<32} {megabytes:>6.2f} {best * 1000:>9.1f} {megabytes / best:>8.1f}  {kinds}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=1000, help="Pages in the generated policy")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per document; the best is reported")
+    parser.add_argument("--files", nargs="*", default=[], help="Existing PDF files to measure instead")
+    args = parser.parse_args()
+    
+    if args.files:
+        samples = [(os.path.basename(path), load_policy(path)) for path in args.files]
+    else:
+        samples = [(f"generated ({args.pages} pages)", build_policy(args.pages))]
+    run(samples, args.repeat)
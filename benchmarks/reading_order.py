@@ -0,0 +1,123 @@
+"""
+Compare reading-order reconstruction with pdfplumber's line-by-line text on single- and
+multi-column forms.
+
+Usage:
+    python -m benchmarks.reading_order [--pages 20] [--repeat 3] [--files path/to/a.pdf ...]
+
+Generates policy forms laid out in one, two and three columns (with a title and a closing
+paragraph across the page), reads every page with layout_page.extract_text() and with
+reading_order.page_text(), and reports the best time per page and whether each method
+returned the words in reading order. Given existing PDFs, only the timings and whether the
+two methods ordered the text differently are reported.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pdfplumber
+from fpdf import FPDF
+import reading_order as ro
+
+WORDS = (
+    "we will pay for direct and accidental loss to your covered auto including its equipment "
+    "minus any applicable deductible shown in the declarations this coverage does not apply "
+    "to any vehicle while used as a public or livery conveyance bodily injury property damage "
+    "insured person family member occupying premium limit of liability exclusions conditions"
+).split()
+
+def paragraph(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def build_form(path, pages, columns, seed=0):
+    """
+    Write a PDF of policy form pages laid out in the given number of columns.
+    
+    Returns:
+        list: The words of each page in reading order.
+    """
+    rng = random.Random(seed)
+    pdf = FPDF()
+    pdf.set_auto_page_break(False)
+    margin, gutter = 15, 8
+    column_width = (pdf.w - 2 * margin - gutter * (columns - 1)) / columns
+    expected = []
+    for page in range(pages):
+        pdf.add_page()
+        title = f"SECTION {page + 1} - PART A LIABILITY COVERAGE"
+        pdf.set_font("Arial", "B", 13)
+        pdf.set_xy(margin, 15)
+        pdf.cell(0, 8, title)
+        page_words = title.split()
+        
+        pdf.set_font("Arial", "", 9)
+        bottom = 0
+        for column in range(columns):
+            text = paragraph(rng, 900 // columns)
+            pdf.set_xy(margin + column * (column_width + gutter), 28)
+            pdf.multi_cell(column_width, 4.2, text)
+            bottom = max(bottom, pdf.get_y())
+            page_words += text.split()
+        
+        closing = paragraph(rng, 60)
+        pdf.set_xy(margin, bottom + 6)
+        pdf.multi_cell(pdf.w - 2 * margin, 4.2, closing)
+        expected.append(page_words + closing.split())
+    pdf.output(path)
+    return expected
+
+def time_page(method, layout_page, repeat):
+    """Best time of a text method over repeat runs; layout objects are dropped between runs."""
+    best = float("inf")
+    text = ""
+    for _ in range(repeat):
+        layout_page.close()
+        started = time.perf_counter()
+        text = method(layout_page)
+        best = min(best, time.perf_counter() - started)
+    return best, text
+
+def run(path, repeat, expected=None):
+    plain_seconds = ordered_seconds = 0.0
+    plain_correct = ordered_correct = differing = 0
+    with pdfplumber.open(path) as pdf:
+        for index, layout_page in enumerate(pdf.pages):
+            seconds, plain = time_page(lambda p: p.extract_text() or "", layout_page, repeat)
+            plain_seconds += seconds
+            seconds, ordered = time_page(ro.page_text, layout_page, repeat)
+            ordered_seconds += seconds
+            differing += plain.split() != ordered.split()
+            if expected is not None:
+                plain_correct += plain.split() == expected[index]
+                ordered_correct += ordered.split() == expected[index]
+        page_count = len(pdf.pages)
+    
+    result = (f"{page_count:>5} {plain_seconds / page_count * 1000:>12.1f} "
+              f"{ordered_seconds / page_count * 1000:>12.1f} ")
+    if expected is not None:
+        result += f"{plain_correct:>8}/{page_count:<4} {ordered_correct:>8}/{page_count:<4}"
+    else:
+        result += f"{differing:>10} pages reordered"
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20, help="Pages in each generated form")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per page; the best is reported")
+    parser.add_argument("--files", nargs="*", default=[], help="Existing PDF files to measure instead")
+    args = parser.parse_args()
+    
+    print(f"{'document':<24} {'pages':>5} {'plain ms/pg':>12} {'order ms/pg':>12} {'plain in order':>13} {'order in order':>13}")
+    if args.files:
+        for path in args.files:
+            print(f"{os.path.basename(path)[:24]:<24} {run(path, args.repeat)}")
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            for columns in (1, 2, 3):
+                path = os.path.join(directory, f"form-{columns}.pdf")
+                expected = build_form(path, args.pages, columns)
+                print(f"{f'{columns}-column form':<24} {run(path, args.repeat, expected)}")
@@ -0,0 +1,300 @@
+import os
+import json
+import hashlib
+import argparse
+import pypdfium2 as pdfium
+import table_extraction as te
+
+# Learned layouts of carriers' declarations pages, one JSON file per template
+TEMPLATE_DIR = os.getenv(
+    "INSURLIT_DECLARATIONS_TEMPLATE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+)
+PAGE_SIZE_TOLERANCE = 2.0  # Points a page's width and height may differ from the template's
+ANCHOR_TOLERANCE = 4.0  # Points an anchor may sit away from where the template expects it
+FIELD_PADDING = 1.0  # Points added around a learned field box
+PAGE_MARGIN = 36.0  # Points from the right page edge a field with nothing to its right extends to
+MAX_ANCHORS = 4
+ANCHOR_MIN_CHARS = 6
+ROW_TOLERANCE = 3.0  # Points within which text runs of one table row share their vertical centre
+
+def _normalize(text):
+    return " ".join(text.split()).casefold()
+
+def _load_templates():
+    """
+    Read every template in TEMPLATE_DIR.
+    
+    Returns:
+        tuple: (templates, version) where version is a digest of the template files, so
+        results read with an older set of templates are not reused.
+    """
+    templates = []
+    digest = hashlib.sha256()
+    try:
+        names = sorted(name for name in os.listdir(TEMPLATE_DIR) if name.endswith(".json"))
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        path = os.path.join(TEMPLATE_DIR, name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            template = json.loads(data)
+        except Exception as e:
+            print(f"Error reading declarations template {name}: {str(e)}")
+            continue
+        digest.update(data)
+        templates.append(template)
+    return templates, digest.hexdigest()[:12]
+
+TEMPLATES, TEMPLATES_VERSION = _load_templates()
+
+def match_template(page_text, page_width, page_height):
+    """
+    Pick the template a page is laid out by, from cheap page features: the page size and
+    every one of the template's anchor texts (printed labels) appearing in the page text.
+    
+    Returns:
+        dict | None: The template, or None if no template matches.
+    """
+    if not TEMPLATES:
+        return None
+    normalized = None
+    for template in TEMPLATES:
+        width, height = template["page_size"]
+        if abs(width - page_width) > PAGE_SIZE_TOLERANCE or abs(height - page_height) > PAGE_SIZE_TOLERANCE:
+            continue
+        if normalized is None:
+            normalized = _normalize(page_text)
+        if all(_normalize(anchor["text"]) in normalized for anchor in template["anchors"]):
+            return template
+    return None
+
+def _bounded_text(textpage, box, page_height, padding=0.0):
+    """Text of a pdfium text page inside a box given top-down as [x0, top, x1, bottom]."""
+    x0, top, x1, bottom = box
+    return textpage.get_text_bounded(x0 - padding, page_height - bottom - padding, x1 + padding, page_height - top + padding)
+
+def _table_rows(textpage, table, page_height):
+    """Read a template table's runs into rows and cells, and type them (see table_extraction.typed_rows)."""
+    x0, top, x1, bottom = table["box"]
+    kinds = list(table["columns"])
+    starts = [table["columns"][kind][0] for kind in kinds]
+    runs = []
+    for i in range(textpage.count_rects()):
+        left, run_bottom, right, run_top = textpage.get_rect(i)
+        middle = page_height - (run_bottom + run_top) / 2
+        if x0 <= left and right <= x1 + ANCHOR_TOLERANCE and top <= middle <= bottom:
+            runs.append((middle, left, textpage.get_text_bounded(left, run_bottom, right, run_top)))
+    
+    rows = []
+    for middle, left, text in sorted(runs):
+        if not rows or middle - rows[-1][0] > ROW_TOLERANCE:
+            rows.append([middle, [""] * len(kinds)])
+        column = max([j for j, start in enumerate(starts) if start <= left + ANCHOR_TOLERANCE] or [0])
+        cells = rows[-1][1]
+        cells[column] = " ".join((cells[column] + " " + text).split())
+    return te.typed_rows([kinds] + [cells for _, cells in rows])
+
+def read_page(template, page):
+    """
+    Read a declarations page's fields at the template's coordinates.
+    
+    The template's anchors are checked first: each must be printed where the template
+    expects it, give or take ANCHOR_TOLERANCE, or the page is not read.
+    
+    Args:
+        template (dict): The template picked by match_template.
+        page (pdfium.PdfPage): The open page.
+    
+    Returns:
+        dict | None: template (its name), fields (field name to a string, a float for money
+        fields or a list of lines) and schedule_rows (typed rows of the template's tables);
+        None if the anchors are not in place.
+    """
+    page_height = page.get_height()
+    textpage = page.get_textpage()
+    try:
+        for anchor in template["anchors"]:
+            if _normalize(anchor["text"]) not in _normalize(_bounded_text(textpage, anchor["box"], page_height, ANCHOR_TOLERANCE)):
+                return None
+        
+        fields = {}
+        for name, field in template["fields"].items():
+            text = _bounded_text(textpage, field["box"], page_height)
+            if field["type"] == "money":
+                fields[name] = te.parse_amount(text)
+            elif field["type"] == "lines":
+                fields[name] = [" ".join(line.split()) for line in text.splitlines() if line.strip()]
+            else:
+                fields[name] = " ".join(text.split()) or None
+        schedule_rows = []
+        for table in template.get("tables", []):
+            schedule_rows.extend(_table_rows(textpage, table, page_height))
+        return {"template": template["name"], "fields": fields, "schedule_rows": schedule_rows}
+    finally:
+        textpage.close()
+
+def field_facts(declarations):
+    """
+    Turn money fields read from declarations pages into premium and deductible facts (see
+    policy_facts), by field name: fields named like "premium" or "collision_deductible".
+    
+    Args:
+        declarations (list): document_info["declarations"] entries, each with page and fields.
+    """
+    facts = []
+    for entry in declarations:
+        for name, value in entry["fields"].items():
+            if not isinstance(value, float):
+                continue
+            label = name.replace("_", " ")
+            base = {
+                "text": f"{label.capitalize()}: ${value:,.2f}", "offset": None, "page": entry["page"],
+                "value": value, "source": "template"
+            }
+            if "premium" in name:
+                coverage = label.replace("premium", "").strip()
+                facts.append(dict(base, kind="premium", term="total" if coverage == "total" else None,
+                                  coverage=None if coverage in ("", "total") else coverage.title()))
+            elif "deductible" in name:
+                coverage = label.replace("deductible", "").strip()
+                facts.append(dict(base, kind="deductible", coverage=coverage.title() or None))
+    return facts
+
+def _char_box(textpage, index, page_height):
+    left, bottom, right, top = textpage.get_charbox(index)
+    return [left, page_height - top, right, page_height - bottom]
+
+def _locate(textpage, value, page_width, page_height):
+    """
+    Find a sample field value on a page and return the box it should be read from: the
+    value's own box, widened to the right up to the next text on its line so longer values
+    still fit.
+    """
+    searcher = textpage.search(value, match_case=True)
+    found = searcher.get_next()
+    searcher.close()
+    if not found:
+        raise ValueError(f"{value!r} is not on the page")
+    start, count = found
+    boxes = [_char_box(textpage, i, page_height) for i in range(start, start + count) if textpage.get_text_range(i, 1).strip()]
+    x0, top, x1, bottom = min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes)
+    right_limit = page_width - PAGE_MARGIN
+    for i in range(textpage.count_chars()):
+        left, char_top, _, char_bottom = _char_box(textpage, i, page_height)
+        if x1 + FIELD_PADDING < left < right_limit and char_top < bottom and top < char_bottom and textpage.get_text_range(i, 1).strip():
+            right_limit = left - FIELD_PADDING * 2
+    return [x0 - FIELD_PADDING, top - FIELD_PADDING, max(x1 + FIELD_PADDING, right_limit), bottom + FIELD_PADDING]
+
+def _page_runs(textpage, page_height):
+    """Text runs of a page as (top, bottom, left, right, text), top-down."""
+    runs = []
+    for i in range(textpage.count_rects()):
+        left, bottom, right, top = textpage.get_rect(i)
+        runs.append((page_height - top, page_height - bottom, left, right, " ".join(textpage.get_text_bounded(left, bottom, right, top).split())))
+    return sorted(runs)
+
+def _learn_tables(runs, page_width):
+    """Find schedule tables by their header line (see table_extraction) and learn their column positions and extent."""
+    lines = []
+    for run in runs:
+        if lines and abs((run[0] + run[1]) / 2 - (lines[-1][0][0] + lines[-1][0][1]) / 2) <= ROW_TOLERANCE:
+            lines[-1].append(run)
+        else:
+            lines.append([run])
+    
+    tables = []
+    for i, line in enumerate(lines):
+        line.sort(key=lambda run: run[2])
+        if not te._is_header_line(" ".join(run[4] for run in line)):
+            continue
+        columns = {}
+        for run in line:
+            kind = te._column_kind(run[4])
+            if kind and kind not in columns:
+                columns[kind] = run[2] - ANCHOR_TOLERANCE
+        kinds = sorted(columns, key=columns.get)
+        columns = {kind: [columns[kind], columns[kinds[j + 1]] if j + 1 < len(kinds) else page_width] for j, kind in enumerate(kinds)}
+        line_height = line[0][1] - line[0][0]
+        bottom = line[0][1]
+        for row in lines[i + 1:]:
+            if row[0][0] - bottom > line_height * te.ROW_MAX_GAP_RATIO or te._is_header_line(" ".join(run[4] for run in row)):
+                break
+            bottom = max(run[1] for run in row)
+        tables.append({"box": [min(start for start, _ in columns.values()), line[0][1], page_width, bottom], "columns": columns})
+    return tables
+
+def learn_template(pdf_path, page_number, name, field_values):
+    """
+    Learn a template from a sample declarations page.
+    
+    Args:
+        pdf_path (str): The sample PDF.
+        page_number (int): The declarations page, counted from 1.
+        name (str): Template name, e.g. the carrier and form edition.
+        field_values (dict): Field name to the value printed on the sample page. Values that
+            are dollar amounts become money fields; values of several lines (separated by
+            newlines) become lines fields.
+    
+    Returns:
+        dict: The template: page_size, anchors (printed labels with no digits, used to
+        recognize the layout), fields and tables (schedule tables found by their header line).
+    """
+    document = pdfium.PdfDocument(pdf_path)
+    try:
+        page = document[page_number - 1]
+        page_width, page_height = page.get_size()
+        textpage = page.get_textpage()
+        fields = {}
+        for field, value in field_values.items():
+            lines = [line.strip() for line in value.split("\n") if line.strip()]
+            boxes = [_locate(textpage, line, page_width, page_height) for line in lines]
+            # Each line is widened only up to the text on its right, so the narrowest keeps every line clear of it
+            box = [min(b[0] for b in boxes), min(b[1] for b in boxes), min(b[2] for b in boxes), max(b[3] for b in boxes)]
+            kind = "lines" if len(lines) > 1 else "money" if te.MONEY.fullmatch(lines[0]) else "text"
+            fields[field] = {"box": box, "type": kind}
+        
+        runs = _page_runs(textpage, page_height)
+        tables = _learn_tables(runs, page_width)
+        
+        def overlaps(run, box):
+            return run[2] < box[2] and box[0] < run[3] and run[0] < box[3] and box[1] < run[1]
+        
+        taken = [field["box"] for field in fields.values()] + [table["box"] for table in tables]
+        labels = [
+            run for run in runs
+            if len(run[4]) >= ANCHOR_MIN_CHARS and not any(c.isdigit() or c == "$" for c in run[4])
+            and not any(overlaps(run, box) for box in taken)
+        ]
+        labels = sorted(labels, key=lambda run: -len(run[4]))[:MAX_ANCHORS]
+        anchors = [{"text": run[4], "box": [run[2], run[0], run[3], run[1]]} for run in sorted(labels)]
+        textpage.close()
+        page.close()
+    finally:
+        document.close()
+    if not anchors:
+        raise ValueError("The page has no printed labels to recognize its layout by")
+    return {"name": name, "page_size": [page_width, page_height], "anchors": anchors, "fields": fields, "tables": tables}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Learn a declarations page template from a sample page and save it to TEMPLATE_DIR.",
+        epilog='Example: python declarations_templates.py dec.pdf --page 1 --name "Example Mutual PA 01-26" '
+               '--field named_insured="JANE Q SAMPLE" --field premium="$1,019.75"'
+    )
+    parser.add_argument("pdf", help="Sample PDF")
+    parser.add_argument("--page", type=int, default=1, help="Declarations page number")
+    parser.add_argument("--name", required=True, help="Template name")
+    parser.add_argument("--field", action="append", default=[], metavar="NAME=VALUE",
+                        help="A field and its value on the sample page; use \\n between the lines of a multi-line value")
+    args = parser.parse_args()
+    
+    values = dict(field.split("=", 1) for field in args.field)
+    template = learn_template(args.pdf, args.page, args.name, {k: v.replace("\\n", "\n") for k, v in values.items()})
+    os.makedirs(TEMPLATE_DIR, exist_ok=True)
+    path = os.path.join(TEMPLATE_DIR, "".join(c if c.isalnum() else "_" for c in args.name.casefold()) + ".json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(template, f, indent=2)
+    print(f"Saved {path}: {len(template['anchors'])} anchors, {len(template['fields'])} fields, {len(template['tables'])} tables")
@@ -0,0 +1,341 @@
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+import extraction_cache as ec
+
+# Index of processed documents, keyed by a fingerprint of their text, that lets a rescan or
+# re-export of a policy reuse the summary and answers produced for it before
+INDEX_DIR = os.getenv("INSURLIT_DOCUMENT_INDEX_DIR", os.path.join(tempfile.gettempdir(), "insurlit_documents"))
+# The least recently used entries are removed once the index passes this size, as in extraction_cache
+INDEX_MAX_BYTES = int(os.getenv("INSURLIT_DOCUMENT_INDEX_MAX_MB", "64")) * 1024 * 1024
+EVICT_CHECK_BYTES = INDEX_MAX_BYTES // 20
+# Signatures held in memory for lookups; those of the least recently used entries are dropped
+MEMORY_SIGNATURES = int(os.getenv("INSURLIT_DOCUMENT_INDEX_MEMORY_ENTRIES", "5000"))
+# Entries written by other processes are picked up at most this often
+REFRESH_SECONDS = 5
+# Share of MinHash values two documents must have in common, an estimate of the Jaccard
+# similarity of their word shingles. OCR misreading one character in a hundred scores about 0.7
+SIMILARITY_THRESHOLD = float(os.getenv("INSURLIT_SIMILARITY_THRESHOLD", "0.7"))
+SIGNATURE_SIZE = 128  # MinHash values per document
+SHINGLE_WORDS = 3
+MAX_ANSWERS = 200  # Answers kept per document and language level; the oldest are dropped
+# Facts that tell one policy from another (see policy_facts), since two policies of the same
+# carrier share almost all of their text. Documents must agree on the policy period and on
+# more than IDENTITY_MIN_AGREEMENT of the other kinds; a value read with one character
+# different, as OCR misreads a VIN digit or a cent, still agrees
+IDENTITY_KINDS = ("policy_period", "date", "vin", "vehicle", "premium")
+IDENTITY_MIN_AGREEMENT = 0.5
+WORD = re.compile(r"[a-z0-9]+")
+
+# Fixed seeds, so signatures computed by different processes and releases can be compared
+_seeds = np.random.default_rng(20261018)
+_MASKS = _seeds.integers(0, 2**64 - 1, SIGNATURE_SIZE, dtype=np.uint64, endpoint=True)
+_MULTIPLIERS = _seeds.integers(0, 2**64 - 1, SIGNATURE_SIZE, dtype=np.uint64, endpoint=True) | np.uint64(1)
+_SHINGLE_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9], dtype=np.uint64)
+
+_index_lock = threading.Lock()
+# Signatures and identities of the entries read so far, by document id, least recently used first
+_signatures = OrderedDict()
+_refreshed_at = None
+_newest_mtime = 0.0
+_written_since_check = 0
+
+def _word_hashes(text):
+    """64-bit hash of every word of a text, case folded, in text order."""
+    words = WORD.findall(text.casefold())
+    vocabulary = {word: int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big") for word in set(words)}
+    return np.fromiter((vocabulary[word] for word in words), dtype=np.uint64, count=len(words))
+
+def signature(text):
+    """
+    MinHash signature of a text's shingles (runs of SHINGLE_WORDS words).
+    
+    Page numbers, spacing and layout do not change the words, so a rescan or re-export of a
+    document keeps most shingles, and the share of equal values in two signatures estimates
+    the share of shingles the texts have in common.
+    
+    Returns:
+        numpy.ndarray: SIGNATURE_SIZE unsigned 64-bit values.
+    """
+    words = _word_hashes(text)
+    if len(words) < SHINGLE_WORDS:
+        words = np.concatenate((words, np.zeros(SHINGLE_WORDS - len(words), dtype=np.uint64)))
+    count = len(words) - SHINGLE_WORDS + 1
+    shingles = np.zeros(count, dtype=np.uint64)
+    for i in range(SHINGLE_WORDS):
+        shingles ^= words[i:i + count] * _SHINGLE_MULTIPLIERS[i]
+    shingles = np.unique(shingles)
+    
+    values = np.empty(SIGNATURE_SIZE, dtype=np.uint64)
+    for i in range(SIGNATURE_SIZE):
+        # One hash function per value: xor with a mask, multiply by an odd constant, then fold
+        # the high bits down so the minimum depends on every bit of the shingle
+        hashed = (shingles ^ _MASKS[i]) * _MULTIPLIERS[i]
+        values[i] = (hashed ^ (hashed >> np.uint64(29))).min()
+    return values
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of the texts two signatures were computed from."""
+    return float(np.mean(np.asarray(first, dtype=np.uint64) == np.asarray(second, dtype=np.uint64)))
+
+def _own_text(text, document_info):
+    """The text of a document's pages outside its numbered forms (see form_library): declarations, schedules, letters."""
+    form_pages = {
+        number for form in document_info.get("forms") or []
+        for number in range(form["first_page"], form["last_page"] + 1)
+    }
+    if not form_pages:
+        return text
+    return "\n".join(page["text"] for number, page in document_info["page_info"].items() if number not in form_pages)
+
+def _identity_value(fact):
+    """A fact's value spelled as a string, so misread values differ by a character or two."""
+    value = fact["value"]
+    if fact["kind"] == "policy_period":
+        return "/".join(str(date) for date in value)
+    if fact["kind"] == "date":
+        return f"{fact['label']}={value}"
+    if fact["kind"] == "vehicle":
+        return " ".join(str(part) for part in (value["year"], value["make"], value["model"]) if part)
+    if fact["kind"] == "premium":
+        return f"{value:.2f}"
+    return str(value)
+
+def identity(facts):
+    """
+    The facts of IDENTITY_KINDS, which tell one policy from another.
+    
+    Returns:
+        dict: Kind to the sorted list of its values, spelled as strings.
+    """
+    values = {}
+    for fact in facts:
+        if fact["kind"] in IDENTITY_KINDS:
+            values.setdefault(fact["kind"], set()).add(_identity_value(fact))
+    return {kind: sorted(kind_values) for kind, kind_values in values.items()}
+
+def _close(first, second):
+    """Whether two values are equal but for at most one misread character."""
+    return len(first) == len(second) and sum(a != b for a, b in zip(first, second)) <= 1
+
+def _values_agree(first, second):
+    return (all(any(_close(a, b) for b in second) for a in first)
+            and all(any(_close(a, b) for a in first) for b in second))
+
+def same_policy(first, second):
+    """
+    Whether two identities (see identity) may belong to the same policy.
+    
+    The policy periods must agree, and more than IDENTITY_MIN_AGREEMENT of the other kinds
+    found in either document; values agree when they differ by at most one character, so
+    a rescan with one fact misread or missed still matches.
+    """
+    if not _values_agree(first.get("policy_period", []), second.get("policy_period", [])):
+        return False
+    kinds = (set(first) | set(second)) - {"policy_period"}
+    if not kinds:
+        return True
+    agreeing = sum(_values_agree(first.get(kind, []), second.get(kind, [])) for kind in kinds)
+    return agreeing / len(kinds) > IDENTITY_MIN_AGREEMENT
+
+def document_fingerprint(text, document_info):
+    """
+    Fingerprint a document for the index.
+    
+    Two policies of one carrier share almost all of their text, the standard forms, so a
+    second signature covers the document's own pages alone, and the facts that tell one
+    policy from another are compared as well (see same_policy).
+    
+    Args:
+        text (str): The normalized extracted text.
+        document_info (dict): Document metadata with policy_facts, and forms and page_info
+            for documents with pages.
+    
+    Returns:
+        dict: signature and own_signature (see signature, as lists of ints; the second over
+        the pages outside numbered forms), identity (see identity) and id (a digest of all
+        three, shared by documents with the same text).
+    """
+    values = np.stack((signature(text), signature(_own_text(text, document_info))))
+    facts = identity(document_info["policy_facts"])
+    document_id = hashlib.sha256(values.tobytes() + json.dumps(facts, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+    return {
+        "id": document_id,
+        "signature": [int(value) for value in values[0]],
+        "own_signature": [int(value) for value in values[1]],
+        "identity": facts
+    }
+
+def _signature_pair(fingerprint):
+    return np.array([fingerprint["signature"], fingerprint["own_signature"]], dtype=np.uint64)
+
+def question_key(question):
+    """Spell a question one way, so rewordings in case, spacing and punctuation match."""
+    return " ".join(WORD.findall(question.casefold()))
+
+def _entry_path(document_id):
+    return os.path.join(INDEX_DIR, document_id + ".json")
+
+def _read_entry(document_id):
+    try:
+        with open(_entry_path(document_id), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error reading document index entry {document_id}: {str(e)}")
+        return None
+
+def _write_entry(entry):
+    """Write an entry, returning its size in bytes (0 if it could not be written)."""
+    try:
+        return ec.write_file(_entry_path(entry["id"]), lambda f: json.dump(entry, f), binary=False)
+    except Exception as e:
+        print(f"Error writing document index entry {entry['id']}: {str(e)}")
+        return 0
+
+def _remember(document_id, values, identity):
+    """Hold an entry's signatures for lookups, dropping the least recently used past MEMORY_SIGNATURES."""
+    _signatures[document_id] = (values, identity)
+    _signatures.move_to_end(document_id)
+    while len(_signatures) > MEMORY_SIGNATURES:
+        _signatures.popitem(last=False)
+
+def _refresh_signatures():
+    """
+    Read the signatures of entries written by other processes since the last refresh.
+    
+    The directory is listed at most every REFRESH_SECONDS, and only entries modified about
+    as recently as the newest one already read are opened; entries this process writes are
+    added as they are written (see _update_entry).
+    """
+    global _refreshed_at, _newest_mtime
+    if _refreshed_at is not None and time.monotonic() - _refreshed_at < REFRESH_SECONDS:
+        return
+    _refreshed_at = time.monotonic()
+    try:
+        items = list(os.scandir(INDEX_DIR))
+    except FileNotFoundError:
+        return
+    added = []
+    for item in items:
+        document_id, extension = os.path.splitext(item.name)
+        if extension != ".json" or document_id in _signatures:
+            continue
+        try:
+            mtime = item.stat().st_mtime
+        except OSError:
+            continue
+        # Entries are renamed into place after they are written, so one may show up with a
+        # modification time a little older than entries read before it
+        if mtime >= _newest_mtime - REFRESH_SECONDS:
+            added.append((mtime, document_id))
+    # Oldest first, so the most recently used entries are the ones kept in memory
+    for mtime, document_id in sorted(added):
+        entry = _read_entry(document_id)
+        # Entries of releases that kept a digest of the identity facts cannot be compared
+        if entry is not None and isinstance(entry.get("identity"), dict):
+            _remember(document_id, _signature_pair(entry), entry["identity"])
+        _newest_mtime = max(_newest_mtime, mtime)
+
+def _evict():
+    """Remove the least recently used entries once the index passes INDEX_MAX_BYTES."""
+    for path in ec.evict_files(INDEX_DIR, INDEX_MAX_BYTES, ".json"):
+        _signatures.pop(os.path.splitext(os.path.basename(path))[0], None)
+
+def find_similar(document_info):
+    """
+    Find the indexed document most similar to this one.
+    
+    Only documents that may be the same policy (see same_policy) are considered,
+    and both their whole text and their own pages must have a similarity of at least
+    SIMILARITY_THRESHOLD; the document itself, if indexed, is the best match.
+    
+    Args:
+        document_info (dict): Document metadata with the fingerprint set at extraction.
+    
+    Returns:
+        dict | None: The entry, with summaries (language level to summary), answers
+        (language level to question key to answer) and similarity (the lower of the two), or None.
+    """
+    fingerprint = (document_info or {}).get("fingerprint")
+    if fingerprint is None:
+        return None
+    with _index_lock:
+        _refresh_signatures()
+        candidates = [
+            (document_id, values) for document_id, (values, facts) in _signatures.items()
+            if same_policy(facts, fingerprint["identity"])
+        ]
+    if not candidates:
+        return None
+    
+    scores = (np.stack([candidate for _, candidate in candidates]) == _signature_pair(fingerprint)).mean(axis=2).min(axis=1)
+    best = int(np.argmax(scores))
+    if scores[best] < SIMILARITY_THRESHOLD:
+        return None
+    document_id = candidates[best][0]
+    entry = _read_entry(document_id)
+    if entry is None:
+        # Removed by another process's eviction
+        with _index_lock:
+            _signatures.pop(document_id, None)
+        return None
+    try:
+        # Refresh the modification time so eviction treats this entry as recently used
+        os.utime(_entry_path(document_id))
+    except OSError:
+        pass
+    with _index_lock:
+        if document_id in _signatures:
+            _signatures.move_to_end(document_id)
+    entry["similarity"] = float(scores[best])
+    return entry
+
+def _update_entry(document_info, update):
+    """Apply update to the document's own entry, creating it on first use, and write it back."""
+    global _written_since_check
+    fingerprint = (document_info or {}).get("fingerprint")
+    if fingerprint is None:
+        return
+    with _index_lock:
+        entry = _read_entry(fingerprint["id"]) or dict(fingerprint, summaries={}, answers={})
+        update(entry)
+        written = _write_entry(entry)
+        if not written:
+            return
+        _remember(entry["id"], _signature_pair(entry), entry["identity"])
+        # Checked after EVICT_CHECK_BYTES rather than every write, as in extraction_cache
+        _written_since_check += written
+        if _written_since_check >= EVICT_CHECK_BYTES:
+            _written_since_check = 0
+            _evict()
+
+def store_summary(document_info, readability_preference, summary):
+    """
+    Index a document's summary, for reuse by near-duplicates of it (see find_similar).
+    
+    Args:
+        document_info (dict): Document metadata with the fingerprint set at extraction.
+        readability_preference (str): The summary language level.
+        summary (dict): The summary sections written by the model.
+    """
+    def update(entry):
+        entry["summaries"][readability_preference] = summary
+    _update_entry(document_info, update)
+
+def store_answer(document_info, readability_preference, question, answer):
+    """Index the answer to a question about a document, for reuse by near-duplicates of it."""
+    def update(entry):
+        answers = entry["answers"].setdefault(readability_preference, {})
+        answers.pop(question_key(question), None)
+        answers[question_key(question)] = answer
+        while len(answers) > MAX_ANSWERS:
+            del answers[next(iter(answers))]
+    _update_entry(document_info, update)
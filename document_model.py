@@ -0,0 +1,118 @@
+import bisect
+from array import array
+from collections.abc import Mapping
+
+# Per-page metadata kept alongside the shared text buffer; the page text itself is never stored
+PAGE_FIELDS = (
+    "headers", "heading_levels", "headings", "tier", "tier_reason", "extract_seconds",
+    "ocr_confidence", "ocr_status", "source_file", "source_page", "source_frame", "page_class", "offset_map"
+)
+
+class Page(Mapping):
+    """
+    One page of a Document. Reads like the page_info dict it replaces: page["text"] and
+    page.get("headers") work as before, but the text is sliced from the document on access.
+    """
+    __slots__ = ("document", "number") + PAGE_FIELDS
+    
+    def __init__(self, document, number, record):
+        self.document = document
+        self.number = number
+        for field in PAGE_FIELDS:
+            if field in record:
+                setattr(self, field, record[field])
+    
+    @property
+    def offset(self):
+        """Character offset of the page within the document text."""
+        return self.document.page_starts[self.number - 1]
+    
+    @property
+    def text(self):
+        return self.document.text[self.offset:self.document.page_ends[self.number - 1]]
+    
+    def __getitem__(self, key):
+        if key == "text":
+            return self.text
+        if key == "offset":
+            return self.offset
+        if key in PAGE_FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+    
+    def __iter__(self):
+        yield "text"
+        yield "offset"
+        for field in PAGE_FIELDS:
+            if hasattr(self, field):
+                yield field
+    
+    def __len__(self):
+        return sum(1 for _ in self)
+    
+    def __repr__(self):
+        return f"<Page {self.number} of {len(self.document.pages)}>"
+
+class Document:
+    """
+    A document held as one text buffer plus an array of page start and end offsets.
+    
+    Page objects keep only their metadata, so each page's text exists once, inside the
+    text that is also handed to the rest of the app as extracted_text.
+    """
+    __slots__ = ("text", "page_starts", "page_ends", "pages")
+    
+    def __init__(self, text, page_records):
+        self.text = text
+        self.page_starts = array("q")
+        self.page_ends = array("q")
+        self.pages = []
+        for number, record in enumerate(page_records, 1):
+            self.page_starts.append(record["offset"])
+            self.page_ends.append(record["offset"] + len(record["text"]))
+            self.pages.append(Page(self, number, record))
+    
+    def page_at(self, offset):
+        """Return the page holding a character offset of the text, or None if it is out of range."""
+        index = bisect.bisect_right(self.page_starts, offset) - 1
+        if index < 0 or offset >= len(self.text):
+            return None
+        return self.pages[index]
+
+class PageInfo(Mapping):
+    """
+    Read-only view of a Document in the shape of the old document_info["page_info"]
+    dictionary: page numbers mapping to page records.
+    """
+    __slots__ = ("document",)
+    
+    def __init__(self, document):
+        self.document = document
+    
+    def __getitem__(self, number):
+        if not isinstance(number, int) or not 1 <= number <= len(self.document.pages):
+            raise KeyError(number)
+        return self.document.pages[number - 1]
+    
+    def __iter__(self):
+        return iter(range(1, len(self.document.pages) + 1))
+    
+    def __len__(self):
+        return len(self.document.pages)
+
+def compact_page_info(extracted_text, page_info):
+    """
+    Replace a page_info dictionary with a view over a compact Document.
+    
+    Args:
+        extracted_text (str): The full document text; page offsets must point into it.
+        page_info (dict): Page number to page record, as built by the extractors.
+    
+    Returns:
+        PageInfo: A drop-in replacement for page_info that shares extracted_text instead of
+        keeping a second copy of every page.
+    """
+    return PageInfo(Document(extracted_text, [page_info[number] for number in sorted(page_info)]))
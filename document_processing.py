@@ -1,101 +1,1304 @@
 import os
 import io
+import time
 import tempfile
-from PIL import Image
-import pytesseract
+import threading
+import ctypes
+import struct
+import hashlib
+import zipfile
+import multiprocessing
+from contextlib import ExitStack
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from PIL import Image, ImageSequence
 import pdfplumber
-import docx
+import pypdfium2 as pdfium
 import streamlit as st
+import extraction_cache as ec
+import image_preprocessing as ip
+import ocr_engine as oe
+import docx_extraction as dx
+import upload_handling as uh
+import header_detection as hd
+import section_index as si
+import text_normalization as tn
+import document_model as dm
+import extraction_budget as eb
+import table_extraction as te
+import policy_facts as pf
+import reading_order as ro
+import form_library as fl
+import declarations_templates as dt
+import document_index as di
+import page_triage as pt
 
-def extract_text_from_pdf(file_content):
+# Bump whenever extraction output changes so cached results from older extractors are ignored
+EXTRACTOR_VERSION = "25"
+
+# Size of the process pool used for large PDFs; set INSURLIT_PDF_WORKERS=1 to always extract serially
+PDF_WORKERS = int(os.getenv("INSURLIT_PDF_WORKERS", str(min(os.cpu_count() or 1, 4))))
+# Below this page count pool startup and IPC cost more than parallel extraction saves,
+# since most pages take only a few milliseconds on the raw text tier
+PARALLEL_MIN_PAGES = int(os.getenv("INSURLIT_PARALLEL_MIN_PAGES", "64"))
+
+# Quality thresholds for accepting a page's raw text layer without layout analysis
+GARBLED_MAX_RATIO = 0.02  # Share of visible characters that are unreadable
+GARBLED_MIN_LETTER_RATIO = 0.4  # Share of visible characters that are letters
+TABLE_MIN_PATHS = 12  # Vector paths (ruling lines, cell borders) that suggest a table
+COLUMN_GAP_RATIO = 0.03  # Minimum gutter width as a share of the page width
+COLUMN_MIN_LINES = 8
+COLUMN_MIN_SPLIT_RATIO = 0.25  # Share of lines split by a gutter across the page middle
+
+# Scanned pages are OCR'd on a bounded pool of Tesseract workers within a per-document time budget
+OCR_WORKERS = int(os.getenv("INSURLIT_OCR_WORKERS", str(min(os.cpu_count() or 1, 4))))
+OCR_TIME_BUDGET = float(os.getenv("INSURLIT_OCR_BUDGET_SECONDS", "120"))
+OCR_DPI = 300
+# Pages rendered and waiting for or in OCR at once; each holds a page bitmap (about 25 MB at
+# OCR_DPI), so later pages are rendered only as earlier ones finish
+OCR_MAX_IN_FLIGHT = 2 * OCR_WORKERS
+OCR_MIN_TEXT_CHARS = 20  # Image pages with less text than this are treated as scanned
+
+# pdfplumber runs on helper threads so a runaway page can be abandoned at its time limit
+LAYOUT_WORKERS = int(os.getenv("INSURLIT_LAYOUT_WORKERS", "4"))
+CANCEL_POLL_SECONDS = 0.2  # How often waits check whether the extraction was cancelled
+# OCR statuses of pages whose text could not be read in time
+OCR_SKIP_STATUSES = ("budget_exceeded", "page_timeout", "cancelled")
+# Tier reasons of pages that kept their raw text because layout analysis was cut short
+LAYOUT_SKIP_REASONS = ("layout_timeout", "layout_cancelled")
+
+# Page record fields kept in document_info["page_info"]
+PAGE_INFO_KEYS = (
+    "text", "headers", "heading_levels", "headings", "offset", "tier", "tier_reason", "extract_seconds",
+    "ocr_confidence", "ocr_status", "source_file", "source_frame", "schedule_rows", "declarations", "page_class", "reused"
+)
+# Fields of a finished PDF page cached under its fingerprint, and the version they are keyed with
+PAGE_CACHE_KEYS = (
+    "text", "headers", "headings", "tier", "tier_reason", "schedule_rows", "declarations", "page_class",
+    "ocr_confidence", "ocr_status"
+)
+PAGE_CACHE_VERSION = f"{EXTRACTOR_VERSION}:page:{ip.DEFAULT_PROFILE}:{dt.TEMPLATES_VERSION}"
+
+# Uploads of several images are extracted as one document with this type
+IMAGE_BATCH_TYPE = "image/batch"
+IMAGE_TYPES = ["image/png", "image/jpeg", "image/jpg", "image/tiff"]
+
+# Several files that are not all images, or the files of a ZIP archive, are merged into one
+# document with this type; its files are extracted on up to BUNDLE_WORKERS threads
+BUNDLE_TYPE = "application/x-insurlit-bundle"
+BUNDLE_WORKERS = int(os.getenv("INSURLIT_BUNDLE_WORKERS", "4"))
+ZIP_TYPES = ["application/zip", "application/x-zip-compressed", "application/x-zip"]
+# Limits on what a ZIP archive may unpack to, so a small upload cannot expand without bound
+BUNDLE_MAX_FILES = int(os.getenv("INSURLIT_BUNDLE_MAX_FILES", "50"))
+BUNDLE_MAX_MB = int(os.getenv("INSURLIT_BUNDLE_MAX_MB", "500"))
+# Types of the files read from a ZIP archive, by extension; other files are skipped
+ARCHIVE_MEMBER_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".txt": "text/plain",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".tif": "image/tiff",
+    ".tiff": "image/tiff"
+}
+
+# Appended after every page's text in the full extracted text
+PAGE_SEPARATOR = "\n\n"
+
+_pdf_pool = None
+_ocr_pool = None
+_layout_pool = None
+# pdfium is not thread-safe and Streamlit serves each session from its own thread
+_pdfium_lock = threading.Lock()
+
+def _find_headers(page_text):
+    """Pick likely section headers out of the first few lines of a page that has no font information (OCR text)."""
+    lines = page_text.split('\n')
+    headers = []
+    
+    for line in lines[:5]:  # Check first few lines for potential headers
+        # Simple heuristic for headers: short lines with capitalized words or all caps
+        if len(line.strip()) < 50 and (any(word.isupper() for word in line.split()) or line.isupper()):
+            headers.append(line.strip())
+    
+    return headers
+
+def _fast_text_problem(text, rects, page_width, path_count):
     """
-    Extract text from PDF files with page numbers and potential section titles.
+    Decide whether the raw text layer of a page is good enough to use as-is.
+    
+    Args:
+        text (str): Text read straight from the page's content stream.
+        rects (list): (left, bottom, right, top) boxes of the page's text runs.
+        page_width (float): Page width in PDF points.
+        path_count (int): Number of vector path objects (rules, boxes) on the page.
     
     Returns:
-        tuple: (extracted_text, page_info)
-            - extracted_text: The full text content
-            - page_info: Dictionary mapping page numbers to text content and possible headers
+        str | None: The reason to escalate to layout analysis ("garbled", "tables",
+        "multi_column"), or None if the raw text can be used.
     """
-    text = ""
-    page_info = {}
+    visible = len(text) - sum(text.count(c) for c in " \n\t")
+    if visible == 0:
+        # Layout analysis cannot recover text from a page without a text layer
+        return None
+    
+    unreadable = sum(1 for c in text if c == "\ufffd" or not (c.isprintable() or c.isspace()))
+    letters = sum(1 for c in text if c.isalpha())
+    if unreadable / visible > GARBLED_MAX_RATIO:
+        return "garbled"
+    
+    if path_count >= TABLE_MIN_PATHS:
+        return "tables"
+    
+    if letters / visible < GARBLED_MIN_LETTER_RATIO:
+        return "garbled"
+    
+    # Group text runs into lines and count lines that have runs on both sides of a gap
+    # straddling the middle of the page, which is what a two-column layout looks like
+    lines = {}
+    for left, bottom, right, top in rects:
+        lines.setdefault(round((bottom + top) / 4), []).append((left, right))
+    middle = page_width / 2
+    split_lines = 0
+    for runs in lines.values():
+        runs.sort()
+        for (_, prev_right), (next_left, _) in zip(runs, runs[1:]):
+            if prev_right < middle < next_left and next_left - prev_right > page_width * COLUMN_GAP_RATIO:
+                split_lines += 1
+                break
+    if len(lines) >= COLUMN_MIN_LINES and split_lines / len(lines) >= COLUMN_MIN_SPLIT_RATIO:
+        return "multi_column"
+    
+    return None
+
+def _extract_fast_text(page):
+    """
+    Read a pdfium page's raw text layer without any layout analysis.
+    
+    Returns:
+        tuple: (page_text, problem, image_count, spans, fingerprint) where problem is the
+        reason the text needs layout analysis, or None, image_count is the number of images
+        drawn on the page, spans is the font span table used for heading detection (None when
+        there is a problem) and fingerprint is a hex digest of what the page draws: its text
+        layer, the text run boxes, and the position of every path and the raw data of every image.
+    """
+    fingerprint = hashlib.sha256()
+    path_count = 0
+    image_count = 0
+    for obj in page.get_objects(filter=[pdfium.raw.FPDF_PAGEOBJ_PATH, pdfium.raw.FPDF_PAGEOBJ_IMAGE]):
+        if obj.type == pdfium.raw.FPDF_PAGEOBJ_IMAGE:
+            image_count += 1
+            try:
+                # The still-compressed image data: a rescanned page changes the fingerprint without being decoded
+                fingerprint.update(obj.get_data(decode_simple=False))
+            except pdfium.PdfiumError:
+                pass
+        else:
+            path_count += 1
+        fingerprint.update(struct.pack("4f", *obj.get_bounds()))
+    textpage = page.get_textpage()
+    try:
+        raw_text = textpage.get_text_range()
+        rects = [textpage.get_rect(i) for i in range(textpage.count_rects())]
+        fingerprint.update(raw_text.encode("utf-8", "surrogatepass"))
+        fingerprint.update(struct.pack(f"{4 * len(rects)}f", *(value for rect in rects for value in rect)))
+        page_text = "\n".join(line.rstrip() for line in raw_text.replace("\r\n", "\n").replace("\r", "\n").split("\n"))
+        problem = _fast_text_problem(page_text, rects, page.get_width(), path_count)
+        # Pages headed for layout analysis get their spans from pdfplumber instead
+        spans = None if problem else hd.pdfium_spans(textpage, raw_text, rects, page.get_height())
+    finally:
+        textpage.close()
+    return page_text, problem, image_count, spans, fingerprint.hexdigest()
+
+def _fast_spans(page):
+    """The font span table of a pdfium page's raw text layer, for pages that keep it despite a problem."""
+    textpage = page.get_textpage()
+    try:
+        raw_text = textpage.get_text_range()
+        rects = [textpage.get_rect(i) for i in range(textpage.count_rects())]
+        return hd.pdfium_spans(textpage, raw_text, rects, page.get_height())
+    finally:
+        textpage.close()
+
+def _pdfium_input(source):
+    """
+    Hand pdfium a PDF without copying it.
+    
+    Paths are opened by pdfium itself; in-memory uploads are shared through a ctypes view
+    over their buffer. Other streams are read into bytes as a last resort.
+    """
+    if isinstance(source, str):
+        return source
+    if hasattr(source, "getbuffer"):
+        buffer = source.getbuffer()
+        return (ctypes.c_char * buffer.nbytes).from_buffer(buffer)
+    source.seek(0)
+    return source.read()
+
+def _layout_input(source, private=False):
+    """
+    Hand pdfplumber a PDF source: a path, or the stream itself rewound to the start.
+    
+    With private set, in-memory sources get a stream of their own, for when an abandoned
+    pdfplumber instance may still be reading the shared one.
+    """
+    if isinstance(source, str):
+        return source
+    if private:
+        # BytesIO shares the bytes returned by getvalue() rather than copying them
+        if hasattr(source, "getvalue"):
+            return io.BytesIO(source.getvalue())
+        source.seek(0)
+        return io.BytesIO(source.read())
+    source.seek(0)
+    return source
+
+def _get_layout_pool():
+    """Lazily create the thread pool that runs pdfplumber layout analysis."""
+    global _layout_pool
+    if _layout_pool is None:
+        _layout_pool = ThreadPoolExecutor(max_workers=LAYOUT_WORKERS, thread_name_prefix="insurlit-layout")
+    return _layout_pool
+
+def _extract_layout_page(layout_pdf, index, multi_column=False):
+    """
+    Layout pool task: read one page with pdfplumber.
+    
+    Pages flagged as multi_column are read column by column (see reading_order) instead of
+    line by line across the page, which would interleave the columns.
+    
+    Returns:
+        tuple: (page_text, spans, schedule_rows) where schedule_rows are the typed rows of any
+        coverage schedule tables on the page (see table_extraction), looked for only when the
+        page text suggests one.
+    """
+    layout_page = layout_pdf.pages[index]
+    try:
+        page_text = (ro.page_text(layout_page) if multi_column else layout_page.extract_text()) or ""
+        schedule_rows = te.find_schedule_rows(layout_page) if te.likely_schedule_page(page_text) else []
+        return page_text, hd.plumber_spans(layout_page.chars), schedule_rows
+    finally:
+        # Drop the page's cached layout objects so memory stays flat across a range
+        layout_page.close()
+
+def _extract_layout_tables(layout_pdf, index):
+    """Layout pool task: find the schedule tables of a page whose text came from the fast tier."""
+    layout_page = layout_pdf.pages[index]
+    try:
+        return te.find_schedule_rows(layout_page)
+    finally:
+        # Drop the page's cached layout objects so memory stays flat across a range
+        layout_page.close()
+
+def _wait_for(future, timeout, budget):
+    """
+    Wait up to timeout seconds for a future, giving up early if the extraction is cancelled.
     
-    with pdfplumber.open(file_content) as pdf:
-        for i, page in enumerate(pdf.pages, 1):
-            page_text = page.extract_text() or ""
-            text += page_text + "\n\n"
+    Returns:
+        tuple: (result, None) on success, or (None, reason) with reason "cancelled" or "timeout".
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            return future.result(timeout=max(0, min(remaining, CANCEL_POLL_SECONDS))), None
+        except FutureTimeoutError:
+            if budget.cancelled():
+                return None, "cancelled"
+            if remaining <= CANCEL_POLL_SECONDS:
+                return None, "timeout"
+
+def _skipped_page(index, reason):
+    """Page result for a page that was not extracted because the extraction stopped early."""
+    return {
+        "page_index": index,
+        "text": "",
+        "headers": [],
+        "headings": [],
+        "tier": "skipped",
+        "tier_reason": reason,
+        "needs_ocr": False,
+        "extract_seconds": 0.0
+    }
+
+def _iter_pdf_page_range(source, start, end, budget=None):
+    """
+    Extract pages [start, end) of a PDF, yielding one page result dict per page.
+    
+    The source is a file path or an in-memory stream; neither is copied.
+    
+    Every page is first read from its raw text layer through pdfium and classified (see
+    page_triage): blank pages, blank scans, cover letters, privacy notices and signature
+    pages keep their raw text, with page_class and the reason in tier_reason, and skip
+    everything below. Pages that fail the
+    quality checks in _fast_text_problem are re-extracted with pdfplumber's layout analysis.
+    Image-only pages are returned with needs_ocr set so the caller can OCR them.
+    Headings are ranked from the font metrics of whichever tier produced the text.
+    
+    Pages whose text looks like a declarations schedule (see table_extraction) are also
+    run through pdfplumber's table finder, and their typed rows returned as schedule_rows.
+    Declarations pages laid out by a known carrier template (see declarations_templates)
+    are read at the template's coordinates instead: their fields are returned as
+    declarations and their tables as schedule_rows, and they keep their raw text without
+    layout analysis or the table finder.
+    
+    Each page's fingerprint (see _extract_fast_text) keys a per-page cache: a page drawn
+    exactly like one extracted before is returned from it with reused set, skipping layout
+    analysis, table finding and OCR. iter_pdf_pages stores newly extracted pages.
+    
+    Layout analysis that runs past the budget's page timeout, or is cancelled, is abandoned
+    and the page keeps its raw text (tier_reason "layout_timeout" or "layout_cancelled"). Once the budget is cancelled or its deadline
+    passes, the remaining pages are returned as skipped.
+    """
+    budget = budget or eb.ExtractionBudget()
+    with _pdfium_lock:
+        document = pdfium.PdfDocument(_pdfium_input(source))
+    layout_pdf = None
+    layout_private = False
+    
+    def run_layout(task, index, *args):
+        """Run a layout pool task on a page; returns (result, None) or (None, "timeout"/"cancelled")."""
+        nonlocal layout_pdf, layout_private
+        # Only open the document with pdfplumber once a page actually needs it
+        if layout_pdf is None:
+            layout_pdf = pdfplumber.open(_layout_input(source, layout_private))
+        future = _get_layout_pool().submit(task, layout_pdf, index, *args)
+        result, stopped = _wait_for(future, budget.page_timeout(), budget)
+        if stopped:
+            # pdfplumber cannot be interrupted: let the page finish in the background and
+            # close its instance once it does
+            future.add_done_callback(lambda _, abandoned=layout_pdf: abandoned.close())
+            layout_pdf = None
+            layout_private = True
+        return result, stopped
+    
+    try:
+        for index in range(start, end):
+            reason = budget.stop_reason()
+            if reason:
+                yield _skipped_page(index, reason)
+                continue
             
-            # Try to identify section headers
-            lines = page_text.split('\n')
-            headers = []
+            started = time.perf_counter()
+            with _pdfium_lock:
+                page = document[index]
+                page_text, problem, image_count, spans, fingerprint = _extract_fast_text(page)
+                page_height = page.get_height()
+                page_class, class_reason = pt.classify_page(page, page_text, image_count)
+                # Matching is a size check and a few substring tests, so every readable page is tried
+                template = (
+                    dt.match_template(page_text, page.get_width(), page_height)
+                    if page_class == "full" and problem != "garbled" else None
+                )
+                declarations = dt.read_page(template, page) if template else None
+                if declarations and spans is None:
+                    # The raw text is kept, so its headings come from the raw text layer too
+                    spans = _fast_spans(page)
+                page.close()
             
-            for line in lines[:5]:  # Check first few lines for potential headers
-                # Simple heuristic for headers: short lines with capitalized words or all caps
-                if len(line.strip()) < 50 and (any(word.isupper() for word in line.split()) or line.isupper()):
-                    headers.append(line.strip())
+            # A page drawn exactly like one extracted before (e.g. last term's policy) reuses
+            # that result instead of being laid out or OCR'd again
+            page_key = ec.content_key(fingerprint.encode("ascii"), PAGE_CACHE_VERSION)
+            cached = ec.get(page_key, memory=False)
+            if cached is not None:
+                yield dict(cached, page_index=index, page_key=page_key, reused=True, needs_ocr=False,
+                           extract_seconds=time.perf_counter() - started)
+                continue
             
-            page_info[i] = {
+            tier = "fast"
+            schedule_rows = []
+            needs_ocr = page_class == "full" and image_count > 0 and len(page_text.strip()) < OCR_MIN_TEXT_CHARS
+            if page_class != "full":
+                # Nothing to read, or boilerplate the summary leaves out: no layout
+                # analysis, table finding or OCR
+                problem = class_reason
+                spans = None
+            elif needs_ocr:
+                # A scanned page: whatever text layer it has is at most a stamped footer
+                tier = "ocr"
+                problem = "no_text_layer"
+            elif declarations:
+                # A known layout: the template has read the tables, and the raw text of a
+                # declarations form reads row by row as layout analysis would give it
+                problem = None
+                schedule_rows = declarations.pop("schedule_rows")
+            elif problem:
+                layout_result, stopped = run_layout(_extract_layout_page, index, problem == "multi_column")
+                if stopped:
+                    # Keep the raw text layer instead
+                    problem = "layout_timeout" if stopped == "timeout" else "layout_cancelled"
+                else:
+                    page_text, spans, schedule_rows = layout_result
+                    tier = "layout"
+            elif te.likely_schedule_page(page_text):
+                # The raw text is fine, but its tables are worth reading as rows; a table
+                # finder that overruns only costs the rows
+                found, _ = run_layout(_extract_layout_tables, index)
+                schedule_rows = found or []
+            
+            headings = hd.rank_headings(spans, page_text, page_height) if tier != "ocr" and spans else []
+            yield {
+                "page_index": index,
                 "text": page_text,
-                "headers": headers
+                "headers": hd.headers_in_page_order(headings),
+                "headings": headings,
+                "tier": tier,
+                "tier_reason": problem,
+                "schedule_rows": schedule_rows,
+                "declarations": declarations,
+                "page_class": page_class,
+                "page_key": page_key,
+                "reused": False,
+                "needs_ocr": needs_ocr,
+                "extract_seconds": time.perf_counter() - started
             }
+    finally:
+        if layout_pdf is not None:
+            layout_pdf.close()
+        with _pdfium_lock:
+            document.close()
+
+def _extract_pdf_page_range(path, start, end, time_budget, page_time_limit):
+    """
+    Process pool entry point: open the PDF file independently and extract pages [start, end).
     
+    Args:
+        time_budget (float): Seconds left for the whole document when the range was queued.
+        page_time_limit (float): Seconds allowed for any one page.
+    
+    Returns:
+        list: One page result dict per page, in page order.
+    """
+    budget = eb.ExtractionBudget(time_budget=time_budget, page_time_limit=page_time_limit)
+    return list(_iter_pdf_page_range(path, start, end, budget))
+
+def _get_pdf_pool():
+    """Lazily create the process pool shared by every parallel PDF extraction."""
+    global _pdf_pool
+    if _pdf_pool is None:
+        # Spawn rather than fork: the Streamlit server is multi-threaded
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pdf_pool
+
+def _iter_pdf_pages_parallel(path, page_count, workers, budget):
+    """Split the document into page ranges, extract them across the pool and yield results in page order."""
+    # Several ranges per worker keeps the pool busy when some pages are much slower than others
+    chunk_count = min(page_count, workers * 4)
+    chunk_size = -(-page_count // chunk_count)
+    starts = range(0, page_count, chunk_size)
+    ends = [min(start + chunk_size, page_count) for start in starts]
+    
+    pool = _get_pdf_pool()
+    futures = [
+        pool.submit(_extract_pdf_page_range, path, start, end, budget.remaining(), budget.page_time_limit)
+        for start, end in zip(starts, ends)
+    ]
+    try:
+        for future, start, end in zip(futures, starts, ends):
+            reason = budget.stop_reason()
+            if reason is None:
+                results, reason = _wait_for(future, budget.remaining(), budget)
+                if reason == "timeout":
+                    reason = "document_timeout"
+            if reason:
+                future.cancel()
+                results = [_skipped_page(index, reason) for index in range(start, end)]
+            yield from results
+    finally:
+        for future in futures:
+            future.cancel()
+
+def _get_ocr_pool():
+    """Lazily create the bounded thread pool that runs Tesseract for scanned pages."""
+    global _ocr_pool
+    if _ocr_pool is None:
+        # Threads are enough: Tesseract releases the GIL or runs in its own subprocess
+        _ocr_pool = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="insurlit-ocr")
+    return _ocr_pool
+
+def _render_pdf_page(document, index):
+    """Rasterize one page of an open pdfium document to a grayscale PIL image for OCR."""
+    with _pdfium_lock:
+        page = document[index]
+        bitmap = page.render(scale=OCR_DPI / 72, grayscale=True)
+        image = bitmap.to_pil()
+        page.close()
+    return image
+
+def _ocr_page(image, deadline, dpi=None, profile=None, budget=None):
+    """
+    OCR pool task: read one page image within whatever is left of the document's OCR budget,
+    and within the budget's per-page time limit.
+    """
+    if budget is not None and budget.cancelled():
+        return "", None, "cancelled", 0.0
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return "", None, "budget_exceeded", 0.0
+    timeout = min(remaining, budget.page_time_limit) if budget is not None else remaining
+    started = time.perf_counter()
+    try:
+        image = ip.preprocess_image(image, profile, dpi)
+        text, confidence = oe.read_text(image, timeout=timeout)
+    except oe.OCRTimeoutError:
+        return "", None, "page_timeout" if timeout < remaining else "budget_exceeded", time.perf_counter() - started
+    except Exception as e:
+        print(f"Error running OCR on page image: {str(e)}")
+        return "", None, "failed", time.perf_counter() - started
+    return text, confidence, "ok", time.perf_counter() - started
+
+def _with_ocr(pages, source, budget):
+    """
+    Fill in OCR text for scanned pages while the remaining pages are still being extracted.
+    
+    Pages needing OCR are rasterized and queued on the OCR pool as soon as they are seen,
+    up to OCR_MAX_IN_FLIGHT at once; results are yielded in page order once each page's OCR
+    has finished, and a page is rendered only when fewer are in flight. All OCR for the
+    document has to finish within OCR_TIME_BUDGET seconds (or the budget's deadline, if
+    sooner); pages past it are returned without text and with ocr_status "budget_exceeded".
+    Pages that hit the per-page limit get "page_timeout", and pages left when the budget is
+    cancelled get "cancelled".
+    """
+    deadline = min(time.monotonic() + OCR_TIME_BUDGET, budget.deadline)
+    document = None
+    pending = deque()
+    in_flight = 0
+    
+    def finish_first():
+        nonlocal in_flight
+        result, future = pending.popleft()
+        if future is not None:
+            in_flight -= 1
+        return _finish_ocr(result, future, deadline, budget)
+    
+    try:
+        for result in pages:
+            if result["needs_ocr"] and budget.cancelled():
+                pending.append((dict(result, text="", headers=[], ocr_status="cancelled"), None))
+            elif result["needs_ocr"]:
+                while in_flight >= OCR_MAX_IN_FLIGHT:
+                    yield finish_first()
+                if document is None:
+                    with _pdfium_lock:
+                        document = pdfium.PdfDocument(_pdfium_input(source))
+                image = _render_pdf_page(document, result["page_index"])
+                pending.append((result, _get_ocr_pool().submit(_ocr_page, image, deadline, OCR_DPI, None, budget)))
+                in_flight += 1
+            else:
+                pending.append((result, None))
+            
+            while pending and (pending[0][1] is None or pending[0][1].done()):
+                yield finish_first()
+        
+        while pending:
+            yield finish_first()
+    finally:
+        for _, future in pending:
+            if future is not None:
+                future.cancel()
+        if document is not None:
+            with _pdfium_lock:
+                document.close()
+
+def _finish_ocr(result, future, deadline, budget):
+    """Wait for a page's OCR (if any) and merge the outcome into its page result."""
+    if future is None:
+        return result
+    outcome, stopped = _wait_for(future, max(0, deadline - time.monotonic()), budget)
+    if stopped:
+        future.cancel()
+        outcome = ("", None, "cancelled" if stopped == "cancelled" else "budget_exceeded", 0.0)
+    text, confidence, status, seconds = outcome
+    return dict(
+        result,
+        text=text,
+        headers=_find_headers(text),
+        ocr_confidence=confidence,
+        ocr_status=status,
+        extract_seconds=result["extract_seconds"] + seconds
+    )
+
+def iter_pdf_pages(file_content, workers=None, budget=None):
+    """
+    Extract a PDF page by page, yielding each page as soon as it is done.
+    
+    Large documents are split into page ranges and extracted across a process pool;
+    documents shorter than PARALLEL_MIN_PAGES are extracted serially. Either way pages
+    are yielded in page order. Only the first budget.max_pages pages are extracted; pages
+    cut off by the budget's deadline or cancellation come back with tier "skipped".
+    
+    Args:
+        file_content: A binary file-like object holding the PDF, or the path of a PDF file.
+        workers (int, optional): Number of worker processes. Defaults to PDF_WORKERS.
+        budget (ExtractionBudget, optional): Time, page and cancellation limits.
+    
+    Yields:
+        dict: A page record with page_number, page_count, text, headers, headings (ranked
+        heading dicts with text, offset within the page text, score, size and bold), offset (the
+        character offset of the page within the full extracted text), tier ("fast" when the
+        raw text layer was used, "layout" when pdfplumber layout analysis was needed, "ocr"
+        for scanned pages), tier_reason, page_class ("skip", "light" or "full", see
+        page_triage), extract_seconds and reused (True when the page was identical to one
+        extracted before and its cached result was used). OCR'd pages also carry
+        ocr_confidence and ocr_status.
+    """
+    workers = PDF_WORKERS if workers is None else min(workers, PDF_WORKERS)
+    budget = budget or eb.ExtractionBudget()
+    with _pdfium_lock:
+        document = pdfium.PdfDocument(_pdfium_input(file_content))
+        total_pages = len(document)
+        document.close()
+    page_count = min(total_pages, budget.max_pages)
+    if page_count < total_pages:
+        budget.skip(page_count + 1, total_pages, "page_limit")
+    
+    spilled_path = None
+    try:
+        if workers > 1 and page_count >= PARALLEL_MIN_PAGES:
+            path = file_content
+            if not isinstance(path, str):
+                # Workers open the PDF themselves; a file path saves pickling the bytes to each one
+                path = spilled_path = uh.spill_to_file(file_content, ".pdf")
+            pages = _iter_pdf_pages_parallel(path, page_count, workers, budget)
+        else:
+            pages = _iter_pdf_page_range(file_content, 0, page_count, budget)
+        
+        offset = 0
+        for i, result in enumerate(_with_ocr(pages, file_content, budget), 1):
+            # Pages cut short or whose OCR failed are extracted again next time
+            if not result.get("reused", True) and _skip_reason(result) is None and result.get("ocr_status") != "failed":
+                ec.put(result["page_key"], {key: result[key] for key in PAGE_CACHE_KEYS if key in result}, memory=False)
+            yield dict(result, page_number=i, page_count=page_count, offset=offset)
+            offset += len(result["text"]) + len(PAGE_SEPARATOR)
+    finally:
+        if spilled_path is not None:
+            os.remove(spilled_path)
+
+def _skip_reason(record):
+    """Return why a page's text was not (fully) extracted, or None."""
+    if record.get("tier") == "skipped":
+        return record["tier_reason"]
+    if record.get("ocr_status") in OCR_SKIP_STATUSES:
+        return record["ocr_status"]
+    if record.get("tier_reason") in LAYOUT_SKIP_REASONS:
+        return record["tier_reason"]
+    return None
+
+def _assemble_pages(records, progress_callback=None, budget=None):
+    """
+    Collect page records into the full text and the page_info dictionary, recording
+    skipped pages in the budget.
+    
+    Returns:
+        tuple: (extracted_text, page_info)
+    """
+    page_texts = []
+    page_info = {}
+    
+    for record in records:
+        page_texts.append(record["text"])
+        page_info[record["page_number"]] = {key: record[key] for key in PAGE_INFO_KEYS if key in record}
+        reason = _skip_reason(record)
+        if reason and budget is not None:
+            budget.skip(record["page_number"], record["page_number"], reason)
+        if progress_callback:
+            progress_callback(record["page_number"], record["page_count"])
+    
+    # Build the full text once instead of growing a string page by page
+    text = "".join(page_text + PAGE_SEPARATOR for page_text in page_texts)
     return text, page_info
 
-def extract_text_from_docx(file_content):
-    """Extract text from DOCX files."""
-    doc = docx.Document(file_content)
-    text = ""
-    for paragraph in doc.paragraphs:
-        text += paragraph.text + "\n"
-    return text
+def extract_text_from_pdf(file_content, workers=None, progress_callback=None, budget=None):
+    """
+    Extract text from PDF files with page numbers and potential section titles.
+    
+    Args:
+        file_content: A binary file-like object holding the PDF.
+        workers (int, optional): Number of worker processes. Defaults to PDF_WORKERS.
+        progress_callback (callable, optional): Called as progress_callback(pages_done, page_count)
+            after each page is extracted.
+        budget (ExtractionBudget, optional): Time, page and cancellation limits; records
+            the pages that were skipped.
+    
+    Returns:
+        tuple: (extracted_text, page_info)
+            - extracted_text: The full text content
+            - page_info: Dictionary mapping page numbers to text content, possible headers,
+              character offset into extracted_text, the extraction tier used, OCR
+              confidence for scanned pages and the seconds spent extracting the page
+    """
+    budget = budget or eb.ExtractionBudget()
+    return _assemble_pages(iter_pdf_pages(file_content, workers, budget), progress_callback, budget)
 
-def extract_text_from_image(file_content):
-    """Extract text from image files using OCR."""
-    image = Image.open(file_content)
-    text = pytesseract.image_to_string(image)
+def iter_docx_pages(file_content, budget=None):
+    """
+    Stream a DOCX file page by page, splitting on the page breaks stored in the document.
+    
+    Reading stops after budget.max_pages pages, or when the budget runs out or is
+    cancelled; the pages left unread are recorded in the budget.
+    
+    Yields:
+        dict: A page record in the same shape as iter_pdf_pages. Headers are the paragraphs
+        styled as headings, with their levels in heading_levels.
+    """
+    budget = budget or eb.ExtractionBudget()
+    offset = 0
+    started = time.perf_counter()
+    for i, result in enumerate(dx.iter_docx_pages(file_content), 1):
+        reason = "page_limit" if i > budget.max_pages else budget.stop_reason()
+        if reason:
+            # The page count of a DOCX is unknown until it has been read to the end
+            budget.skip(i, None, reason)
+            return
+        yield dict(
+            result,
+            page_number=i,
+            page_count=None,
+            offset=offset,
+            tier="docx",
+            tier_reason=None,
+            extract_seconds=time.perf_counter() - started
+        )
+        offset += len(result["text"]) + len(PAGE_SEPARATOR)
+        started = time.perf_counter()
+
+def extract_text_from_docx(file_content, budget=None):
+    """
+    Extract text from DOCX files, including tables, text boxes, headers and footers.
+    
+    Returns:
+        tuple: (extracted_text, page_info) in the same shape as extract_text_from_pdf
+    """
+    budget = budget or eb.ExtractionBudget()
+    return _assemble_pages(iter_docx_pages(file_content, budget), budget=budget)
+
+def extract_text_from_image(file_content, profile=None, budget=None):
+    """
+    Extract text from image files using OCR.
+    
+    Args:
+        file_content: A binary file-like object holding the image.
+        profile (str, optional): Preprocessing profile from image_preprocessing.PROFILES.
+        budget (ExtractionBudget, optional): Limits Tesseract to the budget's page timeout;
+            an image that runs past it yields no text and is recorded as skipped.
+    """
+    budget = budget or eb.ExtractionBudget()
+    image = ip.preprocess_image(Image.open(file_content), profile)
+    try:
+        text = oe.image_to_string(image, timeout=budget.page_timeout())
+    except oe.OCRTimeoutError:
+        budget.skip(1, 1, "page_timeout")
+        return ""
     return text
 
+def iter_image_pages(files, profile=None, budget=None):
+    """
+    OCR a set of page images concurrently, yielding one page record per image in upload order.
+    
+    Multi-frame TIFFs contribute one page per frame. Frames are queued on the OCR pool as
+    they are decoded, up to OCR_MAX_IN_FLIGHT at once, and share the per-document
+    OCR_TIME_BUDGET. Frames past budget.max_pages are not read; frames reached after the
+    budget runs out or is cancelled come back with tier "skipped".
+    
+    Args:
+        files (list): (file_content, file_name) pairs, one per uploaded image.
+        profile (str, optional): Preprocessing profile from image_preprocessing.PROFILES.
+        budget (ExtractionBudget, optional): Time, page and cancellation limits.
+    
+    Yields:
+        dict: A page record in the same shape as iter_pdf_pages, plus source_file and source_frame.
+    """
+    budget = budget or eb.ExtractionBudget()
+    deadline = min(time.monotonic() + OCR_TIME_BUDGET, budget.deadline)
+    # Count the frames from the image headers first, so every record carries the page count
+    total_frames = 0
+    for file_content, _ in files:
+        with Image.open(file_content) as image:
+            total_frames += getattr(image, "n_frames", 1)
+        if hasattr(file_content, "seek"):
+            file_content.seek(0)
+    page_count = min(total_frames, budget.max_pages)
+    if total_frames > budget.max_pages:
+        budget.skip(budget.max_pages + 1, total_frames, "page_limit")
+    
+    pending = deque()
+    queued = 0
+    page_number = 0
+    offset = 0
+    
+    def finish_first():
+        nonlocal page_number, offset
+        file_name, frame_number, future = pending.popleft()
+        result = {
+            "text": "",
+            "headers": [],
+            "tier": "ocr",
+            "tier_reason": None,
+            "needs_ocr": True,
+            "extract_seconds": 0.0,
+            "source_file": file_name,
+            "source_frame": frame_number
+        }
+        if isinstance(future, str):
+            result = dict(result, tier="skipped", tier_reason=future)
+        else:
+            result = _finish_ocr(result, future, deadline, budget)
+        page_number += 1
+        record = dict(result, page_number=page_number, page_count=page_count, offset=offset)
+        offset += len(result["text"]) + len(PAGE_SEPARATOR)
+        return record
+    
+    try:
+        for file_content, file_name in files:
+            with Image.open(file_content) as image:
+                for frame_number, frame in enumerate(ImageSequence.Iterator(image), 1):
+                    if queued >= page_count:
+                        break
+                    queued += 1
+                    reason = budget.stop_reason()
+                    if reason:
+                        pending.append((file_name, frame_number, reason))
+                        continue
+                    while sum(not isinstance(future, str) for _, _, future in pending) >= OCR_MAX_IN_FLIGHT:
+                        yield finish_first()
+                    # Copy the frame so the OCR worker does not depend on the open file
+                    future = _get_ocr_pool().submit(_ocr_page, frame.copy(), deadline, None, profile, budget)
+                    pending.append((file_name, frame_number, future))
+        
+        while pending:
+            yield finish_first()
+    finally:
+        for _, _, future in pending:
+            if not isinstance(future, str):
+                future.cancel()
+
+def extract_text_from_images(files, profile=None, progress_callback=None, budget=None):
+    """
+    Extract text from one or more page images, including multi-frame TIFFs, as one document.
+    
+    Args:
+        files (list): (file_content, file_name) pairs, one per uploaded image.
+        profile (str, optional): Preprocessing profile from image_preprocessing.PROFILES.
+        progress_callback (callable, optional): Called as progress_callback(pages_done, page_count).
+        budget (ExtractionBudget, optional): Time, page and cancellation limits; records
+            the pages that were skipped.
+    
+    Returns:
+        tuple: (extracted_text, page_info) in the same shape as extract_text_from_pdf, with
+        each page also recording the file and frame it came from.
+    """
+    budget = budget or eb.ExtractionBudget()
+    return _assemble_pages(iter_image_pages(files, profile, budget), progress_callback, budget)
+
 def extract_text_from_txt(file_content):
-    """Extract text from TXT files."""
+    """Extract text from TXT files, given as a binary file-like object or a path."""
+    if isinstance(file_content, str):
+        with open(file_content, "rb") as f:
+            return f.read().decode("utf-8")
     return file_content.read().decode("utf-8")
 
-def extract_text(uploaded_file):
+def extract_text(uploaded_file, progress_callback=None, cancel_event=None, deadline=None):
     """
     Extract text from various file formats (PDF, DOCX, images, TXT).
     
+    Results are cached by a hash of the uploaded bytes, so re-uploading or rerunning
+    the app on the same document skips the parsers entirely. The text is normalized
+    (see text_normalization) before it is returned; page texts, offsets and headings all
+    refer to the normalized text. page_info is a document_model.PageInfo view whose page
+    texts are slices of the returned text rather than copies.
+    
     Args:
-        uploaded_file: A Streamlit UploadedFile object.
-        
+        uploaded_file: A Streamlit UploadedFile object, or a list of them. Several images
+            are the photographed or scanned pages of one document; any other set of files,
+            and the files of a ZIP archive, is a bundle (see extract_bundle).
+        progress_callback (callable, optional): Called as progress_callback(pages_done, page_count)
+            while a PDF or a set of images is being extracted.
+        cancel_event (threading.Event, optional): Set it from another thread to stop the
+            extraction; the pages read so far are returned.
+        deadline (float, optional): A time.monotonic() value to stop extracting at. Defaults
+            to DOCUMENT_TIME_BUDGET seconds from now.
+    
+    Extraction runs under the limits in extraction_budget (per-page and per-document time,
+    maximum page count). Pages cut short by them are listed in document_info and the
+    partial result is not cached. Bundles are extracted file by file with the same caching
+    and page limit per file, all within the one deadline, and the files are merged afterwards.
+    
     Returns:
         tuple: (extracted_text, document_info)
             - extracted_text: The full text content
-            - document_info: Dictionary with metadata about the document (page info for PDFs)
+            - document_info: Dictionary with metadata about the document (page info and a
+              section index for PDFs, DOCX files, TIFFs and sets of images), the numbered
+              forms found in them (see form_library), typed rows
+              of the coverage schedule tables found in PDFs, the fields of declarations pages
+              read by a carrier template (see declarations_templates), a fingerprint of the
+              text for finding near-duplicates (see document_index), which PDF pages are unchanged
+              from a page extracted before, policy facts (see policy_facts), what
+              normalization removed,
+              whether extraction was complete and which pages were skipped and why, and
+              the peak memory used extracting it. For a bundle, the files and the pages
+              each one became (see extract_bundle)
     """
     try:
+        uploaded_files = list(uploaded_file) if isinstance(uploaded_file, (list, tuple)) else [uploaded_file]
+        if any(f.type in ZIP_TYPES for f in uploaded_files):
+            uploaded_files = unpack_archives(uploaded_files)
+        if len(uploaded_files) > 1 and any(f.type not in IMAGE_TYPES for f in uploaded_files):
+            return extract_bundle(uploaded_files, progress_callback, cancel_event, deadline)
+        return _extract_document(uploaded_files if len(uploaded_files) > 1 else uploaded_files[0], progress_callback, cancel_event, deadline)
+    
+    except Exception as e:
+        st.error(f"Error extracting text: {str(e)}")
+        raise e
+
+def _extract_document(uploaded_file, progress_callback=None, cancel_event=None, deadline=None):
+    """Extract one document (a file, or a list of images), using and filling the cache; see extract_text."""
+    if isinstance(uploaded_file, (list, tuple)):
+        uploaded_files = list(uploaded_file)
+        file_type = IMAGE_BATCH_TYPE
+        file_name = ", ".join(f.name for f in uploaded_files)
+    else:
+        uploaded_files = [uploaded_file]
         file_type = uploaded_file.type
-        file_content = io.BytesIO(uploaded_file.getvalue())
-        document_info = {"type": file_type, "file_name": uploaded_file.name}
-        
-        # Based on file type, call the appropriate extraction function
-        if file_type == "application/pdf":
-            extracted_text, page_info = extract_text_from_pdf(file_content)
-            document_info["page_info"] = page_info
-            return extracted_text, document_info
+        file_name = uploaded_file.name
+    
+    with ExitStack() as stack:
+        # Extractors get a path (large uploads, spilled to disk) or the upload's own buffer, never a copy
+        opened = [stack.enter_context(uh.open_upload(f)) for f in uploaded_files]
+        sources = [source for source, _ in opened]
+        with ExitStack() as buffers_stack:
+            buffers = [buffers_stack.enter_context(uh.source_buffer(source)) for source in sources]
+            cache_key = ec.content_key(buffers, f"{EXTRACTOR_VERSION}:{ip.DEFAULT_PROFILE}:{dt.TEMPLATES_VERSION}:{file_type}")
         
-        elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            extracted_text = extract_text_from_docx(file_content)
-            return extracted_text, document_info
+        # Reuse an earlier extraction of the same bytes without touching the parsers
+        cached = ec.get(cache_key)
+        if cached is not None:
+            extracted_text, document_info = cached
+            return extracted_text, dict(document_info, file_name=file_name)
         
-        elif file_type in ["image/png", "image/jpeg", "image/jpg"]:
-            extracted_text = extract_text_from_image(file_content)
-            return extracted_text, document_info
+        budget = eb.ExtractionBudget(cancel_event=cancel_event, deadline=deadline)
+        with uh.track_peak_rss() as memory:
+            if file_type == IMAGE_BATCH_TYPE:
+                extracted_text, page_info = extract_text_from_images(
+                    [(source, f.name) for source, f in zip(sources, uploaded_files)],
+                    progress_callback=progress_callback,
+                    budget=budget
+                )
+                document_info = {"type": file_type, "file_name": file_name, "page_info": page_info}
+            else:
+                extracted_text, document_info = _extract_uncached(sources[0], file_type, file_name, progress_callback, budget)
+    
+    # Strip repeated headers and footers and layout noise before the text reaches the prompt
+    if "page_info" in document_info:
+        # Numbered forms are found first, since normalization drops their form numbers as footers
+        document_info["forms"] = fl.find_forms(document_info["page_info"])
+        extracted_text, document_info["normalization"] = tn.normalize_document(
+            extracted_text, document_info["page_info"], PAGE_SEPARATOR
+        )
+        # Index sections once here so later stages can slice them out by title
+        document_info["section_index"] = si.build_section_index(document_info["page_info"], len(extracted_text))
+        # Which PDF pages matched a page extracted before, so later stages can skip unchanged ones
+        if any("reused" in page for page in document_info["page_info"].values()):
+            document_info["page_changes"] = {
+                page_number: "unchanged" if page.get("reused") else "changed"
+                for page_number, page in document_info["page_info"].items()
+            }
+        # Schedule tables read as typed rows, gathered from the pages with their page numbers
+        document_info["schedule_rows"] = [
+            dict(row, line=tn.normalize_line(row["line"]), page=page_number)
+            for page_number, page in document_info["page_info"].items()
+            for row in page.get("schedule_rows") or []
+        ]
+        # Declarations pages read by a carrier template, with their structured fields
+        document_info["declarations"] = [
+            dict(page["declarations"], page=page_number)
+            for page_number, page in document_info["page_info"].items()
+            if page.get("declarations")
+        ]
+        # Page texts become slices of extracted_text, so the session holds the text only once
+        document_info["page_info"] = dm.compact_page_info(extracted_text, document_info["page_info"])
+    else:
+        extracted_text, document_info["normalization"] = tn.normalize_text(extracted_text)
+    # Deductibles, premiums, limits, dates and vehicles with fixed phrasings, read without the model
+    document_info["policy_facts"] = (
+        pf.extract_facts(extracted_text, document_info.get("page_info"))
+        + pf.schedule_facts(document_info.get("schedule_rows") or [])
+        + dt.field_facts(document_info.get("declarations") or [])
+    )
+    # Lets a rescan or re-export of the document find the results produced for it before
+    document_info["fingerprint"] = di.document_fingerprint(extracted_text, document_info)
+    document_info["memory"] = dict(
+        memory,
+        upload_mb=round(sum(f.size for f in uploaded_files) / 1e6, 2),
+        spilled=any(spilled for _, spilled in opened)
+    )
+    document_info.update(budget.summary())
+    print(f"Extracted {file_name}: {document_info['memory']}")
+    if document_info["complete"]:
+        ec.put(cache_key, (extracted_text, document_info))
+        # Count the document's forms toward the library of standard forms
+        fl.record_forms(document_info.get("forms") or [], cache_key)
+    else:
+        # Leave partial results out of the cache so the next attempt extracts the document again
+        print(f"Partial extraction of {file_name}, skipped pages: {document_info['skipped_pages']}")
+    return extracted_text, document_info
+
+def unpack_archives(uploaded_files):
+    """
+    Replace the ZIP archives in a list of uploads with the files inside them.
+    
+    Files are read in name order and typed by extension (ARCHIVE_MEMBER_TYPES); folders,
+    hidden files and files of other types are skipped.
+    
+    Args:
+        uploaded_files (list): Streamlit UploadedFile objects, some of them ZIP archives.
+    
+    Returns:
+        list: The uploads that were not archives, in order, with each archive replaced by
+        upload_handling.MemoryUpload objects for its files.
+    
+    Raises:
+        ValueError: If an archive holds more than BUNDLE_MAX_FILES files or BUNDLE_MAX_MB of
+            data, or no file that can be extracted.
+    """
+    files = []
+    unpacked_bytes = 0
+    for uploaded_file in uploaded_files:
+        if uploaded_file.type not in ZIP_TYPES:
+            files.append(uploaded_file)
+            continue
         
-        elif file_type == "text/plain":
-            extracted_text = extract_text_from_txt(file_content)
-            return extracted_text, document_info
+        with uh.open_upload(uploaded_file) as (source, _):
+            with zipfile.ZipFile(source) as archive:
+                for member in sorted(archive.infolist(), key=lambda member: member.filename):
+                    base_name = os.path.basename(member.filename)
+                    if member.is_dir() or base_name.startswith(".") or member.filename.startswith("__MACOSX/"):
+                        continue
+                    member_type = ARCHIVE_MEMBER_TYPES.get(os.path.splitext(base_name)[1].lower())
+                    if member_type is None:
+                        print(f"Skipping {member.filename} in {uploaded_file.name}: unsupported file type")
+                        continue
+                    # Check sizes before reading, from the archive's own directory
+                    unpacked_bytes += member.file_size
+                    if len(files) >= BUNDLE_MAX_FILES or unpacked_bytes > BUNDLE_MAX_MB * 1024 * 1024:
+                        raise ValueError(f"{uploaded_file.name} holds more than {BUNDLE_MAX_FILES} files or {BUNDLE_MAX_MB} MB")
+                    files.append(uh.MemoryUpload(member.filename, member_type, archive.read(member)))
+    
+    if not files:
+        raise ValueError("The archive holds no PDF, DOCX, image or text files")
+    return files
+
+def extract_bundle(uploaded_files, progress_callback=None, cancel_event=None, deadline=None):
+    """
+    Extract several files as one logical document.
+    
+    Each file is extracted on its own, as extract_text would (and cached on its own), on up
+    to BUNDLE_WORKERS threads at once. The files share one deadline, so the bundle as a whole
+    takes no longer than a single document may; the page limit applies to each file. The results are merged in upload order: pages are
+    numbered across the whole bundle and keep the file they came from (source_file) and
+    their page number within it (source_page). The section index, schedule rows and policy
+    facts are built over the merged document, so summaries and answers cover every file.
+    A file that cannot be extracted is left out and the bundle is marked incomplete.
+    
+    Args:
+        uploaded_files (list): The uploads in the bundle.
+        progress_callback (callable, optional): Called as progress_callback(pages_done, page_count)
+            with the pages of every file extracted so far, from the calling thread.
+        cancel_event (threading.Event, optional): Stops the extraction of every file.
+        deadline (float, optional): A time.monotonic() value to stop extracting every file
+            at. Defaults to DOCUMENT_TIME_BUDGET seconds from now.
+    
+    Returns:
+        tuple: (extracted_text, document_info) as for extract_text, with document_info["files"]
+        listing each file's name, type, first_page, last_page and page_count in the bundle,
+        whether it was complete, its memory report, or its error. Skipped pages past the end
+        of a file are listed on its entry as skipped_pages, in the file's own page numbers.
+    
+    Raises:
+        ValueError: If none of the files could be extracted.
+    """
+    if deadline is None:
+        deadline = time.monotonic() + eb.DOCUMENT_TIME_BUDGET
+    progress = {}
+    progress_lock = threading.Lock()
+    
+    def file_progress(index):
+        def report(pages_done, page_count):
+            with progress_lock:
+                progress[index] = (pages_done, page_count)
+        return report
+    
+    results = [None] * len(uploaded_files)
+    # Stops every file's extraction: set when the caller cancels, and when this thread leaves
+    # early (a Streamlit rerun raises a BaseException here) so shutdown does not wait out the deadline
+    stop_event = threading.Event()
+    with uh.track_peak_rss() as memory:
+        executor = ThreadPoolExecutor(max_workers=max(1, min(BUNDLE_WORKERS, len(uploaded_files))), thread_name_prefix="insurlit-bundle")
+        try:
+            futures = {
+                executor.submit(_extract_document, uploaded_file, file_progress(i), stop_event, deadline): i
+                for i, uploaded_file in enumerate(uploaded_files)
+            }
+            pending = set(futures)
+            reported = None
+            while pending:
+                if cancel_event is not None and cancel_event.is_set():
+                    stop_event.set()
+                done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS)
+                for future in done:
+                    i = futures[future]
+                    try:
+                        results[i] = future.result()
+                    except Exception as e:
+                        print(f"Error extracting {uploaded_files[i].name}: {str(e)}")
+                        results[i] = e
+                # Progress is reported from this thread, since Streamlit elements cannot be updated from the workers
+                if progress_callback:
+                    with progress_lock:
+                        totals = (sum(pages_done for pages_done, _ in progress.values()), sum(count for _, count in progress.values()))
+                    if totals[1] and totals != reported:
+                        progress_callback(*totals)
+                        reported = totals
+        finally:
+            stop_event.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    if all(isinstance(result, Exception) for result in results):
+        raise ValueError(f"None of the files could be extracted: {'; '.join(str(result) for result in results)}")
+    extracted_text, document_info = _merge_bundle(uploaded_files, results)
+    document_info["memory"] = dict(memory, upload_mb=round(sum(f.size for f in uploaded_files) / 1e6, 2))
+    print(f"Extracted bundle of {len(uploaded_files)} files: {document_info['memory']}")
+    return extracted_text, document_info
+
+def _merge_bundle(uploaded_files, results):
+    """Merge the (extracted_text, document_info) results of a bundle's files into one document; see extract_bundle."""
+    pages = []
+    files = []
+    forms = []
+    schedule_rows = []
+    declarations = []
+    page_changes = {}
+    normalization = {}
+    # Collects the skipped page ranges of every file that fall on its pages in the bundle, renumbered
+    budget = eb.ExtractionBudget()
+    complete = True
+    
+    for uploaded_file, result in zip(uploaded_files, results):
+        entry = {"file_name": uploaded_file.name, "type": uploaded_file.type}
+        files.append(entry)
+        if isinstance(result, Exception):
+            entry["error"] = str(result)
+            complete = False
+            continue
         
+        text, info = result
+        first_page = len(pages) + 1
+        if "page_info" in info:
+            file_pages = [dict(info["page_info"][number]) for number in sorted(info["page_info"])]
         else:
-            raise ValueError(f"Unsupported file type: {file_type}")
+            # Files without pages (plain text, a single image) become one page of the bundle
+            file_pages = [{"text": text}]
+        for number, page in enumerate(file_pages, 1):
+            page["source_file"] = uploaded_file.name
+            page["source_page"] = number
+            pages.append(page)
+        
+        entry.update(
+            first_page=first_page,
+            last_page=len(pages),
+            page_count=len(file_pages),
+            complete=info["complete"],
+            memory=info.get("memory")
+        )
+        complete = complete and info["complete"]
+        # Pages past the end of a file's extracted pages (over the page limit, or a DOCX cut
+        # short) have no page in the bundle, so they are listed on the file's entry instead
+        beyond = {}
+        for reason, ranges in info["skipped_pages"].items():
+            for first, last in ranges:
+                if first <= len(file_pages):
+                    budget.skip(first + first_page - 1, min(last or len(file_pages), len(file_pages)) + first_page - 1, reason)
+                if last is None or last > len(file_pages):
+                    beyond.setdefault(reason, []).append([max(first, len(file_pages) + 1), last])
+        if beyond:
+            entry["skipped_pages"] = beyond
+        for number, change in (info.get("page_changes") or {}).items():
+            page_changes[number + first_page - 1] = change
+        forms.extend(
+            dict(form, first_page=form["first_page"] + first_page - 1, last_page=form["last_page"] + first_page - 1)
+            for form in info.get("forms") or []
+        )
+        schedule_rows.extend(
+            dict(row, page=row["page"] + first_page - 1, source_file=uploaded_file.name)
+            for row in info.get("schedule_rows") or []
+        )
+        declarations.extend(
+            dict(entry, page=entry["page"] + first_page - 1, source_file=uploaded_file.name)
+            for entry in info.get("declarations") or []
+        )
+        for key, value in info["normalization"].items():
+            normalization[key] = normalization.get(key, 0) + value
     
-    except Exception as e:
-        st.error(f"Error extracting text: {str(e)}")
-        raise e
+    # Lay the pages out one after another, as the extractors do for the pages of one file
+    offset = 0
+    for page in pages:
+        page["offset"] = offset
+        offset += len(page["text"]) + len(PAGE_SEPARATOR)
+    extracted_text = "".join(page["text"] + PAGE_SEPARATOR for page in pages)
+    page_info = {number: page for number, page in enumerate(pages, 1)}
+    
+    document_info = {
+        "type": BUNDLE_TYPE,
+        "file_name": ", ".join(f.name for f in uploaded_files),
+        "files": files,
+        "forms": forms,
+        "normalization": normalization,
+        "section_index": si.build_section_index(page_info, len(extracted_text)),
+        "schedule_rows": schedule_rows,
+        "declarations": declarations
+    }
+    if page_changes:
+        document_info["page_changes"] = page_changes
+    document_info["page_info"] = dm.compact_page_info(extracted_text, page_info)
+    document_info["policy_facts"] = (
+        pf.extract_facts(extracted_text, document_info["page_info"])
+        + pf.schedule_facts(schedule_rows)
+        + dt.field_facts(declarations)
+    )
+    document_info["fingerprint"] = di.document_fingerprint(extracted_text, document_info)
+    document_info.update(budget.summary())
+    document_info["complete"] = complete
+    return extracted_text, document_info
+
+def _extract_uncached(file_content, file_type, file_name, progress_callback=None, budget=None):
+    """Run the extractor matching file_type and build the (extracted_text, document_info) pair."""
+    document_info = {"type": file_type, "file_name": file_name}
+    
+    # Based on file type, call the appropriate extraction function
+    if file_type == "application/pdf":
+        extracted_text, page_info = extract_text_from_pdf(file_content, progress_callback=progress_callback, budget=budget)
+        document_info["page_info"] = page_info
+        return extracted_text, document_info
+    
+    elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
+        extracted_text, page_info = extract_text_from_docx(file_content, budget)
+        document_info["page_info"] = page_info
+        return extracted_text, document_info
+    
+    elif file_type == "image/tiff":
+        # TIFFs may hold a whole scanned policy, one page per frame
+        extracted_text, page_info = extract_text_from_images([(file_content, file_name)], progress_callback=progress_callback, budget=budget)
+        document_info["page_info"] = page_info
+        return extracted_text, document_info
+    
+    elif file_type in ["image/png", "image/jpeg", "image/jpg"]:
+        extracted_text = extract_text_from_image(file_content, budget=budget)
+        return extracted_text, document_info
+    
+    elif file_type == "text/plain":
+        extracted_text = extract_text_from_txt(file_content)
+        return extracted_text, document_info
+    
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
@@ -0,0 +1,168 @@
+import re
+import zipfile
+from lxml import etree
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+# Only these elements carry text or structure; the parser skips events for everything else
+# (run properties, fonts, drawings), which is most of the XML
+PARSED_TAGS = [
+    W + "p", W + "t", W + "tab", W + "br", W + "cr", W + "tbl", W + "tr", W + "tc",
+    W + "pStyle", W + "outlineLvl", W + "lastRenderedPageBreak", MC_FALLBACK
+]
+BLOCK_TAGS = (W + "p", W + "tbl")
+
+HEADER_PART = re.compile(r"^word/header\d*\.xml$")
+FOOTER_PART = re.compile(r"^word/footer\d*\.xml$")
+# Word derives style ids from localized names, e.g. "Heading1", "berschrift1" (German), "Titre1" (French)
+HEADING_STYLE = re.compile(r"^(?:heading|berschrift|titre)\s*(\d)$", re.IGNORECASE)
+
+def _heading_level(style, outline_level):
+    """Map a paragraph style id or outline level to a heading level (1 is the top), or None."""
+    if outline_level is not None:
+        return outline_level + 1
+    if not style:
+        return None
+    if style.lower() in ("title", "subtitle"):
+        return 1
+    match = HEADING_STYLE.match(style)
+    return int(match.group(1)) if match else None
+
+def _iter_part(archive, part_name, region):
+    """
+    Stream the paragraphs and table rows of one XML part of a DOCX package in reading order.
+    
+    Only the element currently being read is kept in memory: every finished top-level
+    block is cleared and detached as soon as it has been emitted.
+    """
+    paragraphs = []  # Text fragments of each open paragraph, innermost last
+    containers = []  # Open table rows and cells, innermost last
+    fallback_depth = 0
+    
+    with archive.open(part_name) as stream:
+        for event, elem in etree.iterparse(stream, events=("start", "end"), tag=PARSED_TAGS):
+            tag = elem.tag
+            if event == "start":
+                if tag == MC_FALLBACK:
+                    # Text boxes are stored twice (DrawingML and a VML fallback); read only the first
+                    fallback_depth += 1
+                elif fallback_depth:
+                    continue
+                elif tag == W + "p":
+                    paragraphs.append({"parts": [], "style": None, "outline": None, "page_break": None})
+                elif tag == W + "tr":
+                    containers.append(["row", []])
+                elif tag == W + "tc":
+                    containers.append(["cell", []])
+                elif tag == W + "pStyle" and paragraphs:
+                    paragraphs[-1]["style"] = elem.get(W + "val")
+                elif tag == W + "outlineLvl" and paragraphs:
+                    level = elem.get(W + "val")
+                    paragraphs[-1]["outline"] = int(level) if level and level.isdigit() and int(level) < 9 else None
+                elif tag == W + "lastRenderedPageBreak" and paragraphs and region == "body":
+                    paragraph = paragraphs[-1]
+                    paragraph["page_break"] = "after" if paragraph["parts"] else "before"
+                continue
+            
+            if tag == MC_FALLBACK:
+                fallback_depth -= 1
+                continue
+            if fallback_depth:
+                continue
+            
+            if tag == W + "t":
+                if paragraphs and elem.text:
+                    paragraphs[-1]["parts"].append(elem.text)
+            elif tag == W + "tab":
+                if paragraphs:
+                    paragraphs[-1]["parts"].append("\t")
+            elif tag in (W + "br", W + "cr"):
+                if paragraphs:
+                    if elem.get(W + "type") == "page" and region == "body":
+                        paragraphs[-1]["page_break"] = "after" if paragraphs[-1]["parts"] else "before"
+                    else:
+                        paragraphs[-1]["parts"].append("\n")
+            elif tag == W + "p" and paragraphs:
+                paragraph = paragraphs.pop()
+                text = "".join(paragraph["parts"])
+                if containers and containers[-1][0] == "cell":
+                    containers[-1][1].append(text)
+                else:
+                    if paragraph["page_break"] == "before":
+                        yield {"kind": "page_break", "text": "", "region": region, "heading_level": None}
+                    yield {
+                        "kind": "paragraph",
+                        "text": text,
+                        "region": region,
+                        "heading_level": _heading_level(paragraph["style"], paragraph["outline"])
+                    }
+                    if paragraph["page_break"] == "after":
+                        yield {"kind": "page_break", "text": "", "region": region, "heading_level": None}
+            elif tag == W + "tc" and containers:
+                _, cell_paragraphs = containers.pop()
+                if containers:
+                    containers[-1][1].append(" ".join(p for p in cell_paragraphs if p))
+            elif tag == W + "tr" and containers:
+                _, cells = containers.pop()
+                row_text = " | ".join(cells)
+                if containers:
+                    # A row of a table nested inside a cell becomes part of that cell's text
+                    containers[-1][1].append(row_text)
+                else:
+                    yield {"kind": "row", "text": row_text, "region": region, "heading_level": None}
+            
+            if tag in BLOCK_TAGS:
+                parent = elem.getparent()
+                if parent is not None and (parent.tag == W + "body" or parent.getparent() is None):
+                    # Finished top-level block: drop it and everything before it so memory
+                    # stays flat on long documents
+                    elem.clear(keep_tail=True)
+                    while elem.getprevious() is not None:
+                        del parent[0]
+
+def iter_docx_blocks(file_content):
+    """
+    Stream the text blocks of a DOCX file in reading order without building an object model.
+    
+    Page headers come first, then the body (including tables and text boxes), then page
+    footers. Page breaks in the body, both explicit and those Word recorded when it last
+    laid out the document, are emitted as their own blocks.
+    
+    Args:
+        file_content: A binary file-like object or path holding the DOCX file.
+    
+    Yields:
+        dict: A block with kind ("paragraph", "row" or "page_break"), text, region
+        ("header", "body" or "footer") and heading_level (1 is the top, None for body text).
+    """
+    with zipfile.ZipFile(file_content) as archive:
+        names = archive.namelist()
+        for part_name in sorted(name for name in names if HEADER_PART.match(name)):
+            yield from _iter_part(archive, part_name, "header")
+        yield from _iter_part(archive, "word/document.xml", "body")
+        for part_name in sorted(name for name in names if FOOTER_PART.match(name)):
+            yield from _iter_part(archive, part_name, "footer")
+
+def iter_docx_pages(file_content):
+    """
+    Group the blocks of a DOCX file into pages.
+    
+    Yields:
+        dict: A page result with text, headers (the headings on the page in order) and
+        heading_levels, one per page break-delimited page.
+    """
+    lines = []
+    headers = []
+    levels = []
+    for block in iter_docx_blocks(file_content):
+        if block["kind"] == "page_break":
+            yield {"text": "\n".join(lines), "headers": headers, "heading_levels": levels}
+            lines, headers, levels = [], [], []
+            continue
+        lines.append(block["text"])
+        if block["heading_level"] is not None and block["text"].strip():
+            headers.append(block["text"].strip())
+            levels.append(block["heading_level"])
+    if lines or headers:
+        yield {"text": "\n".join(lines), "headers": headers, "heading_levels": levels}
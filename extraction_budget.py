@@ -0,0 +1,73 @@
+import os
+import time
+
+# Limits on how long one document may take; tune per deployment
+PAGE_TIME_LIMIT = float(os.getenv("INSURLIT_PAGE_TIMEOUT_SECONDS", "30"))
+DOCUMENT_TIME_BUDGET = float(os.getenv("INSURLIT_DOCUMENT_BUDGET_SECONDS", "300"))
+MAX_PAGES = int(os.getenv("INSURLIT_MAX_PAGES", "2000"))
+
+class ExtractionBudget:
+    """
+    Time, page and cancellation limits for extracting one document, and a record of the
+    pages that were skipped because of them.
+    
+    Extractors check stop_reason() before each page and cap slow steps at page_timeout();
+    skipped pages are reported through skip() and summarized for document_info by summary().
+    """
+    
+    def __init__(self, time_budget=None, page_time_limit=None, max_pages=None, cancel_event=None, deadline=None):
+        """
+        Args:
+            time_budget (float, optional): Seconds for the whole document. Defaults to DOCUMENT_TIME_BUDGET.
+            page_time_limit (float, optional): Seconds for any one page. Defaults to PAGE_TIME_LIMIT.
+            max_pages (int, optional): Pages extracted at most. Defaults to MAX_PAGES.
+            cancel_event (threading.Event, optional): Set it to stop the extraction early.
+            deadline (float, optional): A time.monotonic() value to stop at instead of
+                time_budget, shared by the budgets of the files of a bundle.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + (DOCUMENT_TIME_BUDGET if time_budget is None else time_budget)
+        self.deadline = deadline
+        self.page_time_limit = PAGE_TIME_LIMIT if page_time_limit is None else page_time_limit
+        self.max_pages = MAX_PAGES if max_pages is None else max_pages
+        self.cancel_event = cancel_event
+        self.skipped = {}
+    
+    def remaining(self):
+        """Seconds left before the document deadline."""
+        return max(0.0, self.deadline - time.monotonic())
+    
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+    
+    def stop_reason(self):
+        """Return why no further pages should be extracted ("cancelled" or "document_timeout"), or None."""
+        if self.cancelled():
+            return "cancelled"
+        if self.remaining() <= 0:
+            return "document_timeout"
+        return None
+    
+    def page_timeout(self):
+        """Seconds the next page may take: the per-page limit, or less if the document deadline is closer."""
+        return min(self.page_time_limit, self.remaining())
+    
+    def skip(self, first, last, reason):
+        """
+        Record that pages first through last (1-based, inclusive) were not fully extracted.
+        
+        last may be None when the document's length is unknown (e.g. a DOCX cut short).
+        """
+        ranges = self.skipped.setdefault(reason, [])
+        if ranges and ranges[-1][1] is not None and ranges[-1][1] + 1 == first:
+            ranges[-1][1] = last
+        else:
+            ranges.append([first, last])
+    
+    def summary(self):
+        """
+        Returns:
+            dict: complete (False if any page was skipped) and skipped_pages, mapping each
+            reason to [first, last] page ranges.
+        """
+        return {"complete": not self.skipped, "skipped_pages": {reason: [list(r) for r in ranges] for reason, ranges in self.skipped.items()}}
@@ -0,0 +1,249 @@
+import os
+import hashlib
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+def _user_cache_dir():
+    """The cache directory of the current user (~/.cache/insurlit/extraction unless XDG_CACHE_HOME is set)."""
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "insurlit", "extraction")
+
+# Cache location and limits can be tuned per deployment through environment variables. Entries
+# are unpickled on load, so the store lives in a directory only its owner can write to
+CACHE_DIR = os.getenv("INSURLIT_CACHE_DIR") or _user_cache_dir()
+CACHE_MAX_BYTES = int(os.getenv("INSURLIT_CACHE_MAX_MB", "512")) * 1024 * 1024
+MEMORY_CACHE_ENTRIES = int(os.getenv("INSURLIT_CACHE_MEMORY_ENTRIES", "32"))
+# The disk store is checked against CACHE_MAX_BYTES after this many bytes have been written,
+# rather than after every entry, so storing many small page entries stays cheap
+EVICT_CHECK_BYTES = CACHE_MAX_BYTES // 20
+
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+_disk_lock = threading.Lock()
+_written_since_check = 0
+_checked_dir = None
+_store_usable = False
+
+def content_key(data, version):
+    """
+    Build a cache key for a document from its raw bytes.
+    
+    Args:
+        data (bytes | memoryview | list): The raw bytes of the uploaded document, or a list
+            of byte strings for a document uploaded as several files.
+        version (str): Extractor version; changing it invalidates every earlier entry.
+    
+    Returns:
+        str: A hex SHA-256 digest identifying the content and extractor version.
+    """
+    digest = hashlib.sha256(version.encode("utf-8") + b"\0")
+    parts = data if isinstance(data, (list, tuple)) else [data]
+    for part in parts:
+        # Prefix each part with its length so different splits of the same bytes never collide
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+def _disk_path(key):
+    return os.path.join(CACHE_DIR, key[:2], key + ".pkl")
+
+def _private(stat_result):
+    """Whether a file or directory belongs to this user and no other user can write to it."""
+    if not hasattr(os, "getuid"):
+        return True  # Windows keeps each user's profile directory private already
+    return stat_result.st_uid == os.getuid() and not stat_result.st_mode & 0o022
+
+def _store_ready():
+    """
+    Create the disk store (mode 0700) on first use and check that it is private.
+    
+    A store another user owns or can write to could hold planted pickles, so the disk tier
+    is turned off instead; the in-process LRU still works.
+    """
+    global _checked_dir, _store_usable
+    with _disk_lock:
+        if _checked_dir != CACHE_DIR:
+            _checked_dir = CACHE_DIR
+            try:
+                os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+                _store_usable = _private(os.stat(CACHE_DIR))
+                if not _store_usable:
+                    print(f"Error using extraction cache {CACHE_DIR}: it belongs to or is writable by another user; disk cache disabled")
+            except OSError as e:
+                print(f"Error creating extraction cache {CACHE_DIR}: {str(e)}")
+                _store_usable = False
+        return _store_usable
+
+def _memory_get(key):
+    with _memory_lock:
+        if key not in _memory_cache:
+            return None
+        _memory_cache.move_to_end(key)
+        return _memory_cache[key]
+
+def _memory_put(key, value):
+    if MEMORY_CACHE_ENTRIES <= 0:
+        return
+    with _memory_lock:
+        _memory_cache[key] = value
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_ENTRIES:
+            _memory_cache.popitem(last=False)
+
+def _disk_get(key):
+    if not _store_ready():
+        return None
+    path = _disk_path(key)
+    try:
+        # Only unpickle entries this user wrote: no symlinks, and a private file and directory
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_BINARY", 0))
+        with os.fdopen(fd, "rb") as f:
+            if not (_private(os.fstat(f.fileno())) and _private(os.stat(os.path.dirname(path)))):
+                print(f"Error reading extraction cache entry {key}: owned by or writable by another user, ignored")
+                return None
+            value = pickle.load(f)
+        # Refresh the modification time so eviction treats this entry as recently used
+        os.utime(path)
+        return value
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error reading extraction cache entry {key}: {str(e)}")
+        return None
+
+def write_file(path, dump, binary=True, dir_mode=0o777):
+    """
+    Write a disk store entry through a temporary file renamed into place, so concurrent
+    readers never see a partial entry.
+    
+    Args:
+        path (str): The entry's path; missing directories are created.
+        dump (callable): Called with the open file to write the entry.
+        binary (bool, optional): Open the file in binary mode, else as UTF-8 text.
+        dir_mode (int, optional): Mode of the directories created (before the umask).
+    
+    Returns:
+        int: The entry's size in bytes.
+    """
+    os.makedirs(os.path.dirname(path), mode=dir_mode, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with (os.fdopen(fd, "wb") if binary else os.fdopen(fd, "w", encoding="utf-8")) as f:
+            dump(f)
+            written = f.tell()
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return written
+
+def _disk_put(key, value):
+    global _written_since_check
+    if not _store_ready():
+        return
+    try:
+        written = write_file(_disk_path(key), lambda f: pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL), dir_mode=0o700)
+    except Exception as e:
+        print(f"Error writing extraction cache entry {key}: {str(e)}")
+        return
+    with _disk_lock:
+        _written_since_check += written
+        if _written_since_check < EVICT_CHECK_BYTES:
+            return
+        _written_since_check = 0
+    _evict_disk()
+
+def _evict_disk():
+    """Remove least recently used entries until the disk cache fits within CACHE_MAX_BYTES."""
+    with _disk_lock:
+        evict_files(CACHE_DIR, CACHE_MAX_BYTES, ".pkl")
+
+def evict_files(directory, max_bytes, extension):
+    """
+    Remove the least recently used files of a disk store until it fits within max_bytes.
+    
+    Files count as used when they are written or their modification time is refreshed on a
+    read. Callers serialize eviction of a directory themselves.
+    
+    Args:
+        directory (str): The store's directory, searched recursively.
+        max_bytes (int): The size the store may keep.
+        extension (str): The extension of the store's entries; other files are left alone.
+    
+    Returns:
+        list: Paths of the removed files.
+    """
+    entries = []
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(extension):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    
+    removed = []
+    if total <= max_bytes:
+        return removed
+    
+    entries.sort()
+    for _, size, path in entries:
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        removed.append(path)
+        total -= size
+        if total <= max_bytes:
+            break
+    return removed
+
+def get(key, memory=True):
+    """
+    Look up a cached value, checking the in-process LRU before the disk store.
+    
+    Args:
+        key (str): A key produced by content_key().
+        memory (bool, optional): Use the in-process LRU. Set it to False for small, numerous
+            entries (single pages) that would only push whole documents out of it.
+    
+    Returns:
+        The cached value, or None on a miss.
+    """
+    if memory:
+        value = _memory_get(key)
+        if value is not None:
+            return value
+    
+    value = _disk_get(key)
+    if value is not None and memory:
+        _memory_put(key, value)
+    return value
+
+def put(key, value, memory=True):
+    """
+    Store a value in both the in-process LRU and the disk store.
+    
+    Args:
+        key (str): A key produced by content_key().
+        value: Any picklable value.
+        memory (bool, optional): Also keep it in the in-process LRU (see get).
+    """
+    if memory:
+        _memory_put(key, value)
+    _disk_put(key, value)
+
+def clear():
+    """Drop every entry from the in-process LRU. The disk store is left untouched."""
+    with _memory_lock:
+        _memory_cache.clear()
@@ -0,0 +1,273 @@
+import os
+import time
+import signal
+import atexit
+import threading
+import multiprocessing
+from contextlib import ExitStack
+import streamlit as st
+import document_processing as dp
+import extraction_budget as eb
+import extraction_cache as ec
+import upload_handling as uh
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Worker process pool for extraction; 0 keeps extraction in the app process
+EXTRACTION_WORKERS = int(os.getenv("INSURLIT_EXTRACTION_WORKERS", "0"))
+# A worker whose resident memory, with that of its PDF page pool, passes this while extracting is
+# killed and the extraction fails
+WORKER_MAX_RSS_MB = int(os.getenv("INSURLIT_WORKER_MAX_RSS_MB", "1024"))
+# Workers are replaced after this many documents, so memory the parsers never return is released
+WORKER_MAX_DOCUMENTS = int(os.getenv("INSURLIT_WORKER_MAX_DOCUMENTS", "25"))
+# Optional hard cap on each worker's address space (RLIMIT_AS); 0 leaves it unset
+WORKER_ADDRESS_SPACE_MB = int(os.getenv("INSURLIT_WORKER_ADDRESS_SPACE_MB", "0"))
+RECYCLE_RSS_RATIO = 0.75  # Also replace a worker left holding this share of WORKER_MAX_RSS_MB after a document
+WORKER_GRACE_SECONDS = 30  # Time allowed past the document budget before a worker is presumed hung
+POLL_SECONDS = 0.1
+STOP_SECONDS = 5
+
+_idle_workers = []
+_idle_lock = threading.Lock()
+_worker_slots = threading.Semaphore(max(EXTRACTION_WORKERS, 1))
+
+class ExtractionWorkerError(RuntimeError):
+    """Raised when an extraction worker fails, crashes, runs out of memory or hangs."""
+
+def _worker_main(conn, cancel_event, address_space_mb):
+    """
+    Worker process loop: receive extraction requests, run document_processing.extract_text
+    and send back progress messages and the result.
+    """
+    if address_space_mb and resource is not None:
+        limit = address_space_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    # Results are cached on disk for every process; an in-memory copy here would die with the worker
+    ec.MEMORY_CACHE_ENTRIES = 0
+    
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if request is None:
+            return
+        
+        uploads = []
+        for entry in request["files"]:
+            data = b"" if entry.get("spilled_path") else conn.recv_bytes()
+            uploads.append(uh.MemoryUpload(entry["name"], entry["type"], data, entry["size"], entry.get("spilled_path")))
+        
+        def send_progress(pages_done, page_count):
+            conn.send(("progress", pages_done, page_count))
+        
+        try:
+            extracted_text, document_info = dp.extract_text(
+                uploads if request["batch"] else uploads[0], send_progress, cancel_event, request["deadline"]
+            )
+            conn.send(("result", extracted_text, document_info, uh.process_tree_rss_bytes(os.getpid())))
+        except MemoryError:
+            conn.send(("error", "The document needed more memory than an extraction worker is allowed"))
+        except Exception as e:
+            conn.send(("error", str(e)))
+        finally:
+            uploads.clear()
+
+class _Worker:
+    """One worker process and the pipe used to talk to it."""
+    
+    def __init__(self):
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.cancel_event = context.Event()
+        # Not a daemon: large PDFs are split across a process pool of the worker's own
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, self.cancel_event, WORKER_ADDRESS_SPACE_MB),
+            name="insurlit-extraction-worker"
+        )
+        self.process.start()
+        child_conn.close()
+        self.documents = 0
+    
+    def run(self, request, payloads, progress_callback=None, cancel_event=None):
+        """
+        Send one extraction request and wait for its result, enforcing the memory limit.
+        
+        Returns:
+            tuple: (extracted_text, document_info, rss_bytes) where rss_bytes is the resident
+            memory of the worker and its PDF page pool after the extraction.
+        """
+        self.cancel_event.clear()
+        self.conn.send(request)
+        for payload in payloads:
+            self.conn.send_bytes(payload)
+        
+        max_rss = WORKER_MAX_RSS_MB * 1024 * 1024
+        # The extraction stops itself at the request's deadline, shared by every file of a bundle
+        deadline = request["deadline"] + WORKER_GRACE_SECONDS
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                self.cancel_event.set()
+            if max_rss and self._rss() > max_rss:
+                self.kill()
+                raise ExtractionWorkerError(f"Extraction used more than {WORKER_MAX_RSS_MB} MB of memory and was stopped")
+            if time.monotonic() > deadline:
+                self.kill()
+                raise ExtractionWorkerError("Extraction did not finish in time and was stopped")
+            
+            try:
+                if not self.conn.poll(POLL_SECONDS):
+                    if not self.process.is_alive():
+                        raise EOFError
+                    continue
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                self.kill()
+                raise ExtractionWorkerError(f"Extraction worker stopped unexpectedly (exit code {self.process.exitcode})")
+            
+            if message[0] == "progress":
+                if progress_callback:
+                    progress_callback(*message[1:])
+            elif message[0] == "result":
+                return message[1:]
+            else:
+                raise ExtractionWorkerError(message[1])
+    
+    def _rss(self):
+        """Resident memory of the worker and the processes it started (see document_processing._get_pdf_pool)."""
+        try:
+            return uh.process_tree_rss_bytes(self.process.pid)
+        except (OSError, ValueError):
+            return 0
+    
+    def stop(self):
+        """Ask the worker to exit, killing it if it does not."""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(STOP_SECONDS)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+    
+    def kill(self):
+        """Kill the worker along with its PDF page pool, which would otherwise outlive it."""
+        try:
+            children = uh.descendant_pids(self.process.pid)
+        except OSError:
+            children = []
+        self.process.kill()
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+        self.process.join()
+
+def _checkout():
+    """Take an idle worker, starting a new one if none is idle; blocks while the pool is fully busy."""
+    _worker_slots.acquire()
+    with _idle_lock:
+        while _idle_workers:
+            worker = _idle_workers.pop()
+            if worker.process.is_alive():
+                return worker
+            worker.conn.close()
+    try:
+        return _Worker()
+    except Exception:
+        _worker_slots.release()
+        raise
+
+def _checkin(worker, recycle, finished=True):
+    """
+    Return a worker to the pool, or retire it when it has done enough or holds too much memory.
+    
+    A worker that did not finish its document (the run failed or was abandoned) is killed
+    rather than left to work on.
+    """
+    try:
+        if not finished:
+            if worker.process.is_alive():
+                worker.kill()
+            worker.conn.close()
+        elif recycle:
+            worker.stop()
+        else:
+            with _idle_lock:
+                _idle_workers.append(worker)
+    finally:
+        _worker_slots.release()
+
+def shutdown():
+    """Stop every idle worker."""
+    with _idle_lock:
+        workers = list(_idle_workers)
+        _idle_workers.clear()
+    for worker in workers:
+        worker.stop()
+
+atexit.register(shutdown)
+
+def extract_text(uploaded_file, progress_callback=None, cancel_event=None):
+    """
+    Extract text like document_processing.extract_text, in an isolated worker process.
+    
+    Workers are spawned on demand, up to EXTRACTION_WORKERS at once. A worker is killed if
+    its resident memory, with that of its PDF page pool, passes WORKER_MAX_RSS_MB while
+    extracting, and replaced after WORKER_MAX_DOCUMENTS documents or when a document leaves
+    it holding most of that limit, so memory the parsers never release is returned to the system. A worker that crashes,
+    is killed or hangs fails only the current extraction, with an ExtractionWorkerError.
+    With EXTRACTION_WORKERS set to 0 the extraction runs in this process instead.
+    
+    Args:
+        uploaded_file: A Streamlit UploadedFile object, or a list of them (see
+            document_processing.extract_text).
+        progress_callback (callable, optional): Called as progress_callback(pages_done, page_count).
+        cancel_event (threading.Event, optional): Set it to stop the extraction early.
+    
+    Returns:
+        tuple: (extracted_text, document_info) as returned by document_processing.extract_text.
+    """
+    if EXTRACTION_WORKERS <= 0:
+        return dp.extract_text(uploaded_file, progress_callback, cancel_event)
+    
+    try:
+        batch = isinstance(uploaded_file, (list, tuple))
+        with ExitStack() as stack:
+            # Large uploads are spilled to disk and opened by the worker; small ones are piped over from their buffer
+            files = []
+            payloads = []
+            for f in (uploaded_file if batch else [uploaded_file]):
+                source, spilled = stack.enter_context(uh.open_upload(f))
+                entry = {"name": f.name, "type": f.type, "size": f.size}
+                if spilled:
+                    entry["spilled_path"] = source
+                else:
+                    payloads.append(stack.enter_context(f.getbuffer()))
+                files.append(entry)
+            
+            worker = _checkout()
+            recycle = True
+            finished = False
+            try:
+                # time.monotonic() is system-wide, so the worker can stop at a deadline set here
+                request = {"files": files, "batch": batch, "deadline": time.monotonic() + eb.DOCUMENT_TIME_BUDGET}
+                extracted_text, document_info, rss = worker.run(request, payloads, progress_callback, cancel_event)
+                finished = True
+                worker.documents += 1
+                recycle = (worker.documents >= WORKER_MAX_DOCUMENTS
+                           or (WORKER_MAX_RSS_MB and rss >= WORKER_MAX_RSS_MB * 1024 * 1024 * RECYCLE_RSS_RATIO))
+            finally:
+                # Any failure, including the app abandoning the run mid-extraction, retires the worker
+                _checkin(worker, recycle, finished)
+        return extracted_text, document_info
+    
+    except Exception as e:
+        st.error(f"Error extracting text: {str(e)}")
+        raise e
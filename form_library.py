@@ -0,0 +1,192 @@
+import os
+import re
+import json
+import hashlib
+import tempfile
+import threading
+import extraction_cache as ec
+
+# Library of standard policy forms (ISO and carrier forms issued unchanged to many
+# policyholders), shared by every session and process that points at the same directory
+FORM_LIBRARY_DIR = os.getenv("INSURLIT_FORM_LIBRARY_DIR", os.path.join(tempfile.gettempdir(), "insurlit_forms"))
+# A form's text counts as standard once this many different documents contained it word for
+# word; before that nothing derived from it is stored, so a policyholder's own pages never are
+FORM_MIN_DOCUMENTS = int(os.getenv("INSURLIT_FORM_MIN_DOCUMENTS", "3"))
+FORM_MIN_TOKENS = 150  # Shorter forms are not worth a library entry
+EDGE_LINES = 3  # Lines at the top and bottom of a page searched for its form number
+
+# ISO-style numbers ("PP 00 01 01 05": line, form, edition month and year) and carrier
+# numbers printed as "Form 9010A (04-19)"
+FORM_NUMBER = re.compile(
+    r"\b(?P<iso>[A-Z]{2} ?\d{2} ?\d{2} ?\d{2} ?\d{2})\b"
+    r"|\bForm(?: No\.?| Number)?:? ?(?P<carrier>[A-Z0-9][A-Z0-9-]{2,} ?\(\d{2}[/-]\d{2,4}\))"
+)
+PAGE_NUMBER = re.compile(r"\bpage \d+(?: of \d+)?\b", re.IGNORECASE)
+WORD = re.compile(r"[a-z0-9]+")
+SUMMARY_KEYS = ("coverage_details", "exclusions", "deductibles", "premiums", "claims_process", "unusual_clauses")
+
+_library_lock = threading.Lock()
+
+def _normalize_number(match):
+    """Spell a matched form number one way: "PP0001 0105" becomes "PP 00 01 01 05"."""
+    if match.group("carrier"):
+        return " ".join(match.group("carrier").split())
+    compact = match.group("iso").replace(" ", "")
+    return " ".join(compact[i:i + 2] for i in range(0, len(compact), 2))
+
+def page_form_number(page_text):
+    """
+    Return the form number printed at the top or bottom of a page, or None.
+    
+    An edge line naming more than one form (a declarations page's list of forms) is not a
+    page's own form number.
+    """
+    lines = [line for line in page_text.split("\n") if line.strip()]
+    for line in lines[:EDGE_LINES] + lines[-EDGE_LINES:]:
+        matches = list(FORM_NUMBER.finditer(line))
+        if len(matches) == 1:
+            return _normalize_number(matches[0])
+    return None
+
+def form_fingerprint(page_texts):
+    """
+    Fingerprint a form's text: a digest of its words, case folded, with form numbers and
+    page numbers left out, so the same form matches wherever it falls in a policy.
+    
+    Returns:
+        tuple: (fingerprint, token_count).
+    """
+    digest = hashlib.sha256()
+    token_count = 0
+    for text in page_texts:
+        for line in text.split("\n"):
+            line = PAGE_NUMBER.sub(" ", FORM_NUMBER.sub(" ", line))
+            tokens = WORD.findall(line.casefold())
+            # A line of nothing but digits is a page number too
+            if tokens and not all(token.isdigit() for token in tokens):
+                digest.update(" ".join(tokens).encode("utf-8") + b"\n")
+                token_count += len(tokens)
+    return digest.hexdigest(), token_count
+
+def find_forms(page_info):
+    """
+    Find the numbered forms in a document.
+    
+    A form is a run of consecutive pages printing the same form number at their top or
+    bottom. Run this on the extracted page texts before normalization, which drops form
+    numbers as running footers.
+    
+    Args:
+        page_info (dict): Page number to page record with text.
+    
+    Returns:
+        list: One dict per form with form_number, first_page, last_page and fingerprint
+        (see form_fingerprint), in page order.
+    """
+    runs = []
+    for page_number in sorted(page_info):
+        number = page_form_number(page_info[page_number]["text"])
+        if number and runs and runs[-1][0] == number and runs[-1][2] == page_number - 1:
+            runs[-1][2] = page_number
+        elif number:
+            runs.append([number, page_number, page_number])
+    
+    forms = []
+    for number, first_page, last_page in runs:
+        fingerprint, token_count = form_fingerprint(page_info[n]["text"] for n in range(first_page, last_page + 1))
+        if token_count >= FORM_MIN_TOKENS:
+            forms.append({"form_number": number, "first_page": first_page, "last_page": last_page, "fingerprint": fingerprint})
+    return forms
+
+def _entry_path(fingerprint):
+    return os.path.join(FORM_LIBRARY_DIR, fingerprint[:2], fingerprint + ".json")
+
+def lookup(fingerprint):
+    """Return the library entry for a form fingerprint, or None."""
+    try:
+        with open(_entry_path(fingerprint), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error reading form library entry {fingerprint}: {str(e)}")
+        return None
+
+def _write_entry(entry):
+    try:
+        ec.write_file(_entry_path(entry["fingerprint"]), lambda f: json.dump(entry, f), binary=False)
+    except Exception as e:
+        print(f"Error writing form library entry {entry['fingerprint']}: {str(e)}")
+
+def is_standard(entry):
+    """Whether a library entry has been seen in enough different documents to be shared."""
+    return entry is not None and len(entry["documents"]) >= FORM_MIN_DOCUMENTS
+
+def record_forms(forms, document_key):
+    """
+    Count a document's forms toward the library.
+    
+    Only the fingerprint, the form number and a digest of the document's cache key are kept
+    until a form is standard (see is_standard); a document is counted once per form.
+    
+    Args:
+        forms (list): Forms found by find_forms.
+        document_key (str): The document's extraction cache key.
+    """
+    document_id = hashlib.sha256(document_key.encode("ascii")).hexdigest()[:16]
+    with _library_lock:
+        for form in forms:
+            entry = lookup(form["fingerprint"]) or {
+                "form_number": form["form_number"],
+                "fingerprint": form["fingerprint"],
+                "documents": [],
+                "sections": [],
+                "summaries": {}
+            }
+            if is_standard(entry) or document_id in entry["documents"]:
+                continue
+            entry["documents"].append(document_id)
+            _write_entry(entry)
+
+def standard_forms(document_info):
+    """
+    Return the forms of a document that the library holds as standard.
+    
+    Returns:
+        list: (form, entry) pairs, form being a document_info["forms"] item and entry its
+        library entry.
+    """
+    matched = []
+    for form in (document_info or {}).get("forms") or []:
+        entry = lookup(form["fingerprint"])
+        if is_standard(entry):
+            matched.append((form, entry))
+    return matched
+
+def form_sections(document_info, form):
+    """The sections of a document's section index that start within a form, with pages counted from the form's first page."""
+    sections = (document_info.get("section_index") or {}).get("sections") or []
+    return [
+        {"title": section["title"], "level": section["level"], "page": section["page_start"] - form["first_page"] + 1}
+        for section in sections
+        if form["first_page"] <= section["page_start"] <= form["last_page"]
+    ]
+
+def store_summary(entry, readability_preference, fragment, sections):
+    """
+    Save a standard form's summary fragment and section outline in the library.
+    
+    Args:
+        entry (dict): The form's library entry; it is updated too.
+        readability_preference (str): The summary language level the fragment was written for.
+        fragment (dict): Summary sections (see SUMMARY_KEYS) covering the form alone.
+        sections (list): The form's section outline (see form_sections); kept from the first summary.
+    """
+    with _library_lock:
+        # Another session may have added a summary at another language level meanwhile
+        current = lookup(entry["fingerprint"]) or entry
+        current["summaries"][readability_preference] = {key: list(fragment.get(key) or []) for key in SUMMARY_KEYS}
+        if not current["sections"]:
+            current["sections"] = sections
+        _write_entry(current)
+        entry.update(current)
@@ -2,6 +2,11 @@ import os
 import json
 import google.generativeai as genai
 import streamlit as st
+import table_extraction as te
+import policy_facts as pf
+import form_library as fl
+import document_index as di
+import page_triage as pt
 from dotenv import load_dotenv
 load_dotenv()
 # Configure the Gemini API with the API key
@@ -16,6 +21,110 @@ def setup_gemini():
     genai.configure(api_key=API_KEY)
     return True
 
+def _summary_readability(readability_preference):
+    """
+    Return the audience and the readability instructions for a summary prompt.
+    
+    Returns:
+        tuple: (audience, readability_target)
+    """
+    # Set readability target based on preference
+    readability_target = ""
+    if readability_preference == "Easy (Elementary School Level)":
+        readability_target = """
+        VERY IMPORTANT: Your summary MUST be written at an elementary school reading level (Flesch-Kincaid score between 71-100). 
+        Use very short sentences (10-15 words), simple words (1-2 syllables), and basic everyday vocabulary.
+        Completely avoid complex terms, technical jargon, and legal language.
+        """
+    else:  # Moderate (High School Level)
+        readability_target = """
+        VERY IMPORTANT: Your summary MUST be written at a high school reading level (Flesch-Kincaid score between 51-70). 
+        Use moderate-length sentences (15-20 words), simple to moderate vocabulary, and clear explanations.
+        Minimize complex terms, technical jargon, and legal language, but you can include more detail than in an elementary-level summary.
+        """
+    
+    # Determine audience based on preference
+    audience = "elementary school student" if readability_preference == "Easy (Elementary School Level)" else "high school student"
+    return audience, readability_target
+
+def _parse_summary_json(response_text):
+    """
+    Parse a model response holding a summary JSON object.
+    
+    Raises:
+        json.JSONDecodeError: If the response is not valid JSON.
+    """
+    # Check if the response is wrapped in triple backticks and a JSON indicator
+    if "```json" in response_text and "```" in response_text:
+        json_content = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        json_content = response_text.split("```")[1].split("```")[0].strip()
+    else:
+        json_content = response_text
+    
+    # Clean the JSON content to handle potential escape character issues
+    json_content = json_content.replace('\\', '\\\\')
+    return json.loads(json_content)
+
+def _text_without_pages(text, document_info, pages):
+    """The extracted text without some of its pages, joined as in the extracted text."""
+    if not pages:
+        return text
+    return "".join(page["text"] + "\n\n" for page_num, page in document_info["page_info"].items() if page_num not in pages)
+
+def _left_out_reference(label, reason):
+    return f"{label}: {reason.replace('_', ' ')} (left out of the text)\n"
+
+def _pages_text(document_info, first_page, last_page):
+    """The text of a range of pages, joined as in the extracted text."""
+    page_info = document_info["page_info"]
+    return "".join(page_info[n]["text"] + "\n\n" for n in range(first_page, last_page + 1))
+
+def _summarize_form(form_number, form_text, readability_preference):
+    """
+    Summarize one standard form on its own, for the form library.
+    
+    The bullets cite the form number and section titles rather than page numbers, since the
+    form falls on different pages in every policy that includes it.
+    
+    Returns:
+        dict | None: Summary sections (see form_library.SUMMARY_KEYS), or None if the
+        response could not be parsed.
+    """
+    audience, readability_target = _summary_readability(readability_preference)
+    prompt = f"""
+    You are an insurance policy expert. The following text is the standard auto insurance form {form_number},
+    which is included unchanged in many policies. Provide a clear, structured summary of it in plain
+    language that a typical {audience} can understand.
+    
+    Form text:
+    {form_text}
+    
+    Please format your response as a JSON object with the following sections:
+    1. coverage_details: List of what is covered in plain language.
+    2. exclusions: List of what is not covered.
+    3. deductibles: List explaining how deductibles apply.
+    4. premiums: List explaining the premium structure and payment details.
+    5. claims_process: List summarizing how to file a claim and what to expect.
+    6. unusual_clauses: List identifying any unusual or potentially hidden clauses that consumers should be aware of.
+    
+    Each section should contain an array of strings, with each string being a clear, simple bullet point.
+    Refer to the form and its sections, never to page numbers (e.g., "Rental cars are covered (Form {form_number}, PART D section)").
+    
+    {readability_target}
+    
+    If information for a section is not found, provide an empty array.
+    Ensure your response is valid JSON that can be parsed by Python's json.loads().
+    """
+    model = genai.GenerativeModel('models/gemini-2.0-flash')
+    response = model.generate_content(prompt)
+    try:
+        fragment = _parse_summary_json(response.text)
+    except json.JSONDecodeError:
+        print(f"Error summarizing form {form_number}: response was not valid JSON")
+        return None
+    return {key: fragment.get(key) or [] for key in fl.SUMMARY_KEYS}
+
 def generate_summary(text, document_info=None, readability_preference="Easy (Elementary School Level)"):
     """
     Generate a structured summary of the insurance policy using Gemini API.
@@ -24,10 +133,19 @@ def generate_summary(text, document_info=None, readability_preference="Easy (Ele
         text (str): The extracted text from the insurance document.
         document_info (dict, optional): Document metadata containing page numbers and section headers.
         readability_preference (str, optional): The level of readability to target ("Easy" or "Moderate").
-        
+    
     Returns:
         dict: A dictionary containing structured summaries for each section.
     """
+    # A summary written before for this document or a near-duplicate of it (a rescan or
+    # re-export, see document_index) is reused, with the figures found in this one filled in
+    similar = di.find_similar(document_info)
+    reused = (similar or {}).get("summaries", {}).get(readability_preference)
+    if reused is not None:
+        summary = dict(reused)
+        summary.update(pf.summary_sections((document_info or {}).get("policy_facts") or []))
+        return summary
+    
     if not setup_gemini():
         return {
             "coverage_details": ["API key not configured. Unable to generate summary."],
@@ -39,13 +157,18 @@ def generate_summary(text, document_info=None, readability_preference="Easy (Ele
         }
     
     try:
+        # Blank pages, cover letters, privacy notices and signature pages (see page_triage)
+        # stay citable by page number, but their text is not sent to the model
+        left_out = pt.left_out_pages(document_info)
+        text = _text_without_pages(text, document_info, left_out)
+        
         # First, verify if this is actually an auto insurance document
         verification_prompt = f"""
         You are an insurance policy expert. Review the following document text and determine if it is an auto insurance policy.
-
+        
         Document text:
         {text[:1500]}  # Using first 1500 chars to save tokens
-
+        
         Is this document an auto insurance policy? 
         Respond with only "yes" if it is an auto insurance policy document.
         Respond with "no: [document type]" if it is not, where [document type] is a brief description of what the document actually is.
@@ -67,50 +190,84 @@ def generate_summary(text, document_info=None, readability_preference="Easy (Ele
                 "unusual_clauses": []
             }
         
+        # Deductibles and premiums found locally (schedule tables, and phrasings such as
+        # "$500 deductible") are filled in without the model, and the tables are left out of the prompt
+        schedule_rows = (document_info or {}).get("schedule_rows") or []
+        local_sections = pf.summary_sections((document_info or {}).get("policy_facts") or [])
+        
+        # Standard forms (see form_library) are summarized once for every policy that includes
+        # them; only the rest of the policy is sent to the model
+        form_fragments = []
+        form_pages = set()
+        form_notes = ""
+        for form, entry in fl.standard_forms(document_info):
+            fragment = entry["summaries"].get(readability_preference)
+            if fragment is None:
+                form_text = _pages_text(document_info, form["first_page"], form["last_page"])
+                fragment = _summarize_form(form["form_number"], form_text, readability_preference)
+                if fragment is None:
+                    continue
+                fl.store_summary(entry, readability_preference, fragment, fl.form_sections(document_info, form))
+            form_fragments.append(fragment)
+            form_pages.update(range(form["first_page"], form["last_page"] + 1))
+            section_titles = ", ".join(dict.fromkeys(section["title"] for section in entry["sections"]))
+            form_notes += (f"Pages {form['first_page']}-{form['last_page']} hold the standard form {form['form_number']}"
+                           f"{f' ({section_titles})' if section_titles else ''}, which is summarized separately.\n")
+        remainder = _text_without_pages(text, document_info, form_pages | set(left_out))
+        prompt_text = te.without_schedule_lines(remainder, schedule_rows)
+        
+        section_requests = {
+            "deductibles": "deductibles: List explaining deductible amounts and when they apply.",
+            "premiums": "premiums: List explaining the premium structure and payment details."
+        }
+        section_notes = ""
+        if form_notes:
+            section_notes += form_notes + "Those pages have been removed from the text above; do not summarize them.\n"
+        for key in local_sections:
+            section_requests[key] = f"{key}: Always an empty array; this section is filled in from the policy's declarations."
+        if schedule_rows:
+            section_notes += "The policy's coverage schedule tables have been removed from the text above; do not guess at them.\n"
+        limits = [f"{row['coverage']}: {row['limit']} (Page {row['page']})" for row in schedule_rows if row["limit"]]
+        if limits:
+            section_notes += "Coverage limits from the removed tables:\n" + "\n".join(limits) + "\n"
+        
         # Prepare document reference information for the prompt
         reference_info = ""
-        if document_info and document_info.get("type") == "application/pdf" and "page_info" in document_info:
+        if document_info and "page_info" in document_info:
             reference_info = "Page and section information:\n"
             for page_num, info in document_info["page_info"].items():
+                if page_num in form_pages:
+                    continue
                 headers = info.get("headers", [])
-                if headers:
-                    reference_info += f"Page {page_num}: {', '.join(headers)}\n"
+                label = f"Page {page_num}"
+                if info.get("source_page"):
+                    # Pages of a bundle also name the file they came from
+                    label += f" ({info['source_file']}, page {info['source_page']})"
+                if page_num in left_out:
+                    reference_info += _left_out_reference(label, left_out[page_num])
+                elif headers:
+                    reference_info += f"{label}: {', '.join(headers)}\n"
                 else:
-                    reference_info += f"Page {page_num}\n"
+                    reference_info += f"{label}\n"
         
-        # Set readability target based on preference
-        readability_target = ""
-        if readability_preference == "Easy (Elementary School Level)":
-            readability_target = """
-            VERY IMPORTANT: Your summary MUST be written at an elementary school reading level (Flesch-Kincaid score between 71-100). 
-            Use very short sentences (10-15 words), simple words (1-2 syllables), and basic everyday vocabulary.
-            Completely avoid complex terms, technical jargon, and legal language.
-            """
-        else:  # Moderate (High School Level)
-            readability_target = """
-            VERY IMPORTANT: Your summary MUST be written at a high school reading level (Flesch-Kincaid score between 51-70). 
-            Use moderate-length sentences (15-20 words), simple to moderate vocabulary, and clear explanations.
-            Minimize complex terms, technical jargon, and legal language, but you can include more detail than in an elementary-level summary.
-            """
+        audience, readability_target = _summary_readability(readability_preference)
         
-        # Determine audience based on preference
-        audience = "elementary school student" if readability_preference == "Easy (Elementary School Level)" else "high school student"
-            
         # Create a prompt for the Gemini API
         prompt = f"""
         You are an insurance policy expert. Analyze the following auto insurance policy text and provide a clear, 
         structured summary in plain language that a typical {audience} can understand. 
         
         Policy text:
-        {text}
+        {prompt_text}
         
         {reference_info}
+        {section_notes}
         
         Please format your response as a JSON object with the following sections:
         1. coverage_details: List of what is covered in plain language.
         2. exclusions: List of what is not covered.
-        3. deductibles: List explaining deductible amounts and when they apply.
-        4. premiums: List explaining the premium structure and payment details.
+        3. {section_requests["deductibles"]}
+        4. {section_requests["premiums"]}
         5. claims_process: List summarizing how to file a claim and what to expect.
         6. unusual_clauses: List identifying any unusual or potentially hidden clauses that consumers should be aware of.
         
@@ -128,22 +285,11 @@ def generate_summary(text, document_info=None, readability_preference="Easy (Ele
         response = model.generate_content(prompt)
         
         # Parse the response as JSON
-        response_text = response.text
-        
-        # Check if the response is wrapped in triple backticks and a JSON indicator
-        if "```json" in response_text and "```" in response_text:
-            json_content = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            json_content = response_text.split("```")[1].split("```")[0].strip()
-        else:
-            json_content = response_text
-        
-        # Clean the JSON content to handle potential escape character issues
-        json_content = json_content.replace('\\', '\\\\')
-        
+        parsed = True
         try:
-            summary = json.loads(json_content)
+            summary = _parse_summary_json(response.text)
         except json.JSONDecodeError:
+            parsed = False
             # If we can't parse as JSON, create a simple structure with the error text
             st.warning("Could not parse model response as JSON. Creating simplified summary.")
             summary = {
@@ -164,6 +310,13 @@ def generate_summary(text, document_info=None, readability_preference="Easy (Ele
         for key in expected_keys:
             if key not in summary:
                 summary[key] = []
+        for fragment in form_fragments:
+            for key in expected_keys:
+                summary[key] = summary[key] + fragment.get(key, [])
+        if parsed:
+            # Indexed without the local sections, which are filled in from each document's own facts
+            di.store_summary(document_info, readability_preference, dict(summary))
+        summary.update(local_sections)
         
         return summary
     
@@ -187,21 +340,38 @@ def answer_question(question, document_text, document_info=None, readability_pre
         document_text (str): The extracted text from the insurance document.
         document_info (dict, optional): Document metadata containing page numbers and section headers.
         readability_preference (str, optional): The level of readability to target ("Easy" or "Moderate").
-        
+    
     Returns:
         str: The answer to the user's question.
     """
+    # Lookups of a single figure (a deductible, premium, limit, date or VIN) are answered
+    # from the facts found at extraction, without a model round trip
+    local_answer = pf.answer_question(question, (document_info or {}).get("policy_facts"), readability_preference)
+    if local_answer:
+        return local_answer
+    
+    # The same question asked before about this document or a near-duplicate of it
+    similar = di.find_similar(document_info)
+    reused = ((similar or {}).get("answers") or {}).get(readability_preference, {}).get(di.question_key(question))
+    if reused:
+        return reused
+    
     if not setup_gemini():
         return "API key not configured. Unable to answer questions."
     
     try:
+        # Blank pages are left out (see page_triage); light pages such as cover letters and
+        # signature pages stay, since they answer questions about the agent or the signing
+        left_out = pt.left_out_pages(document_info, ("skip",))
+        document_text = _text_without_pages(document_text, document_info, left_out)
+        
         # First, verify if this is actually an auto insurance document
         verification_prompt = f"""
         You are an insurance policy expert. Review the following document text and determine if it is an auto insurance policy.
-
+        
         Document text:
         {document_text[:1500]}  # Using first 1500 chars to save tokens
-
+        
         Is this document an auto insurance policy? 
         Respond with only "yes" if it is an auto insurance policy document.
         Respond with "no: [document type]" if it is not, where [document type] is a brief description of what the document actually is.
@@ -218,14 +388,20 @@ def answer_question(question, document_text, document_info=None, readability_pre
         
         # Prepare document reference information for the prompt
         reference_info = ""
-        if document_info and document_info.get("type") == "application/pdf" and "page_info" in document_info:
+        if document_info and "page_info" in document_info:
             reference_info = "Page and section information:\n"
             for page_num, info in document_info["page_info"].items():
                 headers = info.get("headers", [])
-                if headers:
-                    reference_info += f"Page {page_num}: {', '.join(headers)}\n"
+                label = f"Page {page_num}"
+                if info.get("source_page"):
+                    # Pages of a bundle also name the file they came from
+                    label += f" ({info['source_file']}, page {info['source_page']})"
+                if page_num in left_out:
+                    reference_info += _left_out_reference(label, left_out[page_num])
+                elif headers:
+                    reference_info += f"{label}: {', '.join(headers)}\n"
                 else:
-                    reference_info += f"Page {page_num}\n"
+                    reference_info += f"{label}\n"
         
         # Set readability target based on preference
         readability_target = ""
@@ -241,7 +417,7 @@ def answer_question(question, document_text, document_info=None, readability_pre
             Use moderate-length sentences (15-20 words), simple to moderate vocabulary, and clear explanations.
             Minimize complex terms, technical jargon, and legal language, but you can include more detail than in an elementary-level answer.
             """
-            
+        
         # Create a prompt for the Gemini API
         prompt = f"""
         You are an insurance policy expert. Answer the following question about an auto insurance policy 
@@ -265,6 +441,7 @@ def answer_question(question, document_text, document_info=None, readability_pre
         model = genai.GenerativeModel('models/gemini-2.0-flash')
         response = model.generate_content(prompt)
         
+        di.store_answer(document_info, readability_preference, question, response.text)
         return response.text
     
     except Exception as e:
@@ -0,0 +1,262 @@
+import re
+import bisect
+import functools
+import ctypes
+import numpy as np
+import pypdfium2 as pdfium
+
+# A line is a heading candidate when its font is noticeably larger than the body text,
+# or when it is bold on a page whose body text is not
+HEADING_MIN_SIZE_RATIO = 1.12
+HEADING_MIN_BOLD_RATIO = 0.75
+HEADING_MIN_SCORE = 0.6
+HEADING_MAX_CHARS = 120
+MAX_HEADINGS_PER_PAGE = 10
+LINE_TOLERANCE = 0.5  # Vertical gap, as a share of the font size, that starts a new line
+MARGIN_RATIO = 0.05  # Lines this close to the top or bottom edge are running headers and footers
+
+# Score contributions
+SIZE_WEIGHT = 2.5
+BOLD_WEIGHT = 0.8
+CAPS_WEIGHT = 0.3
+NUMBERING_WEIGHT = 0.3
+SENTENCE_PENALTY = 0.5
+MARGIN_PENALTY = 0.6
+
+BOLD_MIN_WEIGHT = 600
+BOLD_FONT_NAME = re.compile(r"bold|black|heavy|semibold|demi", re.IGNORECASE)
+FORCE_BOLD_FLAG = 1 << 18
+NUMBERED_HEADING = re.compile(r"^(?:(?:part|section|article|coverage|schedule|endorsement)\b|[IVX]+\.|\d+(?:\.\d+)*\.?\s|[A-Z]\.\s)", re.IGNORECASE)
+
+def _empty_spans():
+    return {"text": [], "left": np.zeros(0), "top": np.zeros(0), "bottom": np.zeros(0), "size": np.zeros(0), "bold": np.zeros(0)}
+
+@functools.lru_cache(maxsize=256)
+def _is_bold_font_name(name):
+    return bool(BOLD_FONT_NAME.search(name.decode("latin-1") if isinstance(name, bytes) else name))
+
+def _pdfium_char_style(textpage, index, name_buffer, flags):
+    """Return (font size, is bold) for one character of a pdfium text page."""
+    size = pdfium.raw.FPDFText_GetFontSize(textpage, index)
+    weight = pdfium.raw.FPDFText_GetFontWeight(textpage, index)
+    if weight >= BOLD_MIN_WEIGHT:
+        return size, True
+    pdfium.raw.FPDFText_GetFontInfo(textpage, index, name_buffer, len(name_buffer), ctypes.byref(flags))
+    return size, bool(flags.value & FORCE_BOLD_FLAG) or _is_bold_font_name(name_buffer.value)
+
+def pdfium_spans(textpage, raw_text, rects, page_height):
+    """
+    Build the span table of a page from its pdfium text runs.
+    
+    Reading the font of every glyph through ctypes would cost more than the rest of the fast
+    tier, so each run is sampled at its first and last character instead, and its text is
+    sliced out of the already extracted text layer rather than read again.
+    
+    Args:
+        textpage (pdfium.PdfTextPage): The page's open text page.
+        raw_text (str): The text page's full text, as returned by get_text_range().
+        rects (list): (left, bottom, right, top) boxes of the page's text runs.
+        page_height (float): Page height in PDF points.
+    
+    Returns:
+        dict: Span table with text (list of str) and left, top, bottom, size and bold arrays,
+        with top and bottom measured down from the top of the page.
+    """
+    if not rects:
+        return _empty_spans()
+    
+    # pdfium builds its runs by walking the characters in order, so each run's text is the
+    # slice of the text layer between its first character and the next run's first character
+    lines = raw_text.split("\r\n")
+    if len(lines) == len(rects):
+        # The usual case of one run per line: runs start where the text layer's lines do,
+        # with two generated characters for every line break
+        firsts = []
+        index = 0
+        for line in lines:
+            firsts.append(index)
+            index += len(line) + 2
+    else:
+        # Runs split within a line (columns, tab stops): locate each run's first character.
+        # This costs a page-wide hit test per run, so it is only done when needed
+        firsts = []
+        for left, bottom, right, top in rects:
+            firsts.append(pdfium.raw.FPDFText_GetCharIndexAtPos(
+                textpage.raw, min(left + 1, (left + right) / 2), (bottom + top) / 2, 2, (top - bottom) / 2
+            ))
+    starts = sorted(set(index for index in firsts if index >= 0)) + [len(raw_text)]
+    
+    name_buffer = ctypes.create_string_buffer(128)
+    flags = ctypes.c_int()
+    texts = []
+    sizes = []
+    bold = []
+    for (left, bottom, right, top), first in zip(rects, firsts):
+        text = raw_text[first:starts[bisect.bisect_right(starts, first)]].rstrip() if first >= 0 else ""
+        if not text:
+            texts.append("")
+            sizes.append(top - bottom)
+            bold.append(0.0)
+            continue
+        texts.append(text)
+        first_size, first_bold = _pdfium_char_style(textpage.raw, first, name_buffer, flags)
+        last_size, last_bold = _pdfium_char_style(textpage.raw, first + len(text) - 1, name_buffer, flags)
+        sizes.append(max(first_size, last_size))
+        bold.append((first_bold + last_bold) / 2)
+    
+    boxes = np.asarray(rects, dtype=float)
+    sizes = np.asarray(sizes, dtype=float)
+    # Base-14 fonts report a size of zero or one; the glyph box height is a good stand-in
+    sizes = np.where(sizes > 1, sizes, boxes[:, 3] - boxes[:, 1])
+    return {
+        "text": texts,
+        "left": boxes[:, 0],
+        "top": page_height - boxes[:, 3],
+        "bottom": page_height - boxes[:, 1],
+        "size": sizes,
+        "bold": np.asarray(bold, dtype=float)
+    }
+
+def plumber_spans(chars):
+    """
+    Build the span table of a page from pdfplumber's chars, one span per glyph.
+    
+    Args:
+        chars (list): The page's pdfplumber char dicts.
+    
+    Returns:
+        dict: Span table in the same shape as pdfium_spans.
+    """
+    if not chars:
+        return _empty_spans()
+    fonts = [char["fontname"] for char in chars]
+    # Documents use a handful of fonts, so test each name once rather than once per glyph
+    bold_fonts = {name: float(_is_bold_font_name(name)) for name in set(fonts)}
+    return {
+        "text": [char["text"] for char in chars],
+        "left": np.fromiter((char["x0"] for char in chars), float, len(chars)),
+        "top": np.fromiter((char["top"] for char in chars), float, len(chars)),
+        "bottom": np.fromiter((char["bottom"] for char in chars), float, len(chars)),
+        "size": np.fromiter((char["size"] for char in chars), float, len(chars)),
+        "bold": np.fromiter((bold_fonts[name] for name in fonts), float, len(chars))
+    }
+
+def _locate(line_text, page_text, start):
+    """Find a line in the page text, ignoring whitespace differences. Returns (offset, text) or None."""
+    offset = page_text.find(line_text, start)
+    if offset < 0:
+        offset = page_text.find(line_text)
+    if offset >= 0:
+        return offset, line_text
+    pattern = r"\s*".join(re.escape(c) for c in line_text if not c.isspace())
+    if not pattern:
+        return None
+    regex = re.compile(pattern)
+    match = regex.search(page_text, start) or regex.search(page_text)
+    return (match.start(), match.group()) if match else None
+
+def rank_headings(spans, page_text, page_height):
+    """
+    Find the section headings on a page from the font size and weight of its text.
+    
+    Spans are grouped into lines, the body font is taken to be the size covering the most
+    characters, and every line is scored in one pass over the arrays on how much larger and
+    bolder than the body text it is. Only the few lines that pass are looked at as text.
+    
+    Args:
+        spans (dict): Span table from pdfium_spans or plumber_spans.
+        page_text (str): The extracted text of the page.
+        page_height (float): Page height in PDF points.
+    
+    Returns:
+        list: Heading dicts with text, offset (character offset within page_text), score,
+        size and bold, highest score first.
+    """
+    count = len(spans["text"])
+    if count == 0 or not page_text:
+        return []
+    
+    lengths = np.fromiter((len(text) for text in spans["text"]), float, count)
+    weights = np.maximum(lengths, 1)
+    centers = (spans["top"] + spans["bottom"]) / 2
+    
+    # Assign line numbers top to bottom, then order each line's spans left to right
+    by_height = np.argsort(centers, kind="stable")
+    gaps = np.diff(centers[by_height])
+    smaller_size = np.minimum(spans["size"][by_height][1:], spans["size"][by_height][:-1])
+    line_ids = np.empty(count, dtype=np.intp)
+    line_ids[by_height] = np.concatenate(([0], np.cumsum(gaps > smaller_size * LINE_TOLERANCE)))
+    order = np.lexsort((spans["left"], line_ids))
+    line_ids = line_ids[order]
+    line_count = int(line_ids[-1]) + 1
+    
+    # Per-line weighted font size and bold share
+    w = weights[order]
+    line_weights = np.bincount(line_ids, weights=w, minlength=line_count)
+    line_sizes = np.bincount(line_ids, weights=spans["size"][order] * w, minlength=line_count) / line_weights
+    line_bold = np.bincount(line_ids, weights=spans["bold"][order] * w, minlength=line_count) / line_weights
+    line_starts = np.flatnonzero(np.concatenate(([True], line_ids[1:] != line_ids[:-1])))
+    line_tops = np.minimum.reduceat(spans["top"][order], line_starts)
+    
+    # Body text is the (half-point rounded) size carrying the most characters
+    rounded = np.round(spans["size"] * 2) / 2
+    size_values, size_index = np.unique(rounded, return_inverse=True)
+    body_index = np.argmax(np.bincount(size_index, weights=weights))
+    body_size = size_values[body_index]
+    body_spans = size_index == body_index
+    body_bold = float(np.average(spans["bold"][body_spans], weights=weights[body_spans]))
+    if body_size <= 0:
+        return []
+    
+    size_ratio = line_sizes / body_size
+    bold_share = line_bold * (1 - body_bold)
+    scores = SIZE_WEIGHT * np.clip(size_ratio - 1, 0, 1) + BOLD_WEIGHT * bold_share
+    in_margin = (line_tops < page_height * MARGIN_RATIO) | (line_tops > page_height * (1 - MARGIN_RATIO))
+    scores -= MARGIN_PENALTY * in_margin
+    candidates = np.flatnonzero(
+        ((size_ratio >= HEADING_MIN_SIZE_RATIO) | (bold_share >= HEADING_MIN_BOLD_RATIO))
+        & (line_weights <= HEADING_MAX_CHARS)
+    )
+    if candidates.size == 0:
+        return []
+    
+    # Only candidate lines are turned back into text
+    texts = spans["text"]
+    separator = " " if lengths.max() > 1 else ""
+    line_ends = np.append(line_starts[1:], count)
+    headings = []
+    search_from = 0
+    for line in candidates:
+        line_text = separator.join(texts[i] for i in order[line_starts[line]:line_ends[line]]).strip()
+        if sum(c.isalpha() for c in line_text) < 2:
+            continue
+        located = _locate(line_text, page_text, search_from)
+        if located is None:
+            continue
+        offset, text = located
+        search_from = offset + len(text)
+        
+        score = float(scores[line])
+        letters = [c for c in text if c.isalpha()]
+        if sum(c.isupper() for c in letters) / len(letters) >= 0.8:
+            score += CAPS_WEIGHT
+        if NUMBERED_HEADING.match(text):
+            score += NUMBERING_WEIGHT
+        if text.endswith((".", ",", ";")):
+            score -= SENTENCE_PENALTY
+        if score < HEADING_MIN_SCORE:
+            continue
+        headings.append({
+            "text": text,
+            "offset": offset,
+            "score": round(score, 3),
+            "size": round(float(line_sizes[line]), 1),
+            "bold": bool(line_bold[line] >= 0.5)
+        })
+    
+    headings.sort(key=lambda heading: -heading["score"])
+    return headings[:MAX_HEADINGS_PER_PAGE]
+
+def headers_in_page_order(headings):
+    """Return the text of ranked headings in the order they appear on the page."""
+    return [heading["text"] for heading in sorted(headings, key=lambda heading: heading["offset"])]
@@ -0,0 +1,166 @@
+import os
+from PIL import Image, ImageOps
+
+# Each profile trades OCR time against accuracy; "none" hands the image to Tesseract untouched
+PROFILES = {
+    "none": {},
+    "fast": {
+        "target_dpi": 200,
+        "grayscale": True,
+        "deskew": False,
+        "crop_margins": True,
+        "binarize": False
+    },
+    "balanced": {
+        "target_dpi": 300,
+        "grayscale": True,
+        "deskew": True,
+        "crop_margins": True,
+        "binarize": True
+    },
+    "accurate": {
+        "target_dpi": 400,
+        "grayscale": True,
+        "deskew": True,
+        "crop_margins": True,
+        "binarize": True
+    }
+}
+
+DEFAULT_PROFILE = os.getenv("INSURLIT_OCR_PROFILE", "balanced")
+
+# Photos rarely carry a trustworthy DPI, so assume the longest side spans a letter page
+ASSUMED_PAGE_INCHES = 11.0
+# Cameras and screenshots write a nominal 72 or 96 DPI whatever their size, so DPI metadata
+# at or below this is ignored in favour of the estimate
+METADATA_MIN_DPI = 96
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_STEP = 0.5
+DESKEW_THUMBNAIL_SIZE = 800
+MARGIN_INK_THRESHOLD = 64  # Darkness (0-255) a pixel needs to count as ink when cropping margins
+MARGIN_PADDING = 10
+
+def _source_dpi(image, dpi=None):
+    """Work out the resolution of an image, falling back to an estimate from its size."""
+    if dpi:
+        return dpi
+    info_dpi = image.info.get("dpi")
+    if info_dpi and info_dpi[0] > METADATA_MIN_DPI:
+        return float(info_dpi[0])
+    return max(image.size) / ASSUMED_PAGE_INCHES
+
+def _downscale(image, target_dpi, dpi=None):
+    """Shrink an image to target_dpi. Images already at or below the target are left alone."""
+    scale = target_dpi / _source_dpi(image, dpi)
+    if scale >= 1:
+        return image
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+def _otsu_threshold(image):
+    """Find the grayscale level that best separates ink from paper (Otsu's method)."""
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    
+    best_level = 127
+    best_variance = 0.0
+    background_count = 0
+    background_weighted = 0
+    for level, count in enumerate(histogram):
+        background_count += count
+        if background_count == 0:
+            continue
+        foreground_count = total - background_count
+        if foreground_count == 0:
+            break
+        background_weighted += level * count
+        background_mean = background_weighted / background_count
+        foreground_mean = (weighted_total - background_weighted) / foreground_count
+        variance = background_count * foreground_count * (background_mean - foreground_mean) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            best_level = level
+    return best_level
+
+def _binarize(image):
+    threshold = _otsu_threshold(image)
+    return image.point([0 if level <= threshold else 255 for level in range(256)])
+
+def _skew_angle(image):
+    """
+    Estimate how far a page is rotated by finding the angle whose row profile is sharpest.
+    
+    Text lines produce strongly alternating dark and light rows only when they are level,
+    so the variance of the per-row ink mean peaks at the correct angle.
+    """
+    thumbnail = image.copy()
+    thumbnail.thumbnail((DESKEW_THUMBNAIL_SIZE, DESKEW_THUMBNAIL_SIZE))
+    ink = ImageOps.invert(_binarize(thumbnail))
+    
+    best_angle = 0.0
+    best_score = -1.0
+    steps = int(DESKEW_MAX_ANGLE / DESKEW_STEP)
+    for step in range(-steps, steps + 1):
+        angle = step * DESKEW_STEP
+        rotated = ink.rotate(angle, resample=Image.Resampling.NEAREST, fillcolor=0)
+        # Squashing to one column averages every row in C rather than in Python
+        rows = list(rotated.resize((1, rotated.height), Image.Resampling.BOX).getdata())
+        mean = sum(rows) / len(rows)
+        score = sum((value - mean) ** 2 for value in rows)
+        if score > best_score:
+            best_score = score
+            best_angle = angle
+    return best_angle
+
+def _deskew(image):
+    angle = _skew_angle(image)
+    if abs(angle) < DESKEW_STEP / 2:
+        return image
+    return image.rotate(angle, resample=Image.Resampling.BILINEAR, expand=True, fillcolor=255)
+
+def _crop_margins(image):
+    """Trim blank paper around the text, keeping a little padding."""
+    ink = ImageOps.invert(image).point(lambda level: 255 if level > MARGIN_INK_THRESHOLD else 0)
+    bbox = ink.getbbox()
+    if not bbox:
+        return image
+    left, top, right, bottom = bbox
+    return image.crop((
+        max(0, left - MARGIN_PADDING),
+        max(0, top - MARGIN_PADDING),
+        min(image.width, right + MARGIN_PADDING),
+        min(image.height, bottom + MARGIN_PADDING)
+    ))
+
+def preprocess_image(image, profile=None, dpi=None):
+    """
+    Prepare a photo or scan for OCR.
+    
+    Applies EXIF orientation, then, depending on the profile, downscales to the target DPI,
+    converts to grayscale, deskews, crops blank margins and binarizes.
+    
+    Args:
+        image (PIL.Image.Image): The image to prepare.
+        profile (str, optional): One of PROFILES. Defaults to DEFAULT_PROFILE.
+        dpi (float, optional): Known resolution of the image, e.g. for rendered PDF pages.
+    
+    Returns:
+        PIL.Image.Image: The image to hand to Tesseract.
+    """
+    settings = PROFILES[profile or DEFAULT_PROFILE]
+    image = ImageOps.exif_transpose(image)
+    if not settings:
+        return image
+    
+    if settings.get("target_dpi"):
+        image = _downscale(image, settings["target_dpi"], dpi)
+    if any(settings.get(step) for step in ("grayscale", "deskew", "crop_margins", "binarize")):
+        image = image.convert("L")
+    if settings.get("deskew"):
+        image = _deskew(image)
+    if settings.get("crop_margins"):
+        image = _crop_margins(image)
+    if settings.get("binarize"):
+        image = _binarize(image)
+    return image
@@ -0,0 +1,155 @@
+import os
+import queue
+import threading
+import pytesseract
+
+# tesserocr binds the Tesseract C API directly, so an engine loads its language data once and
+# reads pixel buffers from memory. It is optional (pip install tesserocr); without it every
+# call goes through pytesseract, which starts a tesseract process and writes a temp PNG per image.
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+OCR_LANGUAGE = os.getenv("INSURLIT_OCR_LANGUAGE", "eng")
+ENGINE_POOL_SIZE = int(os.getenv("INSURLIT_OCR_ENGINES", str(min(os.cpu_count() or 1, 4))))
+
+_engines = queue.Queue()
+_engines_created = 0
+_engines_lock = threading.Lock()
+_engine_failed = False
+
+class OCRTimeoutError(RuntimeError):
+    """Raised when Tesseract does not finish an image within the allowed time."""
+
+def backend_name():
+    """Return the OCR backend in use: "tesserocr" for the persistent engine pool, otherwise "pytesseract"."""
+    return "tesserocr" if tesserocr is not None and not _engine_failed else "pytesseract"
+
+def _acquire_engine():
+    """Borrow a warmed engine from the pool, creating one if the pool is not yet full."""
+    global _engines_created
+    try:
+        return _engines.get_nowait()
+    except queue.Empty:
+        pass
+    
+    with _engines_lock:
+        if _engines_created < ENGINE_POOL_SIZE:
+            engine = tesserocr.PyTessBaseAPI(lang=OCR_LANGUAGE)
+            _engines_created += 1
+            return engine
+    return _engines.get()
+
+def _release_engine(engine):
+    engine.Clear()
+    _engines.put(engine)
+
+def _set_image(engine, image):
+    """Hand the engine the image's raw pixel buffer directly, with no encoding step."""
+    if image.mode not in ("L", "RGB"):
+        image = image.convert("L" if image.mode in ("1", "LA", "I", "F") else "RGB")
+    bytes_per_pixel = 1 if image.mode == "L" else 3
+    engine.SetImageBytes(image.tobytes(), image.width, image.height, bytes_per_pixel, image.width * bytes_per_pixel)
+
+def _read_with_engine(image, timeout):
+    engine = _acquire_engine()
+    try:
+        _set_image(engine, image)
+        # tesserocr takes the timeout in milliseconds and returns False when it runs out
+        if not engine.Recognize(timeout=int(timeout * 1000)):
+            raise OCRTimeoutError("Tesseract timed out")
+        text = engine.GetUTF8Text()
+        confidence = engine.MeanTextConf() if text.strip() else None
+        return text, confidence
+    finally:
+        _release_engine(engine)
+
+def _read_with_pytesseract(image, timeout):
+    try:
+        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT, timeout=timeout)
+    except RuntimeError as e:
+        # pytesseract raises a plain RuntimeError when it kills Tesseract for running past the timeout
+        if "timeout" in str(e).lower():
+            raise OCRTimeoutError(str(e))
+        raise
+    
+    # Rebuild the text line by line from Tesseract's word boxes
+    lines = []
+    confidences = []
+    current_line = None
+    current_paragraph = None
+    for i, word in enumerate(data["text"]):
+        confidence = float(data["conf"][i])
+        if confidence < 0 or not word.strip():
+            continue
+        paragraph = (data["block_num"][i], data["par_num"][i])
+        line = paragraph + (data["line_num"][i],)
+        if line != current_line:
+            if current_paragraph is not None and paragraph != current_paragraph:
+                lines.append("")
+            lines.append(word)
+            current_line = line
+            current_paragraph = paragraph
+        else:
+            lines[-1] += " " + word
+        confidences.append(confidence)
+    
+    confidence = sum(confidences) / len(confidences) if confidences else None
+    return "\n".join(lines), confidence
+
+def read_text(image, timeout=0):
+    """
+    OCR an image, keeping Tesseract's confidence.
+    
+    Uses a pooled tesserocr engine when available and falls back to pytesseract otherwise,
+    or permanently if the engine cannot be created (e.g. missing language data).
+    
+    Args:
+        image (PIL.Image.Image): The image to read.
+        timeout (float, optional): Seconds before Tesseract is stopped; 0 means no limit.
+    
+    Returns:
+        tuple: (text, confidence) where confidence is the mean word confidence (0-100),
+        or None if no words were found.
+    
+    Raises:
+        OCRTimeoutError: If Tesseract runs past the timeout.
+    """
+    global _engine_failed
+    if tesserocr is not None and not _engine_failed:
+        try:
+            return _read_with_engine(image, timeout)
+        except OCRTimeoutError:
+            raise
+        except RuntimeError as e:
+            print(f"Error starting tesserocr engine, falling back to pytesseract: {str(e)}")
+            _engine_failed = True
+    return _read_with_pytesseract(image, timeout)
+
+def image_to_string(image, timeout=0):
+    """
+    OCR an image and return its text, matching pytesseract.image_to_string.
+    
+    Args:
+        image (PIL.Image.Image): The image to read.
+        timeout (float, optional): Seconds before Tesseract is stopped; 0 means no limit.
+    
+    Returns:
+        str: The recognized text.
+    """
+    global _engine_failed
+    if tesserocr is not None and not _engine_failed:
+        try:
+            return _read_with_engine(image, timeout)[0]
+        except OCRTimeoutError:
+            raise
+        except RuntimeError as e:
+            print(f"Error starting tesserocr engine, falling back to pytesseract: {str(e)}")
+            _engine_failed = True
+    try:
+        return pytesseract.image_to_string(image, timeout=timeout)
+    except RuntimeError as e:
+        if "timeout" in str(e).lower():
+            raise OCRTimeoutError(str(e))
+        raise
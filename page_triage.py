@@ -0,0 +1,106 @@
+import re
+import numpy as np
+import table_extraction as te
+
+# Pages are sorted before extraction into three classes:
+#   "skip"  - blank pages and blank scans: nothing to read
+#   "light" - cover letters, privacy notices and signature pages: their raw text layer is kept
+#             for facts and citations, but nothing costlier runs on them
+#   "full"  - everything else, extracted as before
+BLANK_MAX_CHARS = 20  # Visible characters a blank page may still carry (a stamped page number)
+BLANK_RENDER_SCALE = 0.1  # A scan is checked for ink on a thumbnail of about 7 DPI
+INK_LEVEL = 160  # Grayscale values below this count as ink
+BLANK_MAX_INK_RATIO = 0.002  # Share of the thumbnail's pixels a blank scan may ink (specks, punch holes)
+TITLE_LINES = 12  # Lines at the top of a page searched for a letter's salutation or a notice's title
+LIGHT_MAX_WORDS = 900  # Longer pages are read in full whatever their title says
+SIGNATURE_MAX_WORDS = 150  # A signature page holds little besides the attestation
+
+BLANK_NOTICE = re.compile(r"\bthis page (?:is |has been )?(?:intentionally )?left blank\b|\bintentionally (?:left )?blank\b", re.IGNORECASE)
+TITLED_PAGES = (
+    ("privacy_notice", re.compile(
+        r"^\s*(?:(?:your|our|annual|important)\s+)?(?:notice\s+of\s+)?(?:\w+\s+)?privacy\s+(?:notice|policy|statement|practices)"
+        r"|^\s*notice\s+of\s+(?:our\s+)?(?:information|privacy)\s+practices",
+        re.IGNORECASE | re.MULTILINE
+    )),
+    ("cover_letter", re.compile(r"^\s*dear\b", re.IGNORECASE | re.MULTILINE)),
+)
+SIGNATURE = re.compile(
+    r"\bin witness whereof\b|\bauthorized (?:representative|signature)\b|\bcountersigned\b|\bsignature of (?:the )?(?:named )?insured\b",
+    re.IGNORECASE
+)
+
+def _visible_chars(text):
+    return len(text) - sum(text.count(c) for c in " \n\t\r")
+
+def _blank_scan(page):
+    """Whether a scanned pdfium page is blank: almost none of a thumbnail's pixels are inked."""
+    bitmap = page.render(scale=BLANK_RENDER_SCALE, grayscale=True)
+    pixels = np.asarray(bitmap.to_pil())
+    return float(np.mean(pixels < INK_LEVEL)) <= BLANK_MAX_INK_RATIO
+
+def classify_text(page_text):
+    """
+    Classify a page by its text alone.
+    
+    Returns:
+        tuple: (page_class, reason) - ("skip", "blank") for a blank page or one marked as
+        intentionally left blank, ("light", "privacy_notice" / "cover_letter" /
+        "signature_page") for boilerplate, else ("full", None). Pages with dollar amounts,
+        such as a letter quoting the premium or a schedule, are never light.
+    """
+    if _visible_chars(page_text) <= BLANK_MAX_CHARS:
+        return "skip", "blank"
+    words = len(page_text.split())
+    if words <= SIGNATURE_MAX_WORDS and BLANK_NOTICE.search(page_text):
+        return "skip", "blank"
+    # Premiums, limits and deductibles must reach the model whatever page they are on
+    if te.MONEY.search(page_text):
+        return "full", None
+    if words <= LIGHT_MAX_WORDS:
+        title = "\n".join(page_text.lstrip().split("\n")[:TITLE_LINES])
+        for reason, pattern in TITLED_PAGES:
+            if pattern.search(title):
+                return "light", reason
+    if words <= SIGNATURE_MAX_WORDS and SIGNATURE.search(page_text):
+        return "light", "signature_page"
+    return "full", None
+
+def classify_page(page, page_text, image_count):
+    """
+    Classify a PDF page before extraction, from its raw text layer and, for scanned pages,
+    the ink on a thumbnail; rendering the thumbnail takes a few milliseconds, next to
+    seconds of OCR for the page.
+    
+    Args:
+        page (pdfium.PdfPage): The open page.
+        page_text (str): Its raw text layer.
+        image_count (int): Images drawn on the page.
+    
+    Returns:
+        tuple: (page_class, reason); see classify_text. Blank scans are ("skip", "blank_scan").
+    """
+    page_class, reason = classify_text(page_text)
+    if reason == "blank" and image_count and _visible_chars(page_text) <= BLANK_MAX_CHARS:
+        # An image page without text is a scan, blank only if the image is
+        return ("skip", "blank_scan") if _blank_scan(page) else ("full", None)
+    return page_class, reason
+
+def left_out_pages(document_info, page_classes=("skip", "light")):
+    """
+    Pages of a document that are not sent to the model.
+    
+    Args:
+        document_info (dict): Document metadata with page_info.
+        page_classes (tuple, optional): The page classes to leave out. Summaries leave out
+            light pages too; answers keep them, since questions such as who the agent is
+            are answered from a cover letter or signature page.
+    
+    Returns:
+        dict: Page number to the reason the page was left out (see classify_text).
+    """
+    page_info = (document_info or {}).get("page_info") or {}
+    return {
+        number: page.get("tier_reason") or page["page_class"]
+        for number, page in page_info.items()
+        if page.get("page_class", "full") in page_classes
+    }
@@ -0,0 +1,334 @@
+import re
+import bisect
+from datetime import datetime
+
+AMOUNT = r"\$\s?\d{1,3}(?:,\d{3})+(?:\.\d{2})?|\$\s?\d+(?:\.\d{2})?"
+THOUSANDS = r"\$\d{1,3}(?:,\d{3})+"
+DATE = (r"\d{1,2}/\d{1,2}/(?:\d{4}|\d{2})(?!\d)|\d{4}-\d{2}-\d{2}"
+        r"|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2},?\s+\d{4}")
+PREMIUM_TERMS = r"(?:6|six|12|twelve)[- ]month|semi-annual|annual|monthly|total|full[- ]term|policy"
+COVERAGES = (r"bodily\s+injury|property\s+damage|uninsured\s+motorists?|underinsured\s+motorists?|medical\s+payments"
+             r"|personal\s+injury\s+protection|collision|comprehensive|other\s+than\s+collision|glass|towing|rental")
+VEHICLE_MAKES = (r"acura|audi|bmw|buick|cadillac|chevrolet|chevy|chrysler|dodge|fiat|ford|genesis|gmc|honda|hyundai"
+                 r"|infiniti|jaguar|jeep|kia|land\s+rover|lexus|lincoln|mazda|mercedes-benz|mercedes|mini|mitsubishi"
+                 r"|nissan|porsche|ram|subaru|tesla|toyota|volkswagen|vw|volvo")
+
+# Every fact pattern in one alternation, so the text is scanned once. Facts start at the
+# beginning of a word or at a dollar sign, and only with a digit, a capital or the first two
+# letters of one of the keywords; the leading check rejects every other position before any
+# branch is tried, which is most of the scanning cost.
+FACTS = re.compile(rf"""
+    (?<![\w$])(?=[$\dA-Z]|p[oer]|c[oa]|e[fx]|re|de|s[ie]|t[wo]|an|mo|fu)
+    (?:
+        (?i:(?P<policy_period>(?:policy|coverage)\s+(?:period|term)\s*:?\s*(?:from\s+)?(?P<period_start>{DATE})
+            (?:\s+12:01\s*a\.?m\.?)?\s*(?:to|through|thru|-)\s*(?P<period_end>{DATE})))
+        |(?i:(?P<date>(?P<date_label>effective|expiration|renewal|cancellation)\s+date\s*:?\s*(?P<date_value>{DATE})))
+        |(?i:(?P<deductible>(?P<deductible_before>{AMOUNT})\s+(?:(?:{COVERAGES})\s+)?deductible\b
+            |deductible(?:\s+amount)?(?:\s+(?:is|of))?\s*:?\s*(?P<deductible_after>{AMOUNT})))
+        |(?i:(?P<premium>(?:(?P<premium_term>{PREMIUM_TERMS})\s+)?premium(?:\s+(?:is|of|amount|due))?\s*:?\s*(?P<premium_amount>{AMOUNT})))
+        |(?P<split_limit>(?<![/.,])(?P<split_1>\d{{2,3}})\s*/\s*(?P<split_2>\d{{2,3}})(?:\s*/\s*(?P<split_3>\d{{1,3}}))?(?![\w/])
+            |(?P<split_d1>{THOUSANDS})\s*/\s*(?P<split_d2>{THOUSANDS})(?:\s*/\s*(?P<split_d3>{THOUSANDS}))?)
+        |(?P<vin>[A-HJ-NPR-Z0-9]{{17}}\b)
+        |(?i:(?P<vehicle>(?P<vehicle_year>(?:19[89]|20[0-4])\d)\s+(?P<vehicle_make>{VEHICLE_MAKES})\b(?:[ \t]+(?P<vehicle_model>[A-Za-z0-9][\w-]*))?))
+    )
+""", re.VERBOSE)
+COVERAGE_NAME = re.compile(COVERAGES, re.IGNORECASE)
+# Split limits only count on lines about liability or motorist limits, not e.g. "50/50"
+LIMIT_CONTEXT = re.compile(r"limit|liability|bodily|\bBI\b|motorist|\bUM\b", re.IGNORECASE)
+# A split shaped like a date ("12/31/25") needs the limit word right next to it
+LIMIT_BEFORE = re.compile(r"(?:limits?|liability|\bBI\b|\bUM\b)(?:\s+of\s+liability)?\s*[:\-]?\s*$", re.IGNORECASE)
+LIMIT_AFTER = re.compile(r"^\s*(?:limits?|liability|\bBI\b|\bUM\b)", re.IGNORECASE)
+
+VIN_VALUES = dict(zip("ABCDEFGHJKLMNPRSTUVWXYZ", (1, 2, 3, 4, 5, 6, 7, 8, 1, 2, 3, 4, 5, 7, 9, 2, 3, 4, 5, 6, 7, 8, 9)))
+VIN_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+DATE_FORMATS = ("%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d", "%B %d, %Y", "%B %d %Y", "%b %d, %Y", "%b %d %Y", "%b. %d, %Y")
+
+def valid_vin(vin):
+    """Check a 17-character VIN's check digit (position 9), as used on North American vehicles."""
+    vin = vin.upper()
+    if len(vin) != 17 or vin.isdigit() or vin.isalpha():
+        return False
+    total = 0
+    for char, weight in zip(vin, VIN_WEIGHTS):
+        value = int(char) if char.isdigit() else VIN_VALUES.get(char)
+        if value is None:
+            return False
+        total += value * weight
+    check = total % 11
+    return vin[8] == ("X" if check == 10 else str(check))
+
+def parse_date(text):
+    """Return a date as an ISO string (YYYY-MM-DD), or None if it cannot be read."""
+    text = " ".join(text.split()).title()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+def _amount(text):
+    return float(text.lstrip("$").replace(",", "").strip())
+
+def _line_around(text, start, end):
+    line_start = text.rfind("\n", 0, start) + 1
+    line_end = text.find("\n", end)
+    return text[line_start:start], text[line_start:line_end if line_end >= 0 else len(text)]
+
+def _coverage_before(prefix):
+    """The last coverage named on the line before a fact, e.g. "Collision" in "Collision: $500 deductible"."""
+    names = COVERAGE_NAME.findall(prefix)
+    return " ".join(names[-1].split()).title() if names else None
+
+def _page_lookup(page_info):
+    """Return a function mapping a character offset of the full text to its page number."""
+    if not page_info:
+        return lambda offset: None
+    numbers = sorted(page_info)
+    starts = [page_info[number].get("offset", 0) for number in numbers]
+    return lambda offset: numbers[max(0, bisect.bisect_right(starts, offset) - 1)]
+
+def _fact(match, text):
+    """Turn one match of FACTS into a fact dict (without its page), or None if it fails validation."""
+    kind = match.lastgroup
+    found = match.group(kind)
+    fact = {"kind": kind, "text": " ".join(found.split()), "offset": match.start()}
+    
+    if kind == "deductible":
+        amount = match.group("deductible_before") or match.group("deductible_after")
+        prefix, _ = _line_around(text, match.start(), match.end())
+        # "$500 collision deductible" names its coverage inside the match, "Collision: ..." before it
+        fact.update(value=_amount(amount), coverage=_coverage_before(prefix + found))
+    elif kind == "premium":
+        prefix, _ = _line_around(text, match.start(), match.end())
+        term = match.group("premium_term")
+        fact.update(value=_amount(match.group("premium_amount")), term=term.lower() if term else None, coverage=_coverage_before(prefix))
+    elif kind == "split_limit":
+        prefix, line = _line_around(text, match.start(), match.end())
+        if not LIMIT_CONTEXT.search(line):
+            return None
+        if match.group("split_1"):
+            if int(match.group("split_1")) <= 12 and int(match.group("split_2")) <= 31:
+                suffix = line[len(prefix) + len(found):]
+                if not (LIMIT_BEFORE.search(prefix) or LIMIT_AFTER.search(suffix)):
+                    return None
+            parts = [int(match.group(name)) * 1000 for name in ("split_1", "split_2", "split_3") if match.group(name)]
+        else:
+            parts = [int(_amount(match.group(name))) for name in ("split_d1", "split_d2", "split_d3") if match.group(name)]
+        # Per-person limits never exceed per-accident limits
+        if parts[0] > parts[1]:
+            return None
+        fact["value"] = tuple(parts)
+    elif kind == "policy_period":
+        fact["value"] = (parse_date(match.group("period_start")), parse_date(match.group("period_end")))
+    elif kind == "date":
+        fact.update(value=parse_date(match.group("date_value")), label=match.group("date_label").lower())
+    elif kind == "vin":
+        if not valid_vin(found):
+            return None
+        fact["value"] = found
+    elif kind == "vehicle":
+        model = match.group("vehicle_model")
+        fact["value"] = {
+            "year": int(match.group("vehicle_year")),
+            "make": " ".join(match.group("vehicle_make").split()).title(),
+            "model": model.title() if model else None
+        }
+    return fact
+
+def extract_facts(text, page_info=None):
+    """
+    Find policy facts in a document's text in a single pass.
+    
+    Recognizes deductibles ("$500 deductible", "Deductible: $1,000"), premiums
+    ("6-month premium $742.18"), split liability limits ("100/300/50"), the policy period
+    and other policy dates, VINs (check digit verified) and vehicle year and make.
+    
+    Args:
+        text (str): The full extracted text.
+        page_info (dict, optional): Page number to page record, used to cite pages.
+    
+    Returns:
+        list: Fact dicts in text order with kind, value (a float, tuple of limits, ISO
+        date(s), VIN or vehicle dict), text as matched, offset and page, plus coverage and
+        term where the text names them.
+    """
+    page_of = _page_lookup(page_info)
+    facts = []
+    for match in FACTS.finditer(text):
+        fact = _fact(match, text)
+        if fact is not None:
+            fact["page"] = page_of(fact["offset"])
+            facts.append(fact)
+    return facts
+
+def schedule_facts(schedule_rows):
+    """Turn schedule table rows (see table_extraction) into deductible, premium and limit facts."""
+    facts = []
+    for row in schedule_rows:
+        base = {"text": row["line"], "offset": None, "page": row.get("page"), "coverage": row["coverage"], "source": "table"}
+        if row["deductible_amount"] is not None:
+            facts.append(dict(base, kind="deductible", value=row["deductible_amount"]))
+        if row["premium_amount"] is not None:
+            facts.append(dict(base, kind="premium", value=row["premium_amount"], term=None))
+        if row["limit"]:
+            facts.append(dict(base, kind="limit", value=row["limit"]))
+    return facts
+
+def _cite(fact):
+    return f" (Page {fact['page']})" if fact.get("page") else ""
+
+def _money(value):
+    return f"${value:,.2f}" if value % 1 else f"${value:,.0f}"
+
+def _unique(facts):
+    """
+    Drop repeats of the same fact (same kind, coverage and value), keeping the first, and
+    facts without a coverage that repeat one with a coverage ("Total premium $1,019.75" read
+    from a line of a schedule table that also gave it as a row).
+    """
+    with_coverage = {(fact["kind"], str(fact["value"])) for fact in facts if fact.get("coverage")}
+    seen = set()
+    unique = []
+    for fact in facts:
+        if not fact.get("coverage") and (fact["kind"], str(fact["value"])) in with_coverage:
+            continue
+        key = (fact["kind"], (fact.get("coverage") or "").casefold(), fact.get("term"), str(fact["value"]))
+        if key not in seen:
+            seen.add(key)
+            unique.append(fact)
+    return unique
+
+def summary_sections(facts):
+    """
+    Build the summary's deductibles and premiums sections from facts.
+    
+    Returns:
+        dict: deductibles and/or premiums, each a list of bullet strings citing the page;
+        sections without facts are left out so they can still be summarized from the text.
+    """
+    deductibles = []
+    premiums = []
+    for fact in _unique(facts):
+        if fact["kind"] == "deductible":
+            if fact.get("coverage"):
+                deductibles.append(f"{fact['coverage']}: you pay the first {_money(fact['value'])} of a covered loss{_cite(fact)}.")
+            else:
+                deductibles.append(f"A {_money(fact['value'])} deductible applies{_cite(fact)}.")
+        elif fact["kind"] == "premium":
+            label = fact.get("coverage") or (f"{fact['term'].capitalize()} premium" if fact.get("term") else "Premium")
+            premiums.append(f"{label}: {_money(fact['value'])}{_cite(fact)}.")
+    sections = {}
+    if deductibles:
+        sections["deductibles"] = deductibles
+    if premiums:
+        sections["premiums"] = premiums
+    return sections
+
+# Questions that ask for a fact rather than an explanation
+INTENTS = (
+    ("deductible", re.compile(r"deductible", re.IGNORECASE)),
+    ("premium", re.compile(r"premium|how much (?:do|will|does) (?:i|it) (?:pay|cost)|cost of (?:my|the) (?:policy|insurance)", re.IGNORECASE)),
+    ("limit", re.compile(r"\blimits?\b|how much (?:liability|coverage)", re.IGNORECASE)),
+    ("period", re.compile(r"policy (?:period|term)|when does (?:my|the) (?:policy|coverage)|expire|expiration|effective date|renew", re.IGNORECASE)),
+    ("vin", re.compile(r"\bvin\b|vehicle identification", re.IGNORECASE)),
+    ("vehicle", re.compile(r"(?:which|what) (?:cars?|vehicles?)|vehicles? (?:is|are) (?:covered|insured|listed)", re.IGNORECASE)),
+)
+# Only questions phrased as a lookup ("What is my collision deductible?", "What are my limits?")
+# are answered from facts; yes/no questions ("Does my deductible apply if...") are not
+LOOKUP = re.compile(
+    r"^\s*(?:please\s+)?(?:(?:tell|show)\s+me\b|list\b|what(?:'s|\s+is|\s+are|\s+was|\s+were)\b"
+    r"|how\s+much\s+(?:is|are|do|does|will)\b|which\b|when\s+(?:does|do|is|will)\s+(?:my|the)\s+(?:policy|coverage)\b)",
+    re.IGNORECASE
+)
+# Lookups that are really about a condition or an explanation still need the full policy
+EXPLANATORY = re.compile(
+    r"\b(?:if|after|unless|because|why|explain|mean|means|meaning|happens|how does|how do i|should|difference"
+    r"|apply|applies|waived?|refund(?:s|ed|able)?|lower|raise|reduce|increase|go up|change|bundl\w*|discounts?)\b",
+    re.IGNORECASE
+)
+
+def _format_date(iso):
+    if not iso:
+        return "an unreadable date"
+    date = datetime.strptime(iso, "%Y-%m-%d")
+    return f"{date:%B} {date.day}, {date.year}"
+
+def _listing(intent, items, readability_preference):
+    """Phrase a list of (label, value) items: one short sentence each at the easy language level."""
+    if readability_preference == "Easy (Elementary School Level)":
+        return " ".join(
+            f"Your {label if label.endswith(intent) else f'{label} {intent}'} is {value}." for label, value in items
+        )
+    return f"Your policy lists these {intent}s: " + "; ".join(f"{label}: {value}" for label, value in items) + "."
+
+def _named_coverage(question):
+    named = COVERAGE_NAME.search(question)
+    return " ".join(named.group().split()).casefold() if named else None
+
+def answer_question(question, facts, readability_preference="Easy (Elementary School Level)"):
+    """
+    Answer a lookup of a fact (a deductible, premium, limit, date, VIN or vehicle) from facts.
+    
+    Args:
+        question (str): The user's question.
+        facts (list): Facts from extract_facts and schedule_facts.
+        readability_preference (str, optional): The answer language level; at the easy level
+            each figure gets its own short sentence.
+    
+    Returns:
+        str | None: A short answer citing pages, or None if the question needs the full
+        policy: a yes/no, conditional or explanatory question, a coverage the facts do not
+        name, or facts that were not found.
+    """
+    if not facts or not LOOKUP.search(question) or EXPLANATORY.search(question):
+        return None
+    intent = next((name for name, pattern in INTENTS if pattern.search(question)), None)
+    if intent is None:
+        return None
+    facts = _unique(facts)
+    
+    if intent in ("deductible", "premium"):
+        matching = [fact for fact in facts if fact["kind"] == intent]
+        # Narrow to a coverage the question names; a coverage without facts is left to the model
+        coverage = _named_coverage(question)
+        if coverage:
+            matching = [fact for fact in matching if coverage in (fact.get("coverage") or "").casefold()]
+        if not matching:
+            return None
+        items = []
+        for fact in matching:
+            label = fact.get("coverage") or (f"{fact['term']} premium" if fact.get("term") else intent)
+            items.append((label.lower() if readability_preference == "Easy (Elementary School Level)" else label, _money(fact["value"]) + _cite(fact)))
+        return _listing(intent, items, readability_preference)
+    
+    if intent == "limit":
+        coverage = _named_coverage(question)
+        items = []
+        for fact in facts:
+            if fact["kind"] == "split_limit" and not coverage:
+                items.append(("liability", " / ".join(_money(part) for part in fact["value"]) + _cite(fact)))
+            elif fact["kind"] == "limit" and (not coverage or coverage in fact["coverage"].casefold()):
+                label = fact["coverage"].lower() if readability_preference == "Easy (Elementary School Level)" else fact["coverage"]
+                items.append((label, f"{fact['value']}{_cite(fact)}"))
+        return _listing("limit", items, readability_preference) if items else None
+    
+    if intent == "period":
+        items = []
+        for fact in facts:
+            if fact["kind"] == "policy_period":
+                start, end = fact["value"]
+                items.append(f"The policy period runs from {_format_date(start)} to {_format_date(end)}{_cite(fact)}.")
+            elif fact["kind"] == "date":
+                items.append(f"The {fact['label']} date is {_format_date(fact['value'])}{_cite(fact)}.")
+        return " ".join(items) or None
+    
+    if intent == "vin":
+        items = [f"{fact['value']}{_cite(fact)}" for fact in facts if fact["kind"] == "vin"]
+        return "The VINs on your policy are: " + "; ".join(items) + "." if items else None
+    
+    items = [
+        " ".join(str(part) for part in (fact["value"]["year"], fact["value"]["make"], fact["value"]["model"]) if part) + _cite(fact)
+        for fact in facts if fact["kind"] == "vehicle"
+    ]
+    return "The vehicles on your policy are: " + "; ".join(items) + "." if items else None
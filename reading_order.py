@@ -0,0 +1,166 @@
+import numpy as np
+
+LINE_TOLERANCE = 0.5  # Vertical offset, as a share of the median word height, within which words share a line
+GUTTER_MIN_RATIO = 0.02  # Minimum gutter width as a share of the page width
+GUTTER_MAX_COVERAGE = 0.1  # Share of the column lines whose words may cross a gutter
+COLUMN_MIN_LINES = 3  # Lines with a gap wide enough to be a gutter that a page needs before columns are looked for
+COLUMN_MIN_WIDTH_RATIO = 0.15  # Narrower columns (amounts, page numbers) stay with their neighbour
+COLUMN_MIN_WORDS = 4  # Median words per line a column needs; table cells and form labels hold fewer
+
+def _word_arrays(words):
+    x0 = np.fromiter((w["x0"] for w in words), dtype=float, count=len(words))
+    x1 = np.fromiter((w["x1"] for w in words), dtype=float, count=len(words))
+    top = np.fromiter((w["top"] for w in words), dtype=float, count=len(words))
+    bottom = np.fromiter((w["bottom"] for w in words), dtype=float, count=len(words))
+    return x0, x1, top, bottom
+
+def _line_ids(x0, top, bottom):
+    """
+    Group words into lines by their top edge.
+    
+    Returns:
+        tuple: (order, line_id) where order sorts the words by line and then left to right,
+        and line_id[i] is the line of the i-th word in that order.
+    """
+    tolerance = LINE_TOLERANCE * float(np.median(bottom - top))
+    by_top = np.argsort(top, kind="stable")
+    breaks = np.diff(top[by_top]) > tolerance
+    line_of = np.empty(len(top), dtype=np.int64)
+    line_of[by_top] = np.concatenate(([0], np.cumsum(breaks)))
+    order = np.lexsort((x0, line_of))
+    return order, line_of[order]
+
+def _find_gutters(x0, x1, line_id, page_width):
+    """
+    Find the vertical gutters between columns.
+    
+    Only lines with an inner gap at least a gutter wide take part: they are the lines laid
+    out in columns, while full-width lines (titles, paragraphs across the page) would hide a
+    gutter. A gutter is a run of x positions that almost none of those lines' words cover.
+    
+    Args:
+        x0, x1 (numpy.ndarray): Word left and right edges, sorted by line and then left to right.
+        line_id (numpy.ndarray): Line of each word.
+        page_width (float): Page width in points.
+    
+    Returns:
+        list: (start, end) x ranges of the gutters, left to right.
+    """
+    min_gap = GUTTER_MIN_RATIO * page_width
+    same_line = line_id[1:] == line_id[:-1]
+    wide_gap = same_line & (x0[1:] - x1[:-1] >= min_gap)
+    column_lines = np.unique(line_id[:-1][wide_gap])
+    if len(column_lines) < COLUMN_MIN_LINES:
+        return []
+    
+    in_column_lines = np.isin(line_id, column_lines)
+    left = int(np.floor(x0.min()))
+    right = int(np.ceil(x1.max()))
+    starts = np.clip(np.floor(x0[in_column_lines]).astype(np.int64) - left, 0, right - left)
+    ends = np.clip(np.ceil(x1[in_column_lines]).astype(np.int64) - left, 0, right - left)
+    # Words on one line never overlap, so the number of words covering a point is the number of lines that do
+    coverage = np.cumsum(np.bincount(starts, minlength=right - left + 1) - np.bincount(ends, minlength=right - left + 1))
+    clear = np.concatenate(([0], (coverage[:-1] <= GUTTER_MAX_COVERAGE * len(column_lines)).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(clear))
+    return [
+        (left + start, left + end)
+        for start, end in zip(edges[::2], edges[1::2])
+        if end - start >= min_gap and start > 0 and end < right - left
+    ]
+
+def _column_words(line_id, inside):
+    """Median number of words per line among the lines with words inside a column."""
+    counts = np.bincount(line_id[inside])
+    counts = counts[counts > 0]
+    return float(np.median(counts)) if len(counts) else 0.0
+
+def _column_splits(x0, x1, line_id, page_width):
+    """
+    Return the x positions that split a page into columns, left to right; empty for one column.
+    
+    Gutters that would leave a column narrower than COLUMN_MIN_WIDTH_RATIO of the text are
+    dropped, and so are gutters with a column on either side whose lines are too short to
+    be running text: the cells of a table and the labels and values of a form are read
+    row by row, as pdfplumber reads them.
+    """
+    gutters = _find_gutters(x0, x1, line_id, page_width)
+    left, right = float(x0.min()), float(x1.max())
+    min_width = COLUMN_MIN_WIDTH_RATIO * (right - left)
+    while gutters:
+        bounds = [left] + [(start + end) / 2 for start, end in gutters] + [right]
+        widths = np.diff(bounds)
+        narrowest = int(np.argmin(widths))
+        if widths[narrowest] >= min_width:
+            break
+        # Merge the narrow column into its narrower neighbour
+        if narrowest == 0:
+            del gutters[0]
+        elif narrowest == len(gutters) or widths[narrowest - 1] <= widths[narrowest + 1]:
+            del gutters[narrowest - 1]
+        else:
+            del gutters[narrowest]
+    
+    kept = []
+    column_left = left
+    for i, (start, end) in enumerate(gutters):
+        column_right = gutters[i + 1][0] if i + 1 < len(gutters) else right
+        words_before = _column_words(line_id, (x0 >= column_left) & (x1 <= start))
+        words_after = _column_words(line_id, (x0 >= end) & (x1 <= column_right))
+        if min(words_before, words_after) >= COLUMN_MIN_WORDS:
+            kept.append((start + end) / 2)
+            column_left = end
+    return kept
+
+def order_lines(words, page_width):
+    """
+    Put a page's words back into reading order, column by column.
+    
+    Words are grouped into lines, and gutters that run down the page split the lines into
+    columns. Lines that run across a gutter (titles, paragraphs spanning the page) divide the
+    page into blocks; within a block each column is read top to bottom before the next one,
+    and blocks are read in page order. A page without gutters reads as plain lines, as
+    pdfplumber's extract_text would give them.
+    
+    Args:
+        words (list): pdfplumber word dicts (text, x0, x1, top, bottom), e.g. from extract_words().
+        page_width (float): Page width in points.
+    
+    Returns:
+        list: Lines of text in reading order.
+    """
+    if not words:
+        return []
+    x0, x1, top, bottom = _word_arrays(words)
+    order, line_id = _line_ids(x0, top, bottom)
+    x0, x1 = x0[order], x1[order]
+    texts = [words[i]["text"] for i in order]
+    
+    splits = np.asarray(_column_splits(x0, x1, line_id, page_width))
+    if len(splits):
+        column = np.searchsorted(splits, x0, side="right")
+        crosses = column != np.searchsorted(splits, x1, side="right")
+        # A line that continues across a split with nothing wider than a word space spans the
+        # columns too (a paragraph across the page whose spaces happen to line up with the gutter)
+        bridges = ((line_id[1:] == line_id[:-1]) & (column[1:] != column[:-1])
+                   & (x0[1:] - x1[:-1] < GUTTER_MIN_RATIO * page_width))
+        crosses[:-1] |= bridges
+        spanning = np.bincount(line_id, weights=crosses) > 0
+        # A block starts at every spanning line and at the first line after one
+        block_starts = spanning.copy()
+        block_starts[1:] |= spanning[:-1]
+        block = np.cumsum(block_starts)[line_id]
+        # Spanning lines are read whole, as one column
+        column = np.where(spanning[line_id], 0, column)
+        regroup = np.lexsort((x0, line_id, column, block))
+        line_id, column = line_id[regroup], column[regroup]
+        texts = [texts[i] for i in regroup]
+        boundaries = np.flatnonzero((line_id[1:] != line_id[:-1]) | (column[1:] != column[:-1])) + 1
+    else:
+        boundaries = np.flatnonzero(line_id[1:] != line_id[:-1]) + 1
+    
+    bounds = np.concatenate(([0], boundaries, [len(texts)]))
+    return [" ".join(texts[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+def page_text(layout_page):
+    """Read a pdfplumber page's text in reading order (see order_lines)."""
+    return "\n".join(order_lines(layout_page.extract_words(), layout_page.width))
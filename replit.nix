@@ -1,6 +1,8 @@
 {pkgs}: {
   deps = [
     pkgs.tesseract
+    pkgs.leptonica
+    pkgs.pkg-config
     pkgs.zlib
     pkgs.tk
     pkgs.tcl
@@ -0,0 +1,138 @@
+import re
+
+MAX_LEVEL = 6
+SIZE_LEVEL_STEP = 0.5  # Heading font sizes within this many points share a level
+# "PART D - COVERAGE FOR DAMAGE TO YOUR AUTO" can also be looked up as "PART D"
+SECTION_LABEL = re.compile(r"^((?:part|section|article|coverage|schedule|endorsement)\s+[\w.]+)\s*[-:]", re.IGNORECASE)
+DASHES = re.compile(r"[\u2010-\u2015\u2212]")
+
+def normalize_title(title):
+    """Fold a section title to the form used as a lookup key: case, dashes, spacing and trailing punctuation."""
+    title = DASHES.sub("-", title).casefold()
+    title = re.sub(r"\s*-\s*", " - ", title)
+    return " ".join(title.split()).rstrip(" .:;,")
+
+def _locate_headers(page):
+    """Return (offset within the page text, title, level or None, size or None) for each heading on a page."""
+    text = page.get("text", "")
+    headings = page.get("headings")
+    if headings:
+        return [(h["offset"], h["text"], None, h.get("size")) for h in sorted(headings, key=lambda h: h["offset"])]
+    
+    # DOCX and OCR pages only record the heading text, so find it in the page in order
+    located = []
+    levels = page.get("heading_levels") or []
+    search_from = 0
+    for i, header in enumerate(page.get("headers") or []):
+        offset = text.find(header, search_from)
+        if offset < 0:
+            offset = text.find(header)
+        if offset < 0:
+            continue
+        search_from = offset + len(header)
+        located.append((offset, header, levels[i] if i < len(levels) else None, None))
+    return located
+
+def build_section_index(page_info, text_length):
+    """
+    Build a hierarchical index of a document's sections from its page headings.
+    
+    Headings with a known level (DOCX heading styles) keep it. PDF headings are levelled by
+    font size, the largest size in the document being level 1. A section runs from its
+    heading to the next heading at the same or a higher level.
+    
+    Args:
+        page_info (dict): Page number to page record, as built by the extractors.
+        text_length (int): Length of the full extracted text.
+    
+    Returns:
+        dict: sections, a list of section dicts in document order with title, level,
+        page_start, page_end, start and end (character offsets into the full text), parent
+        and children (indexes into the list); and lookup, mapping normalized titles (see
+        normalize_title) to section indexes.
+    """
+    entries = []
+    page_starts = []
+    for page_number in sorted(page_info):
+        page = page_info[page_number]
+        page_offset = page.get("offset", 0)
+        page_starts.append((page_offset, page_number))
+        for offset, title, level, size in _locate_headers(page):
+            entries.append({"title": title.strip(), "level": level, "size": size, "start": page_offset + offset, "page_start": page_number})
+    
+    # Rank the distinct heading sizes so the largest becomes level 1
+    sizes = sorted({round(e["size"] / SIZE_LEVEL_STEP) for e in entries if e["level"] is None and e["size"]}, reverse=True)
+    size_levels = {size: min(rank + 1, MAX_LEVEL) for rank, size in enumerate(sizes)}
+    for entry in entries:
+        if entry["level"] is None:
+            entry["level"] = size_levels.get(round(entry["size"] / SIZE_LEVEL_STEP), 1) if entry["size"] else 1
+        del entry["size"]
+    
+    sections = []
+    lookup = {}
+    open_sections = []  # Indexes of the sections enclosing the current position, outermost first
+    for entry in entries:
+        while open_sections and sections[open_sections[-1]]["level"] >= entry["level"]:
+            sections[open_sections.pop()]["end"] = entry["start"]
+        index = len(sections)
+        parent = open_sections[-1] if open_sections else None
+        sections.append(dict(entry, end=text_length, page_end=None, parent=parent, children=[]))
+        if parent is not None:
+            sections[parent]["children"].append(index)
+        open_sections.append(index)
+        
+        key = normalize_title(entry["title"])
+        lookup.setdefault(key, []).append(index)
+        label = SECTION_LABEL.match(entry["title"])
+        if label:
+            lookup.setdefault(normalize_title(label.group(1)), []).append(index)
+    
+    # A section ends on the page holding its last character
+    page_index = 0
+    for section in sorted(sections, key=lambda s: s["end"]):
+        while page_index + 1 < len(page_starts) and page_starts[page_index + 1][0] < section["end"]:
+            page_index += 1
+        section["page_end"] = max(page_starts[page_index][1], section["page_start"])
+    
+    return {"sections": sections, "lookup": lookup}
+
+def find_section(document_info, title):
+    """
+    Look up a section by title without scanning the document.
+    
+    Args:
+        document_info (dict): Document metadata holding a section_index.
+        title (str): The section title, e.g. "EXCLUSIONS" or "Part D"; matching ignores case,
+            dash style and spacing.
+    
+    Returns:
+        dict | None: The first section with that title, or None.
+    """
+    index = (document_info or {}).get("section_index")
+    if not index:
+        return None
+    matches = index["lookup"].get(normalize_title(title))
+    return index["sections"][matches[0]] if matches else None
+
+def section_text(extracted_text, section):
+    """Return the text of a section, heading included, as a slice of the full extracted text."""
+    return extracted_text[section["start"]:section["end"]]
+
+def changed_sections(document_info):
+    """
+    Return the sections that span at least one changed page, so work on a revised policy can
+    be limited to them.
+    
+    Pages are changed unless document_info["page_changes"] marks them "unchanged" (identical
+    to a page extracted before). Without a change map every section is returned.
+    """
+    index = (document_info or {}).get("section_index")
+    if not index:
+        return []
+    changes = document_info.get("page_changes")
+    if not changes:
+        return list(index["sections"])
+    return [
+        section for section in index["sections"]
+        if any(changes.get(page) != "unchanged" for page in range(section["page_start"], section["page_end"] + 1))
+    ]
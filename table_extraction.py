@@ -0,0 +1,191 @@
+import re
+
+# Header cells naming the columns of a coverage schedule on a declarations page
+COLUMN_PATTERNS = (
+    ("coverage", re.compile(r"coverages?(?: description)?|description|coverage type")),
+    ("limit", re.compile(r"limits?(?: of (?:liability|insurance))?")),
+    ("deductible", re.compile(r"deductibles?")),
+    ("premium", re.compile(r"(?:annual |6[- ]month |six[- ]month |semi-annual |term )?premiums?|cost")),
+)
+MONEY = re.compile(r"\$\s?\d[\d,]*(?:\.\d{2})?")
+SCHEDULE_MIN_AMOUNTS = 3  # Dollar amounts a page needs before it is searched for tables
+HEADER_MIN_KEYWORD_RATIO = 0.5  # Share of a header line's words that must name columns
+ROW_MAX_GAP_RATIO = 2.5  # A vertical gap this many line heights ends an unruled table
+ANCHOR_TOLERANCE = 2.0  # Points a word may start left of its column's header
+
+def _column_kind(text):
+    """Return the schedule column a header cell names ("coverage", "limit", "deductible", "premium"), or None."""
+    text = " ".join(text.split()).casefold().rstrip(":")
+    for kind, pattern in COLUMN_PATTERNS:
+        if pattern.fullmatch(text):
+            return kind
+    return None
+
+def _header_columns(cells):
+    """
+    Map column kinds to cell indexes for a table's header row.
+    
+    Returns:
+        dict | None: Kind to column index, or None if the row does not head a schedule (it
+        must name at least two of limit, deductible and premium).
+    """
+    columns = {}
+    for i, cell in enumerate(cells):
+        kind = _column_kind(cell or "")
+        if kind and kind not in columns:
+            columns[kind] = i
+    if len(columns.keys() - {"coverage"}) < 2:
+        return None
+    # Schedules without a coverage heading name the coverage in their first column
+    columns.setdefault("coverage", 0)
+    return columns
+
+def likely_schedule_page(page_text):
+    """
+    Cheap check for pages worth running the table finder on: a line naming schedule columns
+    and a few dollar amounts.
+    """
+    if len(MONEY.findall(page_text)) < SCHEDULE_MIN_AMOUNTS:
+        return False
+    return any(_is_header_line(line) for line in page_text.split("\n"))
+
+def _is_header_line(line):
+    words = line.split()
+    if not words:
+        return False
+    kinds = [_column_kind(word) for word in words]
+    named = {kind for kind in kinds if kind}
+    return len(named - {"coverage"}) >= 2 and sum(1 for kind in kinds if kind) / len(words) >= HEADER_MIN_KEYWORD_RATIO
+
+def parse_amount(text):
+    """Return the dollar amount in a cell as a float, or None unless the cell holds exactly one."""
+    amounts = MONEY.findall(text or "")
+    if len(amounts) != 1:
+        return None
+    return float(amounts[0].lstrip("$").replace(",", "").strip())
+
+def typed_rows(table):
+    """
+    Turn a schedule table into typed rows.
+    
+    Args:
+        table (list): Rows of cell strings, the first row being the header.
+    
+    Returns:
+        list: One dict per coverage row with coverage, limit, deductible and premium (cell
+        text or None), deductible_amount and premium_amount (floats or None) and line (the
+        row's cells joined as they read in the extracted text). Empty for a table that is not a schedule.
+    """
+    if not table:
+        return []
+    columns = _header_columns(table[0])
+    if columns is None:
+        return []
+    
+    rows = []
+    for cells in table[1:]:
+        cells = [" ".join((cell or "").split()) for cell in cells]
+        values = {kind: (cells[i] or None) if i < len(cells) else None for kind, i in columns.items()}
+        values.setdefault("limit", None)
+        values.setdefault("deductible", None)
+        values.setdefault("premium", None)
+        if not values["coverage"] or not (values["limit"] or values["deductible"] or values["premium"]):
+            continue
+        rows.append({
+            "coverage": values["coverage"],
+            "limit": values["limit"],
+            "deductible": values["deductible"],
+            "premium": values["premium"],
+            "deductible_amount": parse_amount(values["deductible"]),
+            "premium_amount": parse_amount(values["premium"]),
+            "line": " ".join(cell for cell in cells if cell)
+        })
+    return rows
+
+def _ruled_tables(layout_page):
+    """Tables drawn with cell borders, found by pdfplumber's line-based table finder."""
+    return [(table.bbox, table.extract()) for table in layout_page.find_tables()]
+
+def _aligned_tables(layout_page, ruled_boxes):
+    """
+    Tables laid out with whitespace only.
+    
+    pdfplumber's text strategy splits words apart on such pages, so columns are anchored on
+    the words of a schedule header line instead, and each following line's words are placed
+    in the column whose header starts at or before them. The table ends at a wide vertical
+    gap or at a line whose words cross the column boundaries (prose).
+    """
+    lines = {}
+    for word in layout_page.extract_words():
+        inside = any(x0 <= word["x0"] and word["x1"] <= x1 and top <= word["top"] and word["bottom"] <= bottom
+                     for x0, top, x1, bottom in ruled_boxes)
+        if not inside:
+            lines.setdefault(round(word["top"]), []).append(word)
+    ordered = [sorted(words, key=lambda w: w["x0"]) for _, words in sorted(lines.items())]
+    
+    tables = []
+    i = 0
+    while i < len(ordered):
+        words = ordered[i]
+        i += 1
+        if not _is_header_line(" ".join(w["text"] for w in words)):
+            continue
+        anchors = [words[0]["x0"]] + [w["x0"] for w in words[1:] if _column_kind(w["text"])]
+        header = [""] * len(anchors)
+        for word in words:
+            column = max(j for j, anchor in enumerate(anchors) if anchor <= word["x0"] + ANCHOR_TOLERANCE)
+            header[column] = (header[column] + " " + word["text"]).strip()
+        table = [header]
+        line_height = words[0]["bottom"] - words[0]["top"]
+        previous_top = words[0]["top"]
+        while i < len(ordered):
+            row_words = ordered[i]
+            if row_words[0]["top"] - previous_top > line_height * ROW_MAX_GAP_RATIO:
+                break
+            if any(w["x0"] < anchor - ANCHOR_TOLERANCE and w["x1"] > anchor + ANCHOR_TOLERANCE for w in row_words for anchor in anchors[1:]):
+                break
+            row = [""] * len(anchors)
+            for word in row_words:
+                column = max([j for j, anchor in enumerate(anchors) if anchor <= word["x0"] + ANCHOR_TOLERANCE] or [0])
+                row[column] = (row[column] + " " + word["text"]).strip()
+            table.append(row)
+            previous_top = row_words[0]["top"]
+            i += 1
+        tables.append(table)
+    return tables
+
+def find_schedule_rows(layout_page):
+    """
+    Find coverage schedules on a pdfplumber page and return their typed rows (see typed_rows).
+    
+    Ruled tables come from pdfplumber's table finder; schedules laid out with whitespace
+    alone are read by aligning words under their header line.
+    """
+    ruled = _ruled_tables(layout_page)
+    rows = []
+    for _, table in ruled:
+        rows.extend(typed_rows(table))
+    for table in _aligned_tables(layout_page, [bbox for bbox, _ in ruled]):
+        rows.extend(typed_rows(table))
+    return rows
+
+def without_schedule_lines(text, rows):
+    """
+    Remove the lines of extracted schedule tables, and their header lines, from a text.
+    
+    Used to keep tables that were already read into typed rows out of the prompt.
+    """
+    if not rows:
+        return text
+    row_lines = {" ".join(row["line"].split()).casefold() for row in rows}
+    lines = text.split("\n")
+    is_row = [" ".join(line.split()).casefold() in row_lines for line in lines]
+    kept = []
+    for i, line in enumerate(lines):
+        if is_row[i]:
+            continue
+        # A schedule header goes with the table, but only when a table row follows it
+        if i + 1 < len(lines) and is_row[i + 1] and _is_header_line(line):
+            continue
+        kept.append(line)
+    return "\n".join(kept)
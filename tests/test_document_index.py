@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import document_index as di
+
+FACTS = [
+    {"kind": "policy_period", "value": ("2026-01-01", "2026-07-01")},
+    {"kind": "vin", "value": "4T1B11HK5MU000001"},
+    {"kind": "vehicle", "value": {"year": 2021, "make": "Toyota", "model": "Camry"}},
+    {"kind": "premium", "value": 742.18},
+]
+
+def with_values(**values):
+    return [dict(fact, value=values.get(fact["kind"], fact["value"])) for fact in FACTS]
+
+def test_rescan_with_misread_facts_is_the_same_policy():
+    rescan = with_values(vin="4T1B11HK5MU000007", premium=742.16)
+    assert di.same_policy(di.identity(FACTS), di.identity(rescan))
+
+def test_rescan_missing_one_fact_is_the_same_policy():
+    rescan = [fact for fact in FACTS if fact["kind"] != "vehicle"]
+    assert di.same_policy(di.identity(FACTS), di.identity(rescan))
+
+def test_other_vehicle_in_the_same_period_is_another_policy():
+    other = with_values(vin="1FTEW1EP0JF000002", vehicle={"year": 2018, "make": "Ford", "model": "F-150"}, premium=1082.5)
+    assert not di.same_policy(di.identity(FACTS), di.identity(other))
+
+def test_other_period_is_another_policy():
+    renewal = with_values(policy_period=("2026-07-01", "2027-01-01"))
+    assert not di.same_policy(di.identity(FACTS), di.identity(renewal))
@@ -0,0 +1,121 @@
+import os
+import sys
+from concurrent.futures import Future
+
+import pytest
+from fpdf import FPDF
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import document_processing as dp
+import extraction_budget as eb
+import extraction_cache as ec
+import form_library as fl
+import upload_handling as uh
+
+def make_pdf(name, pages):
+    pdf = FPDF()
+    pdf.set_font("Arial", "", 11)
+    for number in range(1, pages + 1):
+        pdf.add_page()
+        pdf.cell(0, 6, f"{name} page {number}: we will pay for direct and accidental loss to your covered auto", ln=1)
+    return uh.MemoryUpload(f"{name}.pdf", "application/pdf", pdf.output(dest="S").encode("latin-1"))
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(ec, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(fl, "FORM_LIBRARY_DIR", str(tmp_path / "forms"))
+    ec.clear()
+
+def test_bundle_keeps_skipped_pages_on_their_own_files(monkeypatch):
+    monkeypatch.setattr(eb, "MAX_PAGES", 2)
+    _, document_info = dp.extract_bundle([make_pdf("a", 3), make_pdf("b", 3)])
+    
+    files = document_info["files"]
+    assert [(f["first_page"], f["last_page"]) for f in files] == [(1, 2), (3, 4)]
+    # Page 3 of each file is over the limit and has no page in the bundle
+    assert [f["skipped_pages"] for f in files] == [{"page_limit": [[3, 3]]}, {"page_limit": [[3, 3]]}]
+    assert document_info["skipped_pages"] == {}
+    assert not document_info["complete"]
+
+def test_bundle_renumbers_skipped_pages_within_files(monkeypatch):
+    extract = dp._extract_document
+    
+    def extract_with_timeouts(*args):
+        # Pages 2 and 3 of every file ran out of time
+        extracted_text, document_info = extract(*args)
+        return extracted_text, dict(document_info, complete=False, skipped_pages={"page_timeout": [[2, 3]]})
+    
+    monkeypatch.setattr(dp, "_extract_document", extract_with_timeouts)
+    _, document_info = dp.extract_bundle([make_pdf("a", 3), make_pdf("b", 3)])
+    
+    assert document_info["skipped_pages"] == {"page_timeout": [[2, 3], [5, 6]]}
+    assert all("skipped_pages" not in f for f in document_info["files"])
+
+def test_bundle_stops_its_files_when_left_early(monkeypatch):
+    class Rerun(BaseException):
+        pass
+    
+    stopped = []
+    extract = dp._extract_document
+    
+    def extract_and_watch(uploaded_file, progress_callback, cancel_event, deadline):
+        # Stands in for a long extraction that checks its cancel event between pages
+        progress_callback(0, 1)
+        stopped.append(cancel_event.wait(10))
+        return extract(uploaded_file)
+    
+    def leave(pages_done, page_count):
+        raise Rerun()
+    
+    monkeypatch.setattr(dp, "_extract_document", extract_and_watch)
+    with pytest.raises(Rerun):
+        dp.extract_bundle([make_pdf("a", 1), make_pdf("b", 1)], progress_callback=leave)
+    assert stopped == [True, True]
+
+class CountingPool:
+    """Stands in for the OCR pool, recording the most pages it ever held at once."""
+    
+    def __init__(self):
+        self.futures = []
+        self.most_in_flight = 0
+    
+    def submit(self, task, *args):
+        future = Future()
+        self.futures.append(future)
+        self.most_in_flight = max(self.most_in_flight, sum(not f.done() for f in self.futures))
+        # A page finishes only once the caller waits for it
+        wait_for_result = future.result
+        
+        def result(timeout=None):
+            if not future.done():
+                future.set_result(("text", 90.0, "ok", 0.0))
+            return wait_for_result(timeout)
+        future.result = result
+        return future
+
+def test_ocr_renders_pages_only_as_earlier_ones_finish(monkeypatch):
+    pool = CountingPool()
+    monkeypatch.setattr(dp, "_get_ocr_pool", lambda: pool)
+    monkeypatch.setattr(dp, "_render_pdf_page", lambda document, index: object())
+    monkeypatch.setattr(dp.pdfium, "PdfDocument", lambda source: type("Document", (), {"close": lambda self: None})())
+    pages = ({"page_index": i, "needs_ocr": True, "extract_seconds": 0.0} for i in range(40))
+    
+    results = list(dp._with_ocr(pages, "scan.pdf", eb.ExtractionBudget()))
+    assert [result["page_index"] for result in results] == list(range(40))
+    assert pool.most_in_flight <= dp.OCR_MAX_IN_FLIGHT
+
+def test_image_frames_are_queued_only_as_earlier_ones_finish(monkeypatch):
+    import io
+    from PIL import Image
+    
+    pool = CountingPool()
+    monkeypatch.setattr(dp, "_get_ocr_pool", lambda: pool)
+    frames = [Image.new("L", (20, 20), shade) for shade in range(30)]
+    tiff = io.BytesIO()
+    frames[0].save(tiff, format="TIFF", save_all=True, append_images=frames[1:])
+    
+    records = list(dp.iter_image_pages([(tiff, "scan.tif")], budget=eb.ExtractionBudget()))
+    assert [(record["page_number"], record["page_count"], record["source_frame"]) for record in records] == [
+        (i, 30, i) for i in range(1, 31)
+    ]
+    assert pool.most_in_flight <= dp.OCR_MAX_IN_FLIGHT
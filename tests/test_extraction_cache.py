@@ -0,0 +1,35 @@
+import os
+import sys
+import stat
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import extraction_cache as ec
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    directory = tmp_path / "cache"
+    monkeypatch.setattr(ec, "CACHE_DIR", str(directory))
+    ec.clear()
+    return directory
+
+def test_store_is_private_to_its_user(store):
+    ec.put("ab" + "0" * 62, "value", memory=False)
+    assert stat.S_IMODE(os.stat(store).st_mode) & 0o077 == 0
+    assert stat.S_IMODE(os.stat(store / "ab").st_mode) & 0o077 == 0
+    assert ec.get("ab" + "0" * 62, memory=False) == "value"
+
+def test_entry_others_can_write_is_not_unpickled(store):
+    key = "cd" + "0" * 62
+    ec.put(key, "value", memory=False)
+    os.chmod(ec._disk_path(key), 0o666)
+    assert ec.get(key, memory=False) is None
+
+def test_store_others_can_write_is_not_used(tmp_path, monkeypatch):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+    monkeypatch.setattr(ec, "CACHE_DIR", str(shared))
+    ec.put("ef" + "0" * 62, "value", memory=False)
+    assert not os.listdir(shared)
@@ -0,0 +1,28 @@
+import io
+import os
+import sys
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import image_preprocessing as ip
+
+def saved(image, dpi):
+    """Round-trip an image through JPEG with the given DPI metadata, as a camera would write it."""
+    data = io.BytesIO()
+    image.save(data, format="JPEG", dpi=(dpi, dpi))
+    data.seek(0)
+    return Image.open(data)
+
+def test_camera_dpi_metadata_is_ignored():
+    # A 12 MP phone photo of a letter page, tagged 72 DPI like most cameras write
+    photo = saved(Image.new("RGB", (3024, 4032), "white"), 72)
+    assert ip._source_dpi(photo) == 4032 / ip.ASSUMED_PAGE_INCHES
+    
+    downscaled = ip._downscale(photo, 300)
+    assert max(downscaled.size) == 300 * ip.ASSUMED_PAGE_INCHES
+
+def test_scanner_dpi_metadata_is_trusted():
+    scan = saved(Image.new("L", (2550, 3300), "white"), 300)
+    assert ip._source_dpi(scan) == 300.0
+    assert ip._downscale(scan, 300).size == (2550, 3300)
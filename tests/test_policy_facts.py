@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import policy_facts as pf
+
+DECLARATIONS = """AUTO POLICY DECLARATIONS
+Policy Period: 01/01/2025 to 07/01/2025
+Liability Limits: 100/300/50
+Collision: $500 deductible
+Comprehensive: $250 deductible
+6-month premium $742.18
+"""
+
+@pytest.fixture
+def facts():
+    return pf.extract_facts(DECLARATIONS)
+
+@pytest.mark.parametrize("question", [
+    "Will my premium go up after an accident?",
+    "Can I lower my premium by bundling?",
+    "Is the premium refundable if I cancel?",
+    "Does my deductible apply if the other driver is at fault?",
+    "Is my deductible waived for windshield repair?",
+    "Are there limits on rental reimbursement?",
+    "Why is my collision deductible so high?",
+])
+def test_conditional_questions_go_to_the_model(facts, question):
+    assert pf.answer_question(question, facts) is None
+
+def test_coverage_without_facts_goes_to_the_model(facts):
+    assert pf.answer_question("What is my deductible for glass damage?", facts) is None
+    assert pf.answer_question("Do I have a deductible for glass damage?", facts) is None
+
+@pytest.mark.parametrize("question, expected", [
+    ("What is my collision deductible?", "$500"),
+    ("How much is my premium?", "$742.18"),
+    ("What are my limits?", "$100,000 / $300,000 / $50,000"),
+])
+def test_lookups_are_answered_locally(facts, question, expected):
+    answer = pf.answer_question(question, facts)
+    assert answer is not None and expected in answer
+
+def test_named_coverage_narrows_the_answer(facts):
+    answer = pf.answer_question("What is my collision deductible?", facts)
+    assert "$250" not in answer
+
+def test_answer_follows_readability_preference(facts):
+    easy = pf.answer_question("What are my deductibles?", facts, "Easy (Elementary School Level)")
+    moderate = pf.answer_question("What are my deductibles?", facts, "Moderate (High School Level)")
+    assert easy.startswith("Your collision deductible is $500")
+    assert moderate.startswith("Your policy lists these deductibles: Collision: $500")
+
+def test_dates_are_not_split_limits():
+    facts = pf.extract_facts("Liability coverage effective 12/31/25 for all drivers")
+    assert not [fact for fact in facts if fact["kind"] == "split_limit"]
+
+def test_split_limits_next_to_a_limit_word():
+    facts = pf.extract_facts("Bodily Injury Liability: 10/20/10")
+    assert [fact["value"] for fact in facts if fact["kind"] == "split_limit"] == [(10000, 20000, 10000)]
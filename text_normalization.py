@@ -0,0 +1,239 @@
+import re
+import math
+import bisect
+from array import array
+from collections import Counter
+
+# A line is boilerplate when it opens or closes at least this share of the pages
+BOILERPLATE_MIN_PAGE_RATIO = 0.5
+BOILERPLATE_MIN_PAGES = 3
+EDGE_LINES = 3  # Non-blank lines at the top and bottom of a page checked for running headers and footers
+
+LIGATURES = {
+    "\ufb00": "ff", "\ufb01": "fi", "\ufb02": "fl", "\ufb03": "ffi", "\ufb04": "ffl", "\ufb05": "st", "\ufb06": "st"
+}
+INVISIBLE = ("\u00ad", "\u200b")  # Soft hyphen, zero-width space
+# Runs of horizontal whitespace (including non-breaking and typographic spaces), ligatures and invisible characters
+INLINE = re.compile(r"[ \t\u00a0\u2000-\u200a\u202f\u3000]+|[\ufb00-\ufb06]|[\u00ad\u200b]")
+DIGITS = re.compile(r"\d+")
+# Token estimate used for reporting: words and individual punctuation marks
+TOKEN = re.compile(r"\w+|[^\w\s]")
+
+def _line_key(line):
+    """Key used to spot repeated lines: case and spacing folded and numbers masked, so "Page 3 of 12" matches "Page 4 of 12"."""
+    return DIGITS.sub("#", " ".join(line.split()).casefold())
+
+def _edge_size(non_blank_count):
+    """Lines checked at each edge of a page; short pages check fewer so their body is never all edge."""
+    return min(EDGE_LINES, max(1, non_blank_count // 3))
+
+def find_boilerplate(page_texts):
+    """
+    Find running headers, footers, form numbers and page numbers repeated across pages.
+    
+    Args:
+        page_texts (list): The text of each page.
+    
+    Returns:
+        set: Line keys (see _line_key) of lines to drop from the edges of every page.
+    """
+    if len(page_texts) < BOILERPLATE_MIN_PAGES:
+        return set()
+    counts = Counter()
+    for text in page_texts:
+        lines = [line for line in text.split("\n") if line.strip()]
+        edge = _edge_size(len(lines))
+        counts.update({_line_key(line) for line in lines[:edge] + lines[-edge:]})
+    threshold = max(BOILERPLATE_MIN_PAGES, math.ceil(len(page_texts) * BOILERPLATE_MIN_PAGE_RATIO))
+    return {key for key, count in counts.items() if count >= threshold}
+
+def _inline_pieces(line, start):
+    """Split a line into (text, original offset) pieces with whitespace collapsed, ligatures folded and invisible characters dropped."""
+    pieces = []
+    last = 0
+    for match in INLINE.finditer(line):
+        if match.start() > last:
+            pieces.append((line[last:match.start()], start + last))
+        found = match.group()
+        if found in LIGATURES:
+            replacement = LIGATURES[found]
+        elif found in INVISIBLE:
+            replacement = ""
+        else:
+            replacement = " "
+        pieces.append((replacement, start + match.start()))
+        last = match.end()
+    if last < len(line):
+        pieces.append((line[last:], start + last))
+    
+    if pieces and pieces[0][0] == " ":
+        pieces.pop(0)
+    if pieces and pieces[-1][0] == " ":
+        pieces.pop()
+    return pieces
+
+def normalize_line(line):
+    """Apply the in-line normalization (whitespace, ligatures, invisible characters) to a single line."""
+    return "".join(piece for piece, _ in _inline_pieces(line, 0))
+
+def _normalize_page(text, boilerplate):
+    """
+    Normalize one page's text.
+    
+    Returns:
+        tuple: (normalized_text, offset_map, dropped_lines) where offset_map is a pair of
+        arrays (normalized starts, original starts) marking every point where the two texts
+        stop advancing together.
+    """
+    # Keep non-boilerplate lines, folding runs of blank lines into one
+    lines = []
+    position = 0
+    raw_lines = text.split("\n")
+    non_blank_count = sum(1 for line in raw_lines if line.strip())
+    edge = _edge_size(non_blank_count)
+    dropped = 0
+    non_blank = -1
+    for line in raw_lines:
+        start = position
+        position += len(line) + 1
+        if line.strip():
+            non_blank += 1
+            at_edge = non_blank < edge or non_blank >= non_blank_count - edge
+            if at_edge and boilerplate and _line_key(line) in boilerplate:
+                dropped += 1
+                continue
+        pieces = _inline_pieces(line, start)
+        if not pieces and (not lines or not lines[-1][1]):
+            continue
+        lines.append((start + len(line), pieces, "".join(piece for piece, _ in pieces)))
+    while lines and not lines[-1][1]:
+        lines.pop()
+    
+    parts = []
+    normalized_starts = array("l")
+    original_starts = array("l")
+    length = 0
+    
+    def emit(piece, original):
+        nonlocal length
+        if not piece:
+            return
+        # Only record an anchor where the texts stop moving in step
+        if not normalized_starts or original - length != original_starts[-1] - normalized_starts[-1]:
+            normalized_starts.append(length)
+            original_starts.append(original)
+        parts.append(piece)
+        length += len(piece)
+    
+    for i, (line_end, pieces, line_text) in enumerate(lines):
+        next_text = lines[i + 1][2] if i + 1 < len(lines) else ""
+        # Rejoin a word hyphenated across a line break: "cover-" + "age" becomes "coverage"
+        rejoin = len(line_text) > 1 and line_text[-1] == "-" and line_text[-2].isalpha() and next_text[:1].islower()
+        for j, (piece, original) in enumerate(pieces):
+            if rejoin and j == len(pieces) - 1:
+                piece = piece[:-1]
+            emit(piece, original)
+        if i + 1 < len(lines) and not rejoin:
+            emit("\n", line_end)
+    return "".join(parts), (normalized_starts, original_starts), dropped
+
+def to_original_offset(offset_map, offset):
+    """Map a character offset in a normalized page text back to the original page text."""
+    normalized_starts, original_starts = offset_map
+    if not normalized_starts:
+        return offset
+    i = max(0, bisect.bisect_right(normalized_starts, offset) - 1)
+    return original_starts[i] + offset - normalized_starts[i]
+
+def to_normalized_offset(offset_map, offset):
+    """Map a character offset in an original page text to the normalized page text."""
+    normalized_starts, original_starts = offset_map
+    if not normalized_starts:
+        return offset
+    i = max(0, bisect.bisect_right(original_starts, offset) - 1)
+    mapped = normalized_starts[i] + max(0, offset - original_starts[i])
+    # Offsets inside removed text land on the next character that was kept
+    if i + 1 < len(normalized_starts):
+        mapped = min(mapped, normalized_starts[i + 1])
+    return mapped
+
+def count_tokens(text):
+    """Estimate the number of tokens in a text (words and punctuation marks)."""
+    return sum(1 for _ in TOKEN.finditer(text))
+
+def _report(before, after, dropped_lines):
+    chars_before = len(before)
+    tokens_before = count_tokens(before)
+    tokens_after = count_tokens(after)
+    return {
+        "chars_before": chars_before,
+        "chars_after": len(after),
+        "chars_removed": chars_before - len(after),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_removed": tokens_before - tokens_after,
+        "boilerplate_lines_removed": dropped_lines
+    }
+
+def normalize_document(extracted_text, page_info, page_separator):
+    """
+    Normalize a paged document in place and rebuild its full text.
+    
+    Drops lines repeated at the top or bottom of most pages (running headers and footers,
+    form numbers, page numbers), rejoins words hyphenated across line breaks, folds
+    ligatures and collapses whitespace. Each page's text, offset and heading offsets are
+    updated, and the page gains an offset_map for to_original_offset() so citations can
+    still point into the original page text. Detected headings are never dropped.
+    
+    Args:
+        extracted_text (str): The full text before normalization.
+        page_info (dict): Page number to page record; updated in place.
+        page_separator (str): Text appended after every page in the full text.
+    
+    Returns:
+        tuple: (normalized_text, report) where report counts the characters and estimated
+        tokens removed.
+    """
+    page_numbers = sorted(page_info)
+    boilerplate = find_boilerplate([page_info[n]["text"] for n in page_numbers])
+    
+    page_texts = []
+    offset = 0
+    dropped_lines = 0
+    for page_number in page_numbers:
+        page = page_info[page_number]
+        protected = {_line_key(header) for header in page.get("headers") or []}
+        text, offset_map, dropped = _normalize_page(page["text"], boilerplate - protected)
+        dropped_lines += dropped
+        
+        if page.get("headings"):
+            headings = []
+            for heading in page["headings"]:
+                heading_text = normalize_line(heading["text"])
+                heading_offset = to_normalized_offset(offset_map, heading["offset"])
+                if text[heading_offset:heading_offset + len(heading_text)] != heading_text:
+                    heading_offset = text.find(heading_text)
+                if heading_offset >= 0:
+                    headings.append(dict(heading, text=heading_text, offset=heading_offset))
+            page["headings"] = headings
+        if page.get("headers"):
+            page["headers"] = [normalize_line(header) for header in page["headers"]]
+        
+        page["text"] = text
+        page["offset"] = offset
+        page["offset_map"] = offset_map
+        page_texts.append(text)
+        offset += len(text) + len(page_separator)
+    
+    normalized = "".join(text + page_separator for text in page_texts)
+    return normalized, _report(extracted_text, normalized, dropped_lines)
+
+def normalize_text(text):
+    """
+    Normalize a document without pages (plain text, a single image).
+    
+    Returns:
+        tuple: (normalized_text, report) as for normalize_document; no boilerplate is removed.
+    """
+    normalized, _, _ = _normalize_page(text, set())
+    return normalized, _report(text, normalized, 0)
@@ -0,0 +1,179 @@
+import io
+import os
+import mmap
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# Uploads at least this large are written to a temp file and handed to extractors as a path
+SPILL_THRESHOLD_BYTES = int(os.getenv("INSURLIT_SPILL_THRESHOLD_MB", "8")) * 1024 * 1024
+SPILL_DIR = os.getenv("INSURLIT_SPILL_DIR") or None
+RSS_SAMPLE_SECONDS = 0.01
+
+class MemoryUpload(io.BytesIO):
+    """
+    Stands in for a Streamlit UploadedFile: bytes with a name and a MIME type, used for files
+    unpacked from an archive and for uploads handed to a worker process. spilled_path, when
+    set, names a file already on disk holding the bytes instead.
+    """
+    
+    def __init__(self, name, type, data=b"", size=None, spilled_path=None):
+        super().__init__(data)
+        self.name = name
+        self.type = type
+        self.size = len(data) if size is None else size
+        self.spilled_path = spilled_path
+
+def spill_to_file(source, suffix=""):
+    """
+    Write an in-memory upload to a temp file without making an intermediate copy.
+    
+    Args:
+        source: A file-like object; BytesIO objects are written straight from their buffer.
+        suffix (str, optional): File name suffix, e.g. ".pdf".
+    
+    Returns:
+        str: Path of the temp file. The caller is responsible for removing it.
+    """
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="insurlit-", dir=SPILL_DIR)
+    with os.fdopen(fd, "wb") as f:
+        if hasattr(source, "getbuffer"):
+            with source.getbuffer() as buffer:
+                f.write(buffer)
+        else:
+            source.seek(0)
+            shutil.copyfileobj(source, f)
+    return path
+
+@contextmanager
+def open_upload(uploaded_file):
+    """
+    Give extractors access to an upload without copying it.
+    
+    Small uploads are read in place from the upload's own buffer. Uploads of at least
+    SPILL_THRESHOLD_BYTES are spilled to a temp file, so extractors (and worker processes)
+    open them from disk instead of holding more copies in memory.
+    
+    Args:
+        uploaded_file: A Streamlit UploadedFile object (an io.BytesIO subclass).
+    
+    Yields:
+        tuple: (source, spilled) where source is either the upload itself or the path of the
+        temp file, and spilled says which.
+    """
+    # Uploads already written to disk (see extraction_workers) are used where they are
+    spilled_path = getattr(uploaded_file, "spilled_path", None)
+    if spilled_path:
+        yield spilled_path, True
+        return
+    
+    with uploaded_file.getbuffer() as buffer:
+        size = buffer.nbytes
+    if size < SPILL_THRESHOLD_BYTES:
+        uploaded_file.seek(0)
+        yield uploaded_file, False
+        return
+    
+    path = spill_to_file(uploaded_file, os.path.splitext(uploaded_file.name)[1])
+    try:
+        yield path, True
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+@contextmanager
+def source_buffer(source):
+    """
+    Expose the bytes of an upload source as a buffer without reading them into memory.
+    
+    Paths are memory-mapped; in-memory uploads expose their own buffer.
+    
+    Yields:
+        memoryview | mmap.mmap: A read-only view of the document bytes.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+    else:
+        with source.getbuffer() as buffer:
+            yield buffer
+
+def process_rss_bytes(pid="self"):
+    """Resident memory of a process (this one by default), read from /proc; Linux only."""
+    with open(f"/proc/{pid}/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def descendant_pids(pid):
+    """Every process started by a process, and by those processes in turn, read from /proc; Linux only."""
+    children = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as stat:
+                # The command name in parentheses may hold spaces; the parent id follows it
+                parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue  # The process exited while the table was read
+        children.setdefault(parent, []).append(int(name))
+    found = []
+    pending = [int(pid)]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            found.append(child)
+            pending.append(child)
+    return found
+
+def process_tree_rss_bytes(pid):
+    """Resident memory of a process and all its descendants, such as a PDF page pool it started; Linux only."""
+    total = process_rss_bytes(pid)
+    for child in descendant_pids(pid):
+        try:
+            total += process_rss_bytes(child)
+        except (OSError, ValueError):
+            pass
+    return total
+
+@contextmanager
+def track_peak_rss():
+    """
+    Sample this process's resident memory while the block runs.
+    
+    Linux only; elsewhere the report stays empty. Memory used by worker processes is not
+    included, and other sessions served by the same process are counted too.
+    
+    Yields:
+        dict: Filled on exit with rss_before_mb, rss_peak_mb and rss_peak_growth_mb.
+    """
+    report = {}
+    try:
+        before = process_rss_bytes()
+    except (OSError, ValueError):
+        yield report
+        return
+    
+    peak = [before]
+    done = threading.Event()
+    
+    def sample():
+        while not done.wait(RSS_SAMPLE_SECONDS):
+            peak[0] = max(peak[0], process_rss_bytes())
+    
+    sampler = threading.Thread(target=sample, name="insurlit-rss-sampler", daemon=True)
+    sampler.start()
+    try:
+        yield report
+    finally:
+        done.set()
+        sampler.join()
+        peak[0] = max(peak[0], process_rss_bytes())
+        report["rss_before_mb"] = round(before / 1e6, 1)
+        report["rss_peak_mb"] = round(peak[0] / 1e6, 1)
+        report["rss_peak_growth_mb"] = round((peak[0] - before) / 1e6, 1)